@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import os
+import sys
+import json
+import stat
+import base64
+import socket
+
+# this module is imported by the command line client, keep it free of the
+# assembler and pyparsing so a request costs little more than the interpreter start
+SOCKET_NAME = 'sunplus6502asm.sock'
+
+
+def get_default_socket(create=False):
+    '''the socket lives in $XDG_RUNTIME_DIR, which only the user can access.
+    without it a directory with mode 0700 below the temporary directory is
+    used, it is created by the server and rejected if someone else owns it or
+    can access it'''
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR', None)
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, SOCKET_NAME)
+
+    uid = os.getuid() if hasattr(os, 'getuid') else 0
+    directory = os.path.join(os.environ.get('TMPDIR', '/tmp'), 'sunplus6502asm-%d' % uid)
+    if create:
+        try:
+            os.mkdir(directory, 0o700)
+        except FileExistsError:
+            pass
+    try:
+        status = os.lstat(directory)
+    except FileNotFoundError:
+        # no server has run yet, connecting fails with the usual error
+        return os.path.join(directory, SOCKET_NAME)
+    if not stat.S_ISDIR(status.st_mode) or status.st_uid != uid or status.st_mode & 0o077:
+        raise Exception('socket directory %s is not a private directory of the current user' % directory)
+    return os.path.join(directory, SOCKET_NAME)
+
+
+def request(message, socket_path=None, timeout=None):
+    '''send one request to the assembler server and return the decoded response.
+    both are a single line of JSON'''
+    if socket_path is None:
+        socket_path = get_default_socket()
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(timeout)
+        connection.connect(socket_path)
+        connection.sendall(json.dumps(message).encode('utf-8') + b'\n')
+        connection.shutdown(socket.SHUT_WR)
+        chunks = list()
+        while True:
+            chunk = connection.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    data = b''.join(chunks)
+    if not data:
+        raise Exception('no response from the assembler server at %s' % socket_path)
+    return json.loads(data)
+
+
+def assemble(input_file, output_file=None, output_format=None, options=None, socket_path=None):
+    '''assemble input_file in the server. paths are made absolute because the
+    server runs in another directory. returns the response, the image is
+    decoded to bytes'''
+    message = {'command': 'assemble',
+               'input': os.path.abspath(input_file),
+               'output': os.path.abspath(output_file) if output_file is not None else None,
+               'format': output_format,
+               'cwd': os.getcwd(),
+               'options': options or dict()}
+    response = request(message, socket_path)
+    if response.get('image', None) is not None:
+        response['image'] = base64.b64decode(response['image'])
+    return response
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="send a program to a running AssemblerServer")
+    parser.add_argument("input", nargs="?", help="main assembler file")
+    parser.add_argument("-s", "--socket", help="unix socket of the server, defaults to one in $XDG_RUNTIME_DIR or a private directory")
+    parser.add_argument("-o", "--output", help="output file, the format is taken from the extension (.bin, .hex, .srec)")
+    parser.add_argument("-f", "--format", choices=['bin', 'ihex', 'srec'], help="output format, overrides the file extension")
+    parser.add_argument("--whole_file", action="store_true", help="parse each file in one pyparsing pass, faster than the grammar per line but slower than the default fast path")
+    parser.add_argument("--compact", action="store_true", help="keep the program in a struct of arrays instead of objects, the rows are filled while the files are read")
+    parser.add_argument("--stream", action="store_true", help="assemble line by line without keeping the program in memory")
+    parser.add_argument("--mmap", action="store_true", help="read the source files through mmap")
+    parser.add_argument("--no_relax", action="store_true", help="always use absolute addressing for label operands")
+    parser.add_argument("-O", "--optimize", action="store_true", help="remove redundant instructions and print the savings")
+    parser.add_argument("--cycles", action="store_true", help="print the cycle timing report")
+    parser.add_argument("--cycle_budget", type=int, help="warn about routines that can take more cycles than this")
+    parser.add_argument("--ping", action="store_true", help="check that the server is running")
+    parser.add_argument("--shutdown", action="store_true", help="stop the server")
+    args = parser.parse_args()
+
+    try:
+        if args.socket is None:
+            args.socket = get_default_socket()
+        if args.ping or args.shutdown:
+            response = request({'command': 'shutdown' if args.shutdown else 'ping'}, args.socket)
+            print(response['message'])
+            sys.exit(0 if response['ok'] else 1)
+        if args.input is None:
+            parser.error('no input file given')
+
+        options = {'whole_file': args.whole_file, 'compact': args.compact, 'stream': args.stream,
+                   'mmap_source': args.mmap, 'relax_labels': not args.no_relax,
+                   'cycle_report': args.cycles, 'cycle_budget': args.cycle_budget,
+                   'optimize': args.optimize}
+        response = assemble(args.input, args.output, args.format, options, args.socket)
+    except OSError as e:
+        sys.stderr.write('can not reach the assembler server at %s: %s\n' % (args.socket, e))
+        sys.exit(2)
+
+    for diagnostic in response['diagnostics']:
+        sys.stderr.write(diagnostic + '\n')
+    if 'optimizer_report' in response:
+        print('\n'.join(response['optimizer_report']))
+    if 'cycle_report' in response:
+        print('\n'.join(response['cycle_report']))
+    print(response['message'])
+    sys.exit(0 if response['ok'] else 1)
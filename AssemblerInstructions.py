@@ -7,18 +7,29 @@
 import logging
 
 class Label(object):
+    __slots__ = ('__value', '__file_name', '__line_number')
     def __init__(self, label_name):
         self.__value = str(label_name)
+        self.__file_name = None
+        self.__line_number = None
     def __str__(self):
         return ';' + self.__value
     def get_name(self):
         return self.__value
+    def set_source(self, file_name, line_number):
+        self.__file_name = file_name
+        self.__line_number = line_number
+    def get_file_name(self):
+        return self.__file_name
+    def get_line_number(self):
+        return self.__line_number
     @staticmethod
     def from_parsing(token):
         #print(token.dump())
         return Label(token['label'][0])
 
 class Comment(object):
+    __slots__ = ('__value',)
     def __init__(self, comment_text):
         self.__value = str(comment_text)
     def __str__(self):
@@ -43,6 +54,9 @@ class AddressValue(object):
     TYPE_IMMEDIATE = 9
     TYPE_LABEL = 10
     TYPE_IMPLIED = 11
+    TYPE_RELATIVE = 12
+    TYPE_ZERO_PAGED_INDEXED_Y = 13
+    __slots__ = ('__value', '__type')
     def __init__(self, value, type):
         self.__value = value
         self.__type = type
@@ -142,19 +156,13 @@ class AssemblyInstruction(object):
         'STX' : INSTRUCTION_STX, 'STY' : INSTRUCTION_STY,
         'TAX' : INSTRUCTION_TAX, 'TAY' : INSTRUCTION_TAY,
         'TST' : INSTRUCTION_TST, 'TSX' : INSTRUCTION_TSX,
-        'TXA' : INSTRUCTION_TXA, 'TXS' : INSTRUCTION_TXS
+        'TXA' : INSTRUCTION_TXA, 'TXS' : INSTRUCTION_TXS,
+        'TYA' : INSTRUCTION_TYA
     }
-    # INSTRUCTION_DATA = {
-    #     AddressValue.TYPE_ABSOLUTE :                {'opcode':0x00, 'numbytes':0, 'numcycles':2},
-    #     AddressValue.TYPE_ZERO_PAGED :              {'opcode':0x00, 'numbytes':0, 'numcycles':2},
-    #     AddressValue.TYPE_ABSOLUTE_INDEXED_X :      {'opcode':0x00, 'numbytes':0, 'numcycles':2},
-    #     AddressValue.TYPE_ABSOLUTE_INDEXED_Y :      {'opcode':0x00, 'numbytes':0, 'numcycles':2},
-    #     AddressValue.TYPE_ZERO_PAGED_INDEXED_X :    {'opcode':0x00, 'numbytes':0, 'numcycles':2},
-    #     AddressValue.TYPE_INDEXED_INDIRECT :        {'opcode':0x00, 'numbytes':0, 'numcycles':2}, # (Adr,X)
-    #     AddressValue.TYPE_INDIRECT_INDEXED :        {'opcode':0x00, 'numbytes':0, 'numcycles':2}, # (Adr),Y
-    #     AddressValue.TYPE_INDIRECT :                {'opcode':0x00, 'numbytes':0, 'numcycles':2}, # (Adr)
-    #     AddressValue.TYPE_LABEL :                   {'opcode':0x00, 'numbytes':0, 'numcycles':2},
-    # }
+    MNEMONICS = dict((value, key) for key, value in KNOWN_INSTRUCTIONS.items())
+
+    __slots__ = ('__label', '__instruction', '__address', '__file_name', '__line_number',
+                 '__operand', '__address_type', '__op_code', '__num_bytes', '__num_cycles')
 
     @staticmethod
     def parse_opcode(token):
@@ -163,33 +171,46 @@ class AssemblyInstruction(object):
         op_code = token['op_code'].upper()
         return AssemblyInstruction.KNOWN_INSTRUCTIONS.get(op_code, None)
 
-    def __init__(self, label, inst_data, operand=None):
+    def __init__(self, label, instruction, operand=None):
         self.__label = label
-        self.__op_code = -1
-        self.__num_bytes = -1
-        self.__num_cycles = -1
+        self.__instruction = instruction
+        self.__address = None
+        self.__file_name = None
+        self.__line_number = None
         self.__operand = operand
-        if self.__operand is not None:
-            if isinstance(self.__operand, int): # Adress type immediate
-                self.__op_code = inst_data[AddressValue.TYPE_IMMEDIATE]['opcode']
-                self.__num_bytes = inst_data[AddressValue.TYPE_IMMEDIATE]['numbytes']
-                self.__num_cycles = inst_data[AddressValue.TYPE_IMMEDIATE]['numcycles']
-            elif isinstance(self.__operand, AddressValue):
-                if self.__operand.get_type() is AddressValue.TYPE_LABEL:
-                    '''if the operand is a label we have to wait until the actual
-                    assembly of the program to get an address
-                    What should we do in this case? -> Set it to absolute?'''
-                    self.__op_code = inst_data[AddressValue.TYPE_ABSOLUTE]['opcode']
-                    self.__num_bytes = inst_data[AddressValue.TYPE_ABSOLUTE]['numbytes']
-                    self.__num_cycles = inst_data[AddressValue.TYPE_ABSOLUTE]['numcycles']
+        if self.__operand is None:
+            address_type = AddressValue.TYPE_IMPLIED
+        elif isinstance(self.__operand, int): # Adress type immediate
+            address_type = AddressValue.TYPE_IMMEDIATE
+        elif isinstance(self.__operand, AddressValue):
+            address_type = self.__operand.get_type()
+            if address_type is AddressValue.TYPE_LABEL:
+                '''if the operand is a label we have to wait until the actual
+                assembly of the program to get an address. Branches use a
+                relative offset, everything else is set to absolute'''
+                if instruction in BRANCH_INSTRUCTIONS:
+                    address_type = AddressValue.TYPE_RELATIVE
                 else:
-                    self.__op_code, self.__num_bytes, self.__num_cycles = self.decode_instruction_data(inst_data, self.__operand)
-            else:
-                raise NotImplementedError('somthing went wrong or we found a case that we didnt think about')
+                    address_type = AddressValue.TYPE_ABSOLUTE
         else:
-            self.__op_code = inst_data[AddressValue.TYPE_IMPLIED]['opcode']
-            self.__num_bytes = inst_data[AddressValue.TYPE_IMPLIED]['numbytes']
-            self.__num_cycles = inst_data[AddressValue.TYPE_IMPLIED]['numcycles']
+            raise NotImplementedError('somthing went wrong or we found a case that we didnt think about')
+        self.__address_type = address_type
+        self.__op_code, self.__num_bytes, self.__num_cycles = self.decode_instruction_data(instruction, address_type, self.__operand)
+
+    def __copy__(self):
+        '''field by field copy, the generic copy of slot objects is as slow as parsing the line'''
+        instr = AssemblyInstruction.__new__(AssemblyInstruction)
+        instr.__label = self.__label
+        instr.__instruction = self.__instruction
+        instr.__address = self.__address
+        instr.__file_name = self.__file_name
+        instr.__line_number = self.__line_number
+        instr.__operand = self.__operand
+        instr.__address_type = self.__address_type
+        instr.__op_code = self.__op_code
+        instr.__num_bytes = self.__num_bytes
+        instr.__num_cycles = self.__num_cycles
+        return instr
 
     def get_label(self):
         return self.__label
@@ -203,15 +224,86 @@ class AssemblyInstruction(object):
     def get_opcode(self):
         return self.__op_code
 
-    def replace_label(self, address_value):
-        self.__operand = AddressValue(address_value, AddressValue.TYPE_ABSOLUTE)
+    def get_num_bytes(self):
+        return self.__num_bytes
+
+    def get_instruction(self):
+        return self.__instruction
+
+    def get_mnemonic(self):
+        return AssemblyInstruction.MNEMONICS.get(self.__instruction, '???')
+
+    def get_address_type(self):
+        return self.__address_type
+
+    def get_address(self):
+        return self.__address
+
+    def encode_as(self, address_type):
+        '''switch to another encoding for the operand, used to pick the size of
+        label operands. returns False if the instruction has no such address type'''
+        data = OPCODE_TABLE.get((self.__instruction, address_type), None)
+        if data is None:
+            return False
+        self.__address_type = address_type
+        self.__op_code, self.__num_bytes, self.__num_cycles = data
+        return True
 
-    def decode_instruction_data(self, instruction_data, operand):
-        data = instruction_data.get(operand.get_type(), None)
-        if data is not None:
-            return data['opcode'], data['numbytes'], data['numcycles']
+    def set_source(self, file_name, line_number):
+        self.__file_name = file_name
+        self.__line_number = line_number
+
+    def get_file_name(self):
+        return self.__file_name
+
+    def get_line_number(self):
+        return self.__line_number
+
+    def set_address(self, address):
+        self.__address = address
+
+    def replace_label(self, address_value):
+        if self.__address_type is AddressValue.TYPE_RELATIVE:
+            offset = address_value - (self.__address + self.__num_bytes)
+            if offset < -128 or offset > 127:
+                raise ValueError('branch target {:04X}h out of range for instruction at {:04X}h'.format(address_value, self.__address))
+            self.__operand = AddressValue(offset & 0xFF, AddressValue.TYPE_RELATIVE)
+        else:
+            self.__operand = AddressValue(address_value, self.__address_type)
+
+    def decode_instruction_data(self, instruction, address_type, operand):
+        '''single lookup in the opcode table, if the instruction does not
+        support the address type try the closest alternative'''
+        data = OPCODE_TABLE.get((instruction, address_type), None)
+        if data is None and address_type in ADDRESS_TYPE_FALLBACK:
+            fallback_type = ADDRESS_TYPE_FALLBACK[address_type]
+            if fallback_type is not AddressValue.TYPE_ZERO_PAGED_INDEXED_Y or operand.get_value() <= 0xFF:
+                data = OPCODE_TABLE.get((instruction, fallback_type), None)
+                self.__address_type = fallback_type
+        if data is None:
+            raise ValueError('unknonw Adress Type %d for instuction %s' % (address_type, self.get_mnemonic()))
+        return data
+
+    def encode_into(self, buffer, offset):
+        '''write the opcode and operand bytes to buffer, the operand is little endian'''
+        buffer[offset] = self.__op_code
+        if self.__num_bytes == 1:
+            return
+        if isinstance(self.__operand, int):
+            value = self.__operand
+        else:
+            value = self.__operand.get_value()
+        if self.__num_bytes == 2:
+            if value > 0xFF:
+                raise ValueError('operand value to big for op code')
+            buffer[offset + 1] = value
+        elif self.__num_bytes == 3:
+            if value > 0xFFFF:
+                raise ValueError('operand value to big for op code')
+            buffer[offset + 1] = value & 0xFF
+            buffer[offset + 2] = value >> 8
         else:
-            raise ValueError('unknonw Adress Type for instuction')
+            raise ValueError('unexpected number of bytes for operation')
 
     def to_bin(self):
         if isinstance(self.__operand, int):
@@ -221,175 +313,249 @@ class AssemblyInstruction(object):
         else:
             value = self.__operand.get_value()
 
-        if self.__num_bytes is 1:
+        if self.__num_bytes == 1:
             return '{:02X}'.format(self.__op_code)
-        elif self.__num_bytes is 2:
+        elif self.__num_bytes == 2:
             if value > 0xFF:
                 raise ValueError('operand value to big for op code')
             return '{:02X}{:02X}'.format(self.__op_code, value)
-        elif self.__num_bytes is 3:
+        elif self.__num_bytes == 3:
             return '{:02X}{:04X}'.format(self.__op_code, value)
         else:
             raise ValueError('unexpected number of bytes for operation')
 
-class Inst_ADC(AssemblyInstruction):
-    INSTRUCTION_DATA = {
-        AddressValue.TYPE_IMMEDIATE :               {'opcode':0x56, 'numbytes':2, 'numcycles':2},
-        AddressValue.TYPE_ABSOLUTE :                {'opcode':0x57, 'numbytes':3, 'numcycles':4},
-        AddressValue.TYPE_ZERO_PAGED :              {'opcode':0x17, 'numbytes':2, 'numcycles':3},
-        AddressValue.TYPE_ABSOLUTE_INDEXED_X :      {'opcode':0x5F, 'numbytes':3, 'numcycles':4},
-        AddressValue.TYPE_ABSOLUTE_INDEXED_Y :      {'opcode':0x5E, 'numbytes':3, 'numcycles':4},
-        AddressValue.TYPE_ZERO_PAGED_INDEXED_X :    {'opcode':0x1F, 'numbytes':2, 'numcycles':4},
-        AddressValue.TYPE_INDEXED_INDIRECT :        {'opcode':0x16, 'numbytes':2, 'numcycles':6},
-        AddressValue.TYPE_INDIRECT_INDEXED :        {'opcode':0x1E, 'numbytes':2, 'numcycles':6},
-    }
-    def __init__(self, label, operand):
-        super().__init__(label, self.INSTRUCTION_DATA, operand)
-
-
-class Inst_AND(AssemblyInstruction):
-    INSTRUCTION_DATA = {
-        AddressValue.TYPE_IMMEDIATE :               {'opcode':0x54, 'numbytes':2, 'numcycles':2},
-        AddressValue.TYPE_ZERO_PAGED :              {'opcode':0x15, 'numbytes':2, 'numcycles':3},
-        AddressValue.TYPE_ZERO_PAGED_INDEXED_X :    {'opcode':0x1D, 'numbytes':2, 'numcycles':4},
-        AddressValue.TYPE_ABSOLUTE :                {'opcode':0x55, 'numbytes':3, 'numcycles':4},
-        AddressValue.TYPE_ABSOLUTE_INDEXED_X :      {'opcode':0x5D, 'numbytes':3, 'numcycles':4},
-        AddressValue.TYPE_ABSOLUTE_INDEXED_Y :      {'opcode':0x5C, 'numbytes':3, 'numcycles':4},
-        AddressValue.TYPE_INDEXED_INDIRECT :        {'opcode':0x14, 'numbytes':2, 'numcycles':6}, # (Adr,X)
-        AddressValue.TYPE_INDIRECT_INDEXED :        {'opcode':0x1C, 'numbytes':2, 'numcycles':6}, # (Adr),Y
-    }
-    def __init__(self, label, operand):
-        super().__init__(label, self.INSTRUCTION_DATA, operand)
-
-
-class Inst_ASL(AssemblyInstruction):
-    INSTRUCTION_DATA = {
-        AddressValue.TYPE_ACCUMULATOR :             {'opcode':0xC0, 'numbytes':1, 'numcycles':2},
-        AddressValue.TYPE_ZERO_PAGED :              {'opcode':0x81, 'numbytes':2, 'numcycles':5},
-        AddressValue.TYPE_ZERO_PAGED_INDEXED_X :    {'opcode':0x89, 'numbytes':2, 'numcycles':6},
-        AddressValue.TYPE_ABSOLUTE :                {'opcode':0xC1, 'numbytes':3, 'numcycles':6},
-        AddressValue.TYPE_ABSOLUTE_INDEXED_X :      {'opcode':0xC9, 'numbytes':3, 'numcycles':6},
-    }
-    def __init__(self, label, operand):
-        super().__init__(label, self.INSTRUCTION_DATA, operand)
-
-
-class Inst_CLC(AssemblyInstruction):
-    INSTRUCTION_DATA = {AddressValue.TYPE_IMPLIED : {'opcode':0x48, 'numbytes':1, 'numcycles':2}}
-    def __init__(self, label):
-        super().__init__(label, self.INSTRUCTION_DATA)
-
-class Inst_CLD(AssemblyInstruction):
-    INSTRUCTION_DATA = {AddressValue.TYPE_IMPLIED : {'opcode':0x6A, 'numbytes':1, 'numcycles':2}}
-    def __init__(self, label):
-        super().__init__(label, self.INSTRUCTION_DATA)
-
-class Inst_CLI(AssemblyInstruction):
-    INSTRUCTION_DATA = {AddressValue.TYPE_IMPLIED : {'opcode':0x4A, 'numbytes':1, 'numcycles':2}}
-    def __init__(self, label):
-        super().__init__(label, self.INSTRUCTION_DATA)
-
-class Inst_CLV(AssemblyInstruction):
-    INSTRUCTION_DATA = {AddressValue.TYPE_IMPLIED : {'opcode':0x78, 'numbytes':1, 'numcycles':2}}
-    def __init__(self, label):
-        super().__init__(label, self.INSTRUCTION_DATA)
-
-class Inst_DEX(AssemblyInstruction):
-    INSTRUCTION_DATA = {AddressValue.TYPE_IMPLIED : {'opcode':0xE2, 'numbytes':1, 'numcycles':2}}
-    def __init__(self, label):
-        super().__init__(label, self.INSTRUCTION_DATA)
-
-class Inst_DEY(AssemblyInstruction):
-    INSTRUCTION_DATA = {AddressValue.TYPE_IMPLIED : {'opcode':0x60, 'numbytes':1, 'numcycles':2}}
-    def __init__(self, label):
-        super().__init__(label, self.INSTRUCTION_DATA)
-
-class Inst_INX(AssemblyInstruction):
-    INSTRUCTION_DATA = {AddressValue.TYPE_IMPLIED : {'opcode':0x72, 'numbytes':1, 'numcycles':2}}
-    def __init__(self, label):
-        super().__init__(label, self.INSTRUCTION_DATA)
-
-class Inst_INY(AssemblyInstruction):
-    INSTRUCTION_DATA = {AddressValue.TYPE_IMPLIED : {'opcode':0x62, 'numbytes':1, 'numcycles':2}}
-    def __init__(self, label):
-        super().__init__(label, self.INSTRUCTION_DATA)
-
-class Inst_NOP(AssemblyInstruction):
-    INSTRUCTION_DATA = {AddressValue.TYPE_IMPLIED : {'opcode':0xF2, 'numbytes':1, 'numcycles':2}}
-    def __init__(self, label):
-        super().__init__(label, self.INSTRUCTION_DATA)
-
-class Inst_PHA(AssemblyInstruction):
-    INSTRUCTION_DATA = {AddressValue.TYPE_IMPLIED : {'opcode':0x42, 'numbytes':1, 'numcycles':3}}
-    def __init__(self, label):
-        super().__init__(label, self.INSTRUCTION_DATA)
-
-class Inst_PHP(AssemblyInstruction):
-    INSTRUCTION_DATA = {AddressValue.TYPE_IMPLIED : {'opcode':0x40, 'numbytes':1, 'numcycles':3}}
-    def __init__(self, label):
-        super().__init__(label, self.INSTRUCTION_DATA)
-
-class Inst_PLA(AssemblyInstruction):
-    INSTRUCTION_DATA = {AddressValue.TYPE_IMPLIED : {'opcode':0x52, 'numbytes':1, 'numcycles':4}}
-    def __init__(self, label):
-        super().__init__(label, self.INSTRUCTION_DATA)
-
-class Inst_PLP(AssemblyInstruction):
-    INSTRUCTION_DATA = {AddressValue.TYPE_IMPLIED : {'opcode':0x50, 'numbytes':1, 'numcycles':4}}
-    def __init__(self, label):
-        super().__init__(label, self.INSTRUCTION_DATA)
-
-class Inst_RTI(AssemblyInstruction):
-    INSTRUCTION_DATA = {AddressValue.TYPE_IMPLIED : {'opcode':0x02, 'numbytes':1, 'numcycles':6}}
-    def __init__(self, label):
-        super().__init__(label, self.INSTRUCTION_DATA)
-
-class Inst_RTS(AssemblyInstruction):
-    INSTRUCTION_DATA = {AddressValue.TYPE_IMPLIED : {'opcode':0x12, 'numbytes':1, 'numcycles':6}}
-    def __init__(self, label):
-        super().__init__(label, self.INSTRUCTION_DATA)
-
-class Inst_SEC(AssemblyInstruction):
-    INSTRUCTION_DATA = {AddressValue.TYPE_IMPLIED : {'opcode':0x58, 'numbytes':1, 'numcycles':2}}
-    def __init__(self, label):
-        super().__init__(label, self.INSTRUCTION_DATA)
-
-class Inst_SED(AssemblyInstruction):
-    INSTRUCTION_DATA = {AddressValue.TYPE_IMPLIED : {'opcode':0x7A, 'numbytes':1, 'numcycles':2}}
-    def __init__(self, label):
-        super().__init__(label, self.INSTRUCTION_DATA)
-
-class Inst_SEI(AssemblyInstruction):
-    INSTRUCTION_DATA = {AddressValue.TYPE_IMPLIED : {'opcode':0x5A, 'numbytes':1, 'numcycles':2}}
-    def __init__(self, label):
-        super().__init__(label, self.INSTRUCTION_DATA)
-
-class Inst_TAX(AssemblyInstruction):
-    INSTRUCTION_DATA = {AddressValue.TYPE_IMPLIED : {'opcode':0xF0, 'numbytes':1, 'numcycles':2}}
-    def __init__(self, label):
-        super().__init__(label, self.INSTRUCTION_DATA)
-
-class Inst_TAY(AssemblyInstruction):
-    INSTRUCTION_DATA = {AddressValue.TYPE_IMPLIED : {'opcode':0x70, 'numbytes':1, 'numcycles':2}}
-    def __init__(self, label):
-        super().__init__(label, self.INSTRUCTION_DATA)
-
-class Inst_TSX(AssemblyInstruction):
-    INSTRUCTION_DATA = {AddressValue.TYPE_IMPLIED : {'opcode':0xF8, 'numbytes':1, 'numcycles':2}}
-    def __init__(self, label):
-        super().__init__(label, self.INSTRUCTION_DATA)
-
-class Inst_TXA(AssemblyInstruction):
-    INSTRUCTION_DATA = {AddressValue.TYPE_IMPLIED : {'opcode':0xE0, 'numbytes':1, 'numcycles':2}}
-    def __init__(self, label):
-        super().__init__(label, self.INSTRUCTION_DATA)
-
-class Inst_TXS(AssemblyInstruction):
-    INSTRUCTION_DATA = {AddressValue.TYPE_IMPLIED : {'opcode':0xE8, 'numbytes':1, 'numcycles':2}}
-    def __init__(self, label):
-        super().__init__(label, self.INSTRUCTION_DATA)
-
-class Inst_TYA(AssemblyInstruction):
-    INSTRUCTION_DATA = {AddressValue.TYPE_IMPLIED : {'opcode':0x68, 'numbytes':1, 'numcycles':2}}
-    def __init__(self, label):
-        super().__init__(label, self.INSTRUCTION_DATA)
+# opcode, number of bytes and number of cycles for each instruction and
+# addressing mode. the SunPlus opcode map differs from the stock 6502 (for
+# example ADC immediate is 0x56 instead of 0x69)
+INSTRUCTION_DATA = {
+    AssemblyInstruction.INSTRUCTION_ADC : {
+        AddressValue.TYPE_IMMEDIATE :            (0x56, 2, 2),
+        AddressValue.TYPE_ZERO_PAGED :           (0x17, 2, 3),
+        AddressValue.TYPE_ZERO_PAGED_INDEXED_X : (0x1F, 2, 4),
+        AddressValue.TYPE_ABSOLUTE :             (0x57, 3, 4),
+        AddressValue.TYPE_ABSOLUTE_INDEXED_X :   (0x5F, 3, 4),
+        AddressValue.TYPE_ABSOLUTE_INDEXED_Y :   (0x5E, 3, 4),
+        AddressValue.TYPE_INDEXED_INDIRECT :     (0x16, 2, 6),
+        AddressValue.TYPE_INDIRECT_INDEXED :     (0x1E, 2, 6),
+    },
+    AssemblyInstruction.INSTRUCTION_AND : {
+        AddressValue.TYPE_IMMEDIATE :            (0x54, 2, 2),
+        AddressValue.TYPE_ZERO_PAGED :           (0x15, 2, 3),
+        AddressValue.TYPE_ZERO_PAGED_INDEXED_X : (0x1D, 2, 4),
+        AddressValue.TYPE_ABSOLUTE :             (0x55, 3, 4),
+        AddressValue.TYPE_ABSOLUTE_INDEXED_X :   (0x5D, 3, 4),
+        AddressValue.TYPE_ABSOLUTE_INDEXED_Y :   (0x5C, 3, 4),
+        AddressValue.TYPE_INDEXED_INDIRECT :     (0x14, 2, 6),
+        AddressValue.TYPE_INDIRECT_INDEXED :     (0x1C, 2, 6),
+    },
+    AssemblyInstruction.INSTRUCTION_ASL : {
+        AddressValue.TYPE_ACCUMULATOR :          (0xC0, 1, 2),
+        AddressValue.TYPE_ZERO_PAGED :           (0x81, 2, 5),
+        AddressValue.TYPE_ZERO_PAGED_INDEXED_X : (0x89, 2, 6),
+        AddressValue.TYPE_ABSOLUTE :             (0xC1, 3, 6),
+        AddressValue.TYPE_ABSOLUTE_INDEXED_X :   (0xC9, 3, 6),
+    },
+    AssemblyInstruction.INSTRUCTION_BCC : {AddressValue.TYPE_RELATIVE : (0x28, 2, 2)},
+    AssemblyInstruction.INSTRUCTION_BCS : {AddressValue.TYPE_RELATIVE : (0x38, 2, 2)},
+    AssemblyInstruction.INSTRUCTION_BEQ : {AddressValue.TYPE_RELATIVE : (0x3A, 2, 2)},
+    AssemblyInstruction.INSTRUCTION_BMI : {AddressValue.TYPE_RELATIVE : (0x18, 2, 2)},
+    AssemblyInstruction.INSTRUCTION_BNE : {AddressValue.TYPE_RELATIVE : (0x2A, 2, 2)},
+    AssemblyInstruction.INSTRUCTION_BPL : {AddressValue.TYPE_RELATIVE : (0x08, 2, 2)},
+    AssemblyInstruction.INSTRUCTION_BVC : {AddressValue.TYPE_RELATIVE : (0x0A, 2, 2)},
+    AssemblyInstruction.INSTRUCTION_BVS : {AddressValue.TYPE_RELATIVE : (0x1A, 2, 2)},
+    AssemblyInstruction.INSTRUCTION_BIT : {
+        AddressValue.TYPE_ZERO_PAGED :           (0x11, 2, 3),
+        AddressValue.TYPE_ABSOLUTE :             (0x51, 3, 4),
+    },
+    AssemblyInstruction.INSTRUCTION_CLC : {AddressValue.TYPE_IMPLIED : (0x48, 1, 2)},
+    AssemblyInstruction.INSTRUCTION_CLD : {AddressValue.TYPE_IMPLIED : (0x6A, 1, 2)},
+    AssemblyInstruction.INSTRUCTION_CLI : {AddressValue.TYPE_IMPLIED : (0x4A, 1, 2)},
+    AssemblyInstruction.INSTRUCTION_CLV : {AddressValue.TYPE_IMPLIED : (0x78, 1, 2)},
+    AssemblyInstruction.INSTRUCTION_CMP : {
+        AddressValue.TYPE_IMMEDIATE :            (0x66, 2, 2),
+        AddressValue.TYPE_ZERO_PAGED :           (0x27, 2, 3),
+        AddressValue.TYPE_ZERO_PAGED_INDEXED_X : (0x2F, 2, 4),
+        AddressValue.TYPE_ABSOLUTE :             (0x67, 3, 4),
+        AddressValue.TYPE_ABSOLUTE_INDEXED_X :   (0x6F, 3, 4),
+        AddressValue.TYPE_ABSOLUTE_INDEXED_Y :   (0x6E, 3, 4),
+        AddressValue.TYPE_INDEXED_INDIRECT :     (0x26, 2, 6),
+        AddressValue.TYPE_INDIRECT_INDEXED :     (0x2E, 2, 6),
+    },
+    AssemblyInstruction.INSTRUCTION_CPX : {
+        AddressValue.TYPE_IMMEDIATE :            (0x32, 2, 2),
+        AddressValue.TYPE_ZERO_PAGED :           (0x33, 2, 3),
+        AddressValue.TYPE_ABSOLUTE :             (0x73, 3, 4),
+    },
+    AssemblyInstruction.INSTRUCTION_CPY : {
+        AddressValue.TYPE_IMMEDIATE :            (0x22, 2, 2),
+        AddressValue.TYPE_ZERO_PAGED :           (0x23, 2, 3),
+        AddressValue.TYPE_ABSOLUTE :             (0x63, 3, 4),
+    },
+    AssemblyInstruction.INSTRUCTION_DEC : {
+        AddressValue.TYPE_ZERO_PAGED :           (0xA3, 2, 5),
+        AddressValue.TYPE_ZERO_PAGED_INDEXED_X : (0xAB, 2, 6),
+        AddressValue.TYPE_ABSOLUTE :             (0xE3, 3, 6),
+        AddressValue.TYPE_ABSOLUTE_INDEXED_X :   (0xEB, 3, 7),
+    },
+    AssemblyInstruction.INSTRUCTION_DEX : {AddressValue.TYPE_IMPLIED : (0xE2, 1, 2)},
+    AssemblyInstruction.INSTRUCTION_DEY : {AddressValue.TYPE_IMPLIED : (0x60, 1, 2)},
+    AssemblyInstruction.INSTRUCTION_EOR : {
+        AddressValue.TYPE_IMMEDIATE :            (0x46, 2, 2),
+        AddressValue.TYPE_ZERO_PAGED :           (0x07, 2, 3),
+        AddressValue.TYPE_ZERO_PAGED_INDEXED_X : (0x0F, 2, 4),
+        AddressValue.TYPE_ABSOLUTE :             (0x47, 3, 4),
+        AddressValue.TYPE_ABSOLUTE_INDEXED_X :   (0x4F, 3, 4),
+        AddressValue.TYPE_ABSOLUTE_INDEXED_Y :   (0x4E, 3, 4),
+        AddressValue.TYPE_INDEXED_INDIRECT :     (0x06, 2, 6),
+        AddressValue.TYPE_INDIRECT_INDEXED :     (0x0E, 2, 6),
+    },
+    AssemblyInstruction.INSTRUCTION_INC : {
+        AddressValue.TYPE_ZERO_PAGED :           (0xB3, 2, 5),
+        AddressValue.TYPE_ZERO_PAGED_INDEXED_X : (0xBB, 2, 6),
+        AddressValue.TYPE_ABSOLUTE :             (0xF3, 3, 6),
+        AddressValue.TYPE_ABSOLUTE_INDEXED_X :   (0xFB, 3, 7),
+    },
+    AssemblyInstruction.INSTRUCTION_INX : {AddressValue.TYPE_IMPLIED : (0x72, 1, 2)},
+    AssemblyInstruction.INSTRUCTION_INY : {AddressValue.TYPE_IMPLIED : (0x62, 1, 2)},
+    AssemblyInstruction.INSTRUCTION_JMP : {
+        AddressValue.TYPE_ABSOLUTE :             (0x43, 3, 3),
+        AddressValue.TYPE_INDIRECT :             (0x53, 3, 5),
+    },
+    AssemblyInstruction.INSTRUCTION_JSR : {AddressValue.TYPE_ABSOLUTE : (0x10, 3, 6)},
+    AssemblyInstruction.INSTRUCTION_LDA : {
+        AddressValue.TYPE_IMMEDIATE :            (0x74, 2, 2),
+        AddressValue.TYPE_ZERO_PAGED :           (0x35, 2, 3),
+        AddressValue.TYPE_ZERO_PAGED_INDEXED_X : (0x3D, 2, 4),
+        AddressValue.TYPE_ABSOLUTE :             (0x75, 3, 4),
+        AddressValue.TYPE_ABSOLUTE_INDEXED_X :   (0x7D, 3, 4),
+        AddressValue.TYPE_ABSOLUTE_INDEXED_Y :   (0x7C, 3, 4),
+        AddressValue.TYPE_INDEXED_INDIRECT :     (0x34, 2, 6),
+        AddressValue.TYPE_INDIRECT_INDEXED :     (0x3C, 2, 6),
+    },
+    AssemblyInstruction.INSTRUCTION_LDX : {
+        AddressValue.TYPE_IMMEDIATE :            (0xB0, 2, 2),
+        AddressValue.TYPE_ZERO_PAGED :           (0xB1, 2, 3),
+        AddressValue.TYPE_ZERO_PAGED_INDEXED_Y : (0xB9, 2, 4),
+        AddressValue.TYPE_ABSOLUTE :             (0xF1, 3, 4),
+        AddressValue.TYPE_ABSOLUTE_INDEXED_Y :   (0xF9, 3, 4),
+    },
+    AssemblyInstruction.INSTRUCTION_LDY : {
+        AddressValue.TYPE_IMMEDIATE :            (0x30, 2, 2),
+        AddressValue.TYPE_ZERO_PAGED :           (0x31, 2, 3),
+        AddressValue.TYPE_ZERO_PAGED_INDEXED_X : (0x39, 2, 4),
+        AddressValue.TYPE_ABSOLUTE :             (0x71, 3, 4),
+        AddressValue.TYPE_ABSOLUTE_INDEXED_X :   (0x79, 3, 4),
+    },
+    AssemblyInstruction.INSTRUCTION_LSR : {
+        AddressValue.TYPE_ACCUMULATOR :          (0xC2, 1, 2),
+        AddressValue.TYPE_ZERO_PAGED :           (0x83, 2, 5),
+        AddressValue.TYPE_ZERO_PAGED_INDEXED_X : (0x8B, 2, 6),
+        AddressValue.TYPE_ABSOLUTE :             (0xC3, 3, 6),
+        AddressValue.TYPE_ABSOLUTE_INDEXED_X :   (0xCB, 3, 7),
+    },
+    AssemblyInstruction.INSTRUCTION_NOP : {AddressValue.TYPE_IMPLIED : (0xF2, 1, 2)},
+    AssemblyInstruction.INSTRUCTION_ORA : {
+        AddressValue.TYPE_IMMEDIATE :            (0x44, 2, 2),
+        AddressValue.TYPE_ZERO_PAGED :           (0x05, 2, 3),
+        AddressValue.TYPE_ZERO_PAGED_INDEXED_X : (0x0D, 2, 4),
+        AddressValue.TYPE_ABSOLUTE :             (0x45, 3, 4),
+        AddressValue.TYPE_ABSOLUTE_INDEXED_X :   (0x4D, 3, 4),
+        AddressValue.TYPE_ABSOLUTE_INDEXED_Y :   (0x4C, 3, 4),
+        AddressValue.TYPE_INDEXED_INDIRECT :     (0x04, 2, 6),
+        AddressValue.TYPE_INDIRECT_INDEXED :     (0x0C, 2, 6),
+    },
+    AssemblyInstruction.INSTRUCTION_PHA : {AddressValue.TYPE_IMPLIED : (0x42, 1, 3)},
+    AssemblyInstruction.INSTRUCTION_PHP : {AddressValue.TYPE_IMPLIED : (0x40, 1, 3)},
+    AssemblyInstruction.INSTRUCTION_PLA : {AddressValue.TYPE_IMPLIED : (0x52, 1, 4)},
+    AssemblyInstruction.INSTRUCTION_PLP : {AddressValue.TYPE_IMPLIED : (0x50, 1, 4)},
+    AssemblyInstruction.INSTRUCTION_ROL : {
+        AddressValue.TYPE_ACCUMULATOR :          (0xD0, 1, 2),
+        AddressValue.TYPE_ZERO_PAGED :           (0x91, 2, 5),
+        AddressValue.TYPE_ZERO_PAGED_INDEXED_X : (0x99, 2, 6),
+        AddressValue.TYPE_ABSOLUTE :             (0xD1, 3, 6),
+        AddressValue.TYPE_ABSOLUTE_INDEXED_X :   (0xD9, 3, 7),
+    },
+    AssemblyInstruction.INSTRUCTION_ROR : {
+        AddressValue.TYPE_ACCUMULATOR :          (0xD2, 1, 2),
+        AddressValue.TYPE_ZERO_PAGED :           (0x93, 2, 5),
+        AddressValue.TYPE_ZERO_PAGED_INDEXED_X : (0x9B, 2, 6),
+        AddressValue.TYPE_ABSOLUTE :             (0xD3, 3, 6),
+        AddressValue.TYPE_ABSOLUTE_INDEXED_X :   (0xDB, 3, 7),
+    },
+    AssemblyInstruction.INSTRUCTION_RTI : {AddressValue.TYPE_IMPLIED : (0x02, 1, 6)},
+    AssemblyInstruction.INSTRUCTION_RTS : {AddressValue.TYPE_IMPLIED : (0x12, 1, 6)},
+    AssemblyInstruction.INSTRUCTION_SBC : {
+        AddressValue.TYPE_IMMEDIATE :            (0x76, 2, 2),
+        AddressValue.TYPE_ZERO_PAGED :           (0x37, 2, 3),
+        AddressValue.TYPE_ZERO_PAGED_INDEXED_X : (0x3F, 2, 4),
+        AddressValue.TYPE_ABSOLUTE :             (0x77, 3, 4),
+        AddressValue.TYPE_ABSOLUTE_INDEXED_X :   (0x7F, 3, 4),
+        AddressValue.TYPE_ABSOLUTE_INDEXED_Y :   (0x7E, 3, 4),
+        AddressValue.TYPE_INDEXED_INDIRECT :     (0x36, 2, 6),
+        AddressValue.TYPE_INDIRECT_INDEXED :     (0x3E, 2, 6),
+    },
+    AssemblyInstruction.INSTRUCTION_SEC : {AddressValue.TYPE_IMPLIED : (0x58, 1, 2)},
+    AssemblyInstruction.INSTRUCTION_SED : {AddressValue.TYPE_IMPLIED : (0x7A, 1, 2)},
+    AssemblyInstruction.INSTRUCTION_SEI : {AddressValue.TYPE_IMPLIED : (0x5A, 1, 2)},
+    AssemblyInstruction.INSTRUCTION_STA : {
+        AddressValue.TYPE_ZERO_PAGED :           (0x25, 2, 3),
+        AddressValue.TYPE_ZERO_PAGED_INDEXED_X : (0x2D, 2, 4),
+        AddressValue.TYPE_ABSOLUTE :             (0x65, 3, 4),
+        AddressValue.TYPE_ABSOLUTE_INDEXED_X :   (0x6D, 3, 5),
+        AddressValue.TYPE_ABSOLUTE_INDEXED_Y :   (0x6C, 3, 5),
+        AddressValue.TYPE_INDEXED_INDIRECT :     (0x24, 2, 6),
+        AddressValue.TYPE_INDIRECT_INDEXED :     (0x2C, 2, 6),
+    },
+    AssemblyInstruction.INSTRUCTION_STX : {
+        AddressValue.TYPE_ZERO_PAGED :           (0xA1, 2, 3),
+        AddressValue.TYPE_ZERO_PAGED_INDEXED_Y : (0xA9, 2, 4),
+        AddressValue.TYPE_ABSOLUTE :             (0xE1, 3, 4),
+    },
+    AssemblyInstruction.INSTRUCTION_STY : {
+        AddressValue.TYPE_ZERO_PAGED :           (0x21, 2, 3),
+        AddressValue.TYPE_ZERO_PAGED_INDEXED_X : (0x29, 2, 4),
+        AddressValue.TYPE_ABSOLUTE :             (0x61, 3, 4),
+    },
+    AssemblyInstruction.INSTRUCTION_TAX : {AddressValue.TYPE_IMPLIED : (0xF0, 1, 2)},
+    AssemblyInstruction.INSTRUCTION_TAY : {AddressValue.TYPE_IMPLIED : (0x70, 1, 2)},
+    AssemblyInstruction.INSTRUCTION_TSX : {AddressValue.TYPE_IMPLIED : (0xF8, 1, 2)},
+    AssemblyInstruction.INSTRUCTION_TXA : {AddressValue.TYPE_IMPLIED : (0xE0, 1, 2)},
+    AssemblyInstruction.INSTRUCTION_TXS : {AddressValue.TYPE_IMPLIED : (0xE8, 1, 2)},
+    AssemblyInstruction.INSTRUCTION_TYA : {AddressValue.TYPE_IMPLIED : (0x68, 1, 2)},
+
+    # SunPlus specific instructions, encoding not known yet
+    AssemblyInstruction.INSTRUCTION_CLR : {},
+    AssemblyInstruction.INSTRUCTION_INV : {},
+    AssemblyInstruction.INSTRUCTION_SET : {},
+    AssemblyInstruction.INSTRUCTION_TST : {},
+}
+
+# flat lookup table built once at import time: (instruction, address type) -> (opcode, numbytes, numcycles)
+OPCODE_TABLE = dict(((instruction, address_type), data)
+                    for instruction, modes in INSTRUCTION_DATA.items()
+                    for address_type, data in modes.items())
+
+# instructions that take a relative offset as operand
+BRANCH_INSTRUCTIONS = frozenset(instruction for instruction, address_type in OPCODE_TABLE
+                                if address_type == AddressValue.TYPE_RELATIVE)
+
+# if an instruction does not support the parsed address type, try these instead
+ADDRESS_TYPE_FALLBACK = {
+    AddressValue.TYPE_IMPLIED : AddressValue.TYPE_ACCUMULATOR,
+    AddressValue.TYPE_ZERO_PAGED : AddressValue.TYPE_ABSOLUTE,
+    AddressValue.TYPE_ZERO_PAGED_INDEXED_X : AddressValue.TYPE_ABSOLUTE_INDEXED_X,
+    AddressValue.TYPE_ABSOLUTE_INDEXED_Y : AddressValue.TYPE_ZERO_PAGED_INDEXED_Y,
+}
+
+def build_decode_table():
+    '''invert the opcode table: opcode -> (instruction, address type, numbytes, numcycles),
+    None for opcodes the SunPlus map does not use'''
+    table = [None] * 256
+    for (instruction, address_type), (op_code, num_bytes, num_cycles) in OPCODE_TABLE.items():
+        if table[op_code] is not None:
+            raise ValueError('opcode {:02X}h is used twice'.format(op_code))
+        table[op_code] = (instruction, address_type, num_bytes, num_cycles)
+    return tuple(table)
+
+# one entry per opcode, used by the disassembler
+DECODE_TABLE = build_decode_table()
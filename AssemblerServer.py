@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import os
+import json
+import time
+import base64
+import socket
+import asyncio
+import logging
+from pySunPlus6502asm import SunPlus6502Assembler, __version__
+from ParseCache import ParseCache
+from AssemblerClient import get_default_socket
+
+class DiagnosticHandler(logging.Handler):
+    '''collects the log messages of one request'''
+    def __init__(self, level=logging.WARNING):
+        logging.Handler.__init__(self, level)
+        self.setFormatter(logging.Formatter('%(levelname)s:%(name)s:%(message)s'))
+        self.messages = list()
+
+    def emit(self, record):
+        self.messages.append(self.format(record))
+
+
+class AssemblerServer(object):
+    '''assembler service on a unix domain socket. every connection sends one
+    JSON request line and gets one JSON response line back. the grammar is
+    built once, parsed files stay in the include cache and the assemblers are
+    kept per option set, so a request only pays for the files that changed'''
+    # options a request may set, everything else stays at the default
+    OPTIONS = frozenset(['whole_file', 'compact', 'stream', 'mmap_source', 'relax_labels',
+                         'cycle_report', 'cycle_budget', 'line_cache_size', 'optimize'])
+
+    def __init__(self, socket_path=None, cache_dir=None):
+        self.logger = logging.getLogger(__name__)
+        self.socket_path = socket_path
+        self.parse_cache = ParseCache(cache_dir, __version__) if cache_dir is not None else None
+        self.include_cache = dict()
+        self.assemblers = dict()  # sorted option items -> SunPlus6502Assembler
+        self.requests = 0
+        self.server = None
+        # the assembler is not thread safe and changes the working directory, one request at a time
+        self.lock = None
+
+    def get_assembler(self, options):
+        unknown = set(options) - self.OPTIONS
+        if unknown:
+            raise ValueError('unknown options %s' % ', '.join(sorted(unknown)))
+        key = tuple(sorted(options.items()))
+        assembler = self.assemblers.get(key, None)
+        if assembler is None:
+            # options that can not be combined raise ValueError, the request gets an error response
+            assembler = SunPlus6502Assembler(include_cache=self.include_cache, parse_cache=self.parse_cache, **options)
+            self.assemblers[key] = assembler
+        return assembler
+
+    def assemble(self, message):
+        '''runs in a worker thread, returns the response for an assemble request'''
+        start = time.perf_counter()
+        handler = DiagnosticHandler()
+        root_logger = logging.getLogger()
+        root_logger.addHandler(handler)
+        working_directory = os.getcwd()
+        try:
+            # includes that are not next to the including file are taken from the working directory of the client
+            os.chdir(message.get('cwd', None) or working_directory)
+            assembler = self.get_assembler(message.get('options', None) or dict())
+            result = assembler.assemble(message['input'])
+            if message.get('output', None) is not None:
+                result.write(message['output'], message.get('format', None))
+        except Exception as e:
+            self.logger.debug('assembly of %s failed', message.get('input', None), exc_info=True)
+            return {'ok': False, 'message': '%s: %s' % (type(e).__name__, e), 'diagnostics': handler.messages}
+        finally:
+            os.chdir(working_directory)
+            root_logger.removeHandler(handler)
+
+        response = {'ok': True,
+                    'message': '{:s} in {:.1f} ms'.format(str(result), (time.perf_counter() - start) * 1000.0),
+                    'diagnostics': handler.messages,
+                    'image': base64.b64encode(bytes(result.image)).decode('ascii'),
+                    'start_address': result.start_address,
+                    'labels': result.get_label_map(),
+                    'statistics': result.statistics}
+        if result.optimizer is not None:
+            response['optimizer_report'] = result.optimizer.report()
+        if result.cycle_analyzer is not None:
+            response['cycle_report'] = result.cycle_analyzer.report(assembler.cycle_budget)
+        return response
+
+    async def handle_connection(self, reader, writer):
+        try:
+            line = await reader.readline()
+            try:
+                message = json.loads(line)
+            except ValueError:
+                message = None
+            command = message.get('command', None) if isinstance(message, dict) else None
+            self.requests += 1
+            if command == 'assemble':
+                async with self.lock:
+                    response = await asyncio.get_running_loop().run_in_executor(None, self.assemble, message)
+            elif command == 'ping':
+                response = {'ok': True, 'message': 'assembler server %s, %d requests, %d cached files' % (__version__, self.requests, len(self.include_cache))}
+            elif command == 'shutdown':
+                response = {'ok': True, 'message': 'assembler server stopped'}
+                self.server.close()
+            else:
+                response = {'ok': False, 'message': 'bad request, command has to be assemble, ping or shutdown', 'diagnostics': list()}
+            writer.write(json.dumps(response).encode('utf-8') + b'\n')
+            await writer.drain()
+        except ConnectionError as e:
+            self.logger.warning('connection lost: %s', e)
+        finally:
+            writer.close()
+
+    def remove_stale_socket(self):
+        '''a socket file without a server behind it is left over from a crash'''
+        if not os.path.exists(self.socket_path):
+            return
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(self.socket_path)
+            except OSError:
+                os.unlink(self.socket_path)
+                return
+        raise Exception('another server is listening on %s' % self.socket_path)
+
+    async def serve(self):
+        if self.socket_path is None:
+            self.socket_path = get_default_socket(create=True)
+        self.remove_stale_socket()
+        self.lock = asyncio.Lock()
+        SunPlus6502Assembler.get_grammar()
+        self.server = await asyncio.start_unix_server(self.handle_connection, path=self.socket_path)
+        # requests run with the rights of the server, nobody else may connect
+        os.chmod(self.socket_path, 0o600)
+        self.logger.info('listening on %s', self.socket_path)
+        try:
+            async with self.server:
+                await self.server.wait_closed()
+        finally:
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def run(self):
+        asyncio.run(self.serve())
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="keep the assembler running and serve requests of AssemblerClient.py")
+    parser.add_argument("-s", "--socket", help="unix socket to listen on, defaults to one in $XDG_RUNTIME_DIR or a private directory")
+    parser.add_argument("--cache_dir", help="directory for the on disk parse cache, disabled if not set")
+    parser.add_argument("--packrat", action="store_true", help="enable packrat memoization of the grammar")
+    parser.add_argument("-l", "--log_level", default="warning", help="set level for logger")
+    args = parser.parse_args()
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.WARNING))
+
+    if args.packrat:
+        SunPlus6502Assembler.enable_packrat()
+    try:
+        AssemblerServer(args.socket, args.cache_dir).run()
+    except KeyboardInterrupt:
+        pass
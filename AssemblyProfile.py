@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import json
+import time
+import logging
+import tracemalloc
+import contextlib
+
+class AssemblyProfile(object):
+    '''wall time per phase, time per parsed file, counters and peak memory of
+    one assembly run. pass an instance to SunPlus6502Assembler to fill it.
+    tracing the memory slows every phase down, so it is off by default and a
+    run with trace_memory should not be used for the times'''
+    def __init__(self, trace_memory=False):
+        self.logger = logging.getLogger(__name__)
+        self.trace_memory = trace_memory
+        self.phases = dict()        # phase name -> seconds, in the order the phases ran
+        self.file_times = dict()    # file path -> seconds, including the files it includes
+        self.counters = dict()
+        self.peak_memory = None     # bytes, None if memory was not traced
+        self.grammar_reported = False   # the grammar is built once per process
+        self.__started_tracing = False
+
+    def reset(self):
+        '''drop the times and counters before the next run, the grammar build
+        is not reported again'''
+        self.phases = dict()
+        self.file_times = dict()
+        self.counters = dict()
+        self.peak_memory = None
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        '''time the code in the with block and add it to the phase name'''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def add_file_time(self, file_path, seconds):
+        self.file_times[file_path] = self.file_times.get(file_path, 0.0) + seconds
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def start_memory(self):
+        '''start tracing allocations, a trace that is already running is reused'''
+        if not self.trace_memory:
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.__started_tracing = True
+        tracemalloc.reset_peak()
+
+    def stop_memory(self):
+        if not self.trace_memory or not tracemalloc.is_tracing():
+            return
+        self.peak_memory = tracemalloc.get_traced_memory()[1]
+        if self.__started_tracing:
+            tracemalloc.stop()
+            self.__started_tracing = False
+
+    def get_total_time(self):
+        return sum(self.phases.values())
+
+    def to_dict(self):
+        return {'phases': self.phases,
+                'files': self.file_times,
+                'counters': self.counters,
+                'total_seconds': self.get_total_time(),
+                'peak_memory': self.peak_memory}
+
+    def write_json(self, file_path):
+        with open(file_path, 'w') as fp:
+            json.dump(self.to_dict(), fp, indent=2)
+        self.logger.info('wrote profile to %s', file_path)
+
+    def report(self):
+        '''returns the profile as a table, one line per entry'''
+        total = self.get_total_time()
+        lines = list()
+        lines.append('{:<40s} {:>10s} {:>6s}'.format('phase', 'ms', '%'))
+        for name, seconds in self.phases.items():
+            lines.append('{:<40s} {:>10.3f} {:>6.1f}'.format(name, seconds * 1000, 100.0 * seconds / total if total else 0.0))
+        lines.append('{:<40s} {:>10.3f}'.format('total', total * 1000))
+        if self.file_times:
+            lines.append('')
+            lines.append('{:<40s} {:>10s}'.format('file', 'ms'))
+            for file_path, seconds in self.file_times.items():
+                lines.append('{:<40s} {:>10.3f}'.format(file_path, seconds * 1000))
+        lines.append('')
+        for name, value in self.counters.items():
+            lines.append('{:<40s} {:>10d}'.format(name, value))
+        lookups = self.counters.get('line_cache_hits', 0) + self.counters.get('line_cache_misses', 0)
+        if lookups:
+            lines.append('{:<40s} {:>10.1f}'.format('line cache hit rate (%)', 100.0 * self.counters['line_cache_hits'] / lookups))
+        if self.peak_memory is not None:
+            lines.append('{:<40s} {:>10.1f}'.format('peak memory (KiB)', self.peak_memory / 1024.0))
+        return lines
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+from ImageEmitter import ImageEmitter
+
+class AssemblyResult(object):
+    '''everything SunPlus6502Assembler.assemble produced for one program'''
+    __slots__ = ('main_asm_file', 'image', 'start_address', 'symbol_table', 'statistics', 'cycle_analyzer', 'profile', 'optimizer')
+    def __init__(self, main_asm_file, image, start_address, symbol_table, statistics, cycle_analyzer=None, profile=None, optimizer=None):
+        self.main_asm_file = main_asm_file
+        self.image = image                  # bytes of the program starting at start_address
+        self.start_address = start_address
+        self.symbol_table = symbol_table    # label name -> (address, file name, line number)
+        self.statistics = statistics        # counters of the assembly run, see SunPlus6502Assembler.assemble
+        self.cycle_analyzer = cycle_analyzer
+        self.profile = profile              # AssemblyProfile if one was passed to the assembler
+        self.optimizer = optimizer          # PeepholeOptimizer with the savings if the assembler optimized
+
+    def __str__(self):
+        return '{:s}: {:d} bytes, {:d} labels'.format(self.main_asm_file, len(self.image), len(self.symbol_table))
+
+    def get_bytes(self):
+        return bytes(self.image)
+
+    def get_label_map(self):
+        '''label name -> address'''
+        return dict((name, symbol[0]) for name, symbol in self.symbol_table.items())
+
+    def write(self, file_path, output_format=None):
+        '''write the image as raw binary, Intel HEX or S-record, see ImageEmitter'''
+        ImageEmitter(self.image, self.start_address).write(file_path, output_format)
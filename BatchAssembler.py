@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import os
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from pySunPlus6502asm import SunPlus6502Assembler, __version__
+from ParseCache import ParseCache
+from ImageEmitter import ImageEmitter
+
+# parsed files of the worker process, targets that share include files only parse them once
+_worker_include_cache = dict()
+_worker_parse_cache = None
+
+
+class BatchTarget(object):
+    '''one program to assemble'''
+    __slots__ = ('input_file', 'output_file')
+    def __init__(self, input_file, output_file=None):
+        self.input_file = input_file
+        self.output_file = output_file
+
+
+class BatchResult(object):
+    '''outcome of assembling one target'''
+    __slots__ = ('input_file', 'output_file', 'ok', 'error', 'seconds')
+    def __init__(self, input_file, output_file, ok, error, seconds):
+        self.input_file = input_file
+        self.output_file = output_file
+        self.ok = ok
+        self.error = error
+        self.seconds = seconds
+
+    def __str__(self):
+        if self.ok:
+            return 'OK   {:8.3f}s {:s} -> {:s}'.format(self.seconds, self.input_file, str(self.output_file))
+        return 'FAIL {:8.3f}s {:s}: {:s}'.format(self.seconds, self.input_file, self.error)
+
+
+def read_manifest(manifest_file):
+    '''one target per line: input file and optional output file separated by
+    whitespace. paths are relative to the manifest, lines starting with # are ignored'''
+    base_dir = os.path.dirname(manifest_file)
+    targets = list()
+    with open(manifest_file, 'r') as fp:
+        for line in fp:
+            fields = line.split()
+            if not fields or fields[0].startswith('#'):
+                continue
+            if len(fields) > 2:
+                raise ValueError('to many fields in manifest line "%s"' % line.strip())
+            output_file = None
+            if len(fields) == 2:
+                output_file = os.path.join(base_dir, fields[1])
+            targets.append(BatchTarget(os.path.join(base_dir, fields[0]), output_file))
+    return targets
+
+
+def default_output_file(input_file, output_format=None):
+    '''the image is written next to the input file'''
+    extension = '.bin'
+    for file_extension, image_format in ImageEmitter.FILE_EXTENSIONS.items():
+        if image_format == output_format:
+            extension = file_extension
+            break
+    return os.path.splitext(input_file)[0] + extension
+
+
+def init_worker(packrat=False, cache_dir=None):
+    '''build the grammar and the caches once per worker process'''
+    global _worker_parse_cache
+    if packrat:
+        SunPlus6502Assembler.enable_packrat()
+    SunPlus6502Assembler.get_grammar()
+    if cache_dir is not None:
+        _worker_parse_cache = ParseCache(cache_dir, __version__)
+
+
+def assemble_target(target, options):
+    '''assemble one target in the current process, errors are returned as part of the result'''
+    output_file = target.output_file
+    if output_file is None:
+        output_file = default_output_file(target.input_file, options.get('output_format', None))
+    start = time.perf_counter()
+    try:
+        assembler = SunPlus6502Assembler(include_cache=_worker_include_cache, parse_cache=_worker_parse_cache, **options)
+        assembler.assemble(target.input_file).write(output_file, options.get('output_format', None))
+    except Exception as e:
+        logging.getLogger(__name__).debug('assembly of %s failed', target.input_file, exc_info=True)
+        return BatchResult(target.input_file, None, False, '%s: %s' % (type(e).__name__, e), time.perf_counter() - start)
+    return BatchResult(target.input_file, output_file, True, None, time.perf_counter() - start)
+
+
+def assemble_batch(targets, jobs=None, packrat=False, cache_dir=None, **options):
+    '''assemble all targets, with more than one job in a pool of worker processes.
+    options are passed on to SunPlus6502Assembler. returns one result per
+    target in the order of the targets'''
+    logger = logging.getLogger(__name__)
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = max(1, min(jobs, len(targets)))
+    logger.info('assembling %d targets with %d jobs', len(targets), jobs)
+
+    if jobs == 1:
+        init_worker(packrat, cache_dir)
+        return [assemble_target(target, options) for target in targets]
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(packrat, cache_dir)) as executor:
+        futures = [executor.submit(assemble_target, target, options) for target in targets]
+        results = list()
+        for future in futures:
+            result = future.result()
+            logger.info('%s', result)
+            results.append(result)
+    return results
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import logging
+from array import array
+from AssemblerInstructions import *
+from DataInstructions import *
+
+class CompactProgram(object):
+    '''struct of arrays representation of a parsed program. every instruction
+    is one row in a set of parallel columns, label definitions point to the
+    row of the instruction that follows them. label operands store the index
+    of the label in the value column until they are replaced. data directives
+    only fill the size column, the objects are kept by row'''
+    # kind of the rows that hold data instead of an instruction
+    KIND_DATA = -1
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.opcode = array('B')
+        self.size = array('L')  # data can be larger than an instruction
+        self.cycles = array('B')
+        self.mode = array('b')  # address type used for the encoding
+        self.kind = array('b')  # address type of the operand, TYPE_LABEL until replaced
+        self.value = array('l')
+        self.line = array('L')
+        self.file = array('L')  # index into file_names
+        self.address = array('L')
+        self.data = dict()  # row -> DataDirective or BinaryInclude
+        self.file_names = list()
+        self.file_index = dict()
+
+        self.label_names = list()
+        self.label_index = dict()
+        self.label_row = array('l')  # -1 if the label is used but not defined
+        self.label_line = array('L')
+        self.label_file = array('L')
+        self.duplicate_labels = list()  # (name, file name, line number)
+
+    def __len__(self):
+        return len(self.opcode)
+
+    @staticmethod
+    def from_instructions(instructions):
+        '''build the columns from the list of objects returned by parse_file'''
+        program = CompactProgram()
+        for instr in instructions:
+            program.append(instr)
+        return program
+
+    def append(self, instr):
+        '''add a label, instruction or data object as the next row. only data
+        objects are kept, the others can be dropped afterwards'''
+        if isinstance(instr, Label):
+            self.append_label(instr.get_name(), instr.get_file_name(), instr.get_line_number())
+        elif isinstance(instr, AssemblyInstruction):
+            self.append_instruction(instr)
+        elif isinstance(instr, DATA_TYPES):
+            self.append_data(instr)
+        else:
+            raise Exception('unknow type encountered {:s}'.format(str(instr)))
+
+    def get_label_index(self, name):
+        index = self.label_index.get(name, None)
+        if index is None:
+            index = len(self.label_names)
+            self.label_index[name] = index
+            self.label_names.append(name)
+            self.label_row.append(-1)
+            self.label_line.append(0)
+            self.label_file.append(0)
+        return index
+
+    def get_file_index(self, file_name):
+        index = self.file_index.get(file_name, None)
+        if index is None:
+            index = len(self.file_names)
+            self.file_index[file_name] = index
+            self.file_names.append(file_name)
+        return index
+
+    def get_source(self, row):
+        '''file name and line number of a row'''
+        return self.file_names[self.file[row]], self.line[row]
+
+    def get_label_source(self, name):
+        '''file name and line number of the definition of a label'''
+        index = self.label_index[name]
+        return self.file_names[self.label_file[index]], self.label_line[index]
+
+    def append_label(self, name, file_name, line_number):
+        index = self.get_label_index(name)
+        if self.label_row[index] != -1:
+            self.duplicate_labels.append((name, file_name, line_number))
+            return
+        self.label_row[index] = len(self.opcode)
+        self.label_line[index] = line_number or 0
+        self.label_file[index] = self.get_file_index(file_name)
+
+    def append_instruction(self, instr):
+        operand = instr.get_operand()
+        if operand is None:
+            kind, value = instr.get_address_type(), 0
+        elif isinstance(operand, int):
+            kind, value = AddressValue.TYPE_IMMEDIATE, operand
+        elif operand.get_type() == AddressValue.TYPE_LABEL:
+            kind, value = AddressValue.TYPE_LABEL, self.get_label_index(operand.get_value())
+        elif operand.get_type() == AddressValue.TYPE_ACCUMULATOR:
+            kind, value = AddressValue.TYPE_ACCUMULATOR, 0
+        else:
+            kind, value = operand.get_type(), operand.get_value()
+        self.opcode.append(instr.get_opcode())
+        self.size.append(instr.get_num_bytes())
+        self.cycles.append(instr.get_cycles())
+        self.mode.append(instr.get_address_type())
+        self.kind.append(kind)
+        self.value.append(value)
+        self.line.append(instr.get_line_number() or 0)
+        self.file.append(self.get_file_index(instr.get_file_name()))
+
+    def append_data(self, instr):
+        for name in instr.get_label_names():
+            # only registered so check_labels finds labels that are not defined
+            self.get_label_index(name)
+        self.data[len(self.opcode)] = instr
+        self.opcode.append(0)
+        self.size.append(instr.get_num_bytes())
+        self.cycles.append(0)
+        self.mode.append(self.KIND_DATA)
+        self.kind.append(self.KIND_DATA)
+        self.value.append(0)
+        self.line.append(instr.get_line_number() or 0)
+        self.file.append(self.get_file_index(instr.get_file_name()))
+
+    def check_labels(self):
+        '''report dublicate definitions and labels that are used but not defined,
+        with the same messages as SunPlus6502Assembler.resolve_labels'''
+        errors = list()
+        for name, file_name, line_number in self.duplicate_labels:
+            errors.append('multible definitions for label %s at %s:%s, first defined at %s:%s' % ((name, file_name, line_number) + self.get_label_source(name)))
+        label_row = self.label_row
+        if -1 in label_row:
+            kind, value = self.kind, self.value
+            for row in range(len(kind)):
+                if kind[row] == AddressValue.TYPE_LABEL and label_row[value[row]] == -1:
+                    names = [self.label_names[value[row]]]
+                elif kind[row] == self.KIND_DATA:
+                    names = [name for name in self.data[row].get_label_names() if label_row[self.label_index[name]] == -1]
+                else:
+                    continue
+                for name in names:
+                    errors.append('label %s used but not defined at %s:%s' % ((name,) + self.get_source(row)))
+        if errors:
+            for error in errors:
+                self.logger.error(error)
+            raise Exception(errors[0] if len(errors) == 1 else '%d label errors, first: %s' % (len(errors), errors[0]))
+        self.logger.info('found %d label definitions', len(self.label_names))
+
+    def calculate_label_pos(self, start_address=0x00):
+        '''fill the address column and return the address of every label'''
+        addr = start_address
+        address = array('L')
+        for size in self.size:
+            address.append(addr)
+            addr += size
+        self.address = address
+        label_addr = dict()
+        for index, row in enumerate(self.label_row):
+            label_addr[self.label_names[index]] = address[row] if row < len(address) else addr
+        self.logger.info('assigned %d labels, program length is %04X', len(label_addr), addr - start_address)
+        return label_addr
+
+    def replace_label(self, label_addr_map):
+        '''replace the label index in the value column with the address of the label'''
+        kind = self.kind
+        value = self.value
+        for row in range(len(kind)):
+            if kind[row] != AddressValue.TYPE_LABEL:
+                continue
+            target = label_addr_map[self.label_names[value[row]]]
+            if self.mode[row] == AddressValue.TYPE_RELATIVE:
+                offset = target - (self.address[row] + self.size[row])
+                if offset < -128 or offset > 127:
+                    raise ValueError('branch target {:04X}h out of range for instruction at {:04X}h'.format(target, self.address[row]))
+                value[row] = offset & 0xFF
+            else:
+                value[row] = target
+            kind[row] = self.mode[row]
+        for instr in self.data.values():
+            instr.replace_labels(label_addr_map)
+
+    def to_image(self, start_address=0x00):
+        '''encode all rows into one buffer, the operand is little endian'''
+        if len(self.address) == 0:
+            return bytearray()
+        image = bytearray(self.address[-1] + self.size[-1] - start_address)
+        opcode, size, value, address, kind = self.opcode, self.size, self.value, self.address, self.kind
+        for row in range(len(opcode)):
+            if kind[row] == self.KIND_DATA:
+                continue
+            offset = address[row] - start_address
+            image[offset] = opcode[row]
+            if size[row] == 2:
+                if value[row] > 0xFF:
+                    raise ValueError('operand value to big for op code')
+                image[offset + 1] = value[row]
+            elif size[row] == 3:
+                if value[row] > 0xFFFF:
+                    raise ValueError('operand value to big for op code')
+                image[offset + 1] = value[row] & 0xFF
+                image[offset + 2] = value[row] >> 8
+        for row, instr in self.data.items():
+            instr.encode_into(image, address[row] - start_address)
+        return image
+
+    def to_bin(self, row):
+        size = self.size[row]
+        if self.kind[row] == self.KIND_DATA:
+            data = bytearray(size)
+            self.data[row].encode_into(data, 0)
+            return data.hex().upper()
+        if size == 1:
+            return '{:02X}'.format(self.opcode[row])
+        elif size == 2:
+            if self.value[row] > 0xFF:
+                raise ValueError('operand value to big for op code')
+            return '{:02X}{:02X}'.format(self.opcode[row], self.value[row])
+        elif size == 3:
+            return '{:02X}{:04X}'.format(self.opcode[row], self.value[row])
+        else:
+            raise ValueError('unexpected number of bytes for operation')
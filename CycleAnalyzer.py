@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import logging
+from AssemblerInstructions import *
+from DataInstructions import *
+
+class Block(object):
+    '''straight line code from a label up to the next label'''
+    __slots__ = ('label', 'address', 'instructions', 'num_bytes', 'cycles', 'path_cycles', 'exits',
+                 'best_cycles', 'worst_cycles', 'falls_through')
+    def __init__(self, label, address):
+        self.label = label
+        self.address = address
+        self.instructions = list()
+        self.num_bytes = 0
+        self.cycles = 0          # every instruction once, branches not taken
+        self.path_cycles = 0     # cycles up to the current instruction if no branch is taken
+        self.exits = list()      # cycles spent for every way out of the block
+        self.best_cycles = 0
+        self.worst_cycles = 0
+        self.falls_through = True
+
+
+class Routine(object):
+    '''blocks from an entry point up to the next entry point'''
+    __slots__ = ('label', 'address', 'blocks', 'num_bytes', 'cycles', 'worst_cycles')
+    def __init__(self, label, address):
+        self.label = label
+        self.address = address
+        self.blocks = list()
+        self.num_bytes = 0
+        self.cycles = 0
+        self.worst_cycles = 0
+
+
+class CycleAnalyzer(object):
+    '''static timing analysis of a program after label resolution.
+
+    the cycle counts come from the opcode table. a taken branch costs one
+    extra cycle and another one if the target is on a different page. for
+    a routine the worst case adds up the worst case of its blocks, so loops
+    are counted once'''
+    TERMINATING_INSTRUCTIONS = frozenset([AssemblyInstruction.INSTRUCTION_JMP,
+                                          AssemblyInstruction.INSTRUCTION_RTS,
+                                          AssemblyInstruction.INSTRUCTION_RTI])
+
+    def __init__(self, instructions, start_address=0x00):
+        self.logger = logging.getLogger(__name__)
+        self.blocks = self.split_blocks(instructions, start_address)
+        self.routines = self.group_routines(self.blocks)
+
+    @staticmethod
+    def branch_penalty(instr):
+        '''extra cycles if the branch is taken'''
+        offset = instr.get_operand().get_value()
+        if offset > 0x7F:
+            offset -= 0x100
+        next_address = instr.get_address() + instr.get_num_bytes()
+        if (next_address + offset) >> 8 != next_address >> 8:
+            return 2
+        return 1
+
+    def split_blocks(self, instructions, start_address=0x00):
+        blocks = list()
+        block = Block(None, start_address)
+        address = start_address
+        for instr in instructions:
+            if isinstance(instr, Label):
+                if block.instructions or block.label is not None:
+                    self.close_block(block)
+                    blocks.append(block)
+                block = Block(instr.get_name(), address)
+            elif isinstance(instr, AssemblyInstruction):
+                if not block.instructions:
+                    block.address = instr.get_address()
+                self.add_instruction(block, instr)
+                address = instr.get_address() + instr.get_num_bytes()
+            elif isinstance(instr, DATA_TYPES):
+                # data is never executed, it only moves the address of the next label
+                address = instr.get_address() + instr.get_num_bytes()
+        if block.instructions or block.label is not None:
+            self.close_block(block)
+            blocks.append(block)
+        return blocks
+
+    def add_instruction(self, block, instr):
+        cycles = instr.get_cycles()
+        block.instructions.append(instr)
+        block.num_bytes += instr.get_num_bytes()
+        block.cycles += cycles
+        if not block.falls_through:
+            # unreachable code behind a jump or return only counts for the block cost
+            return
+        if instr.get_instruction() in BRANCH_INSTRUCTIONS:
+            block.exits.append(block.path_cycles + cycles + self.branch_penalty(instr))
+        block.path_cycles += cycles
+        if instr.get_instruction() in self.TERMINATING_INSTRUCTIONS:
+            block.falls_through = False
+            block.exits.append(block.path_cycles)
+
+    @staticmethod
+    def close_block(block):
+        if block.falls_through:
+            block.exits.append(block.path_cycles)
+        block.best_cycles = min(block.exits)
+        block.worst_cycles = max(block.exits)
+
+    def group_routines(self, blocks):
+        '''a routine starts at the beginning of the program, at every target of a
+        JSR and at every label that can not be reached by falling through'''
+        call_targets = set()
+        for block in blocks:
+            for instr in block.instructions:
+                if instr.get_instruction() == AssemblyInstruction.INSTRUCTION_JSR:
+                    call_targets.add(instr.get_operand().get_value())
+
+        routines = list()
+        routine = None
+        previous = None
+        for block in blocks:
+            if routine is None or block.address in call_targets or not previous.falls_through:
+                routine = Routine(block.label, block.address)
+                routines.append(routine)
+            routine.blocks.append(block)
+            routine.num_bytes += block.num_bytes
+            routine.cycles += block.cycles
+            routine.worst_cycles += block.worst_cycles
+            previous = block
+        return routines
+
+    def get_hot_routines(self, cycle_budget):
+        '''routines whose worst case exceeds the budget'''
+        return [routine for routine in self.routines if routine.worst_cycles > cycle_budget]
+
+    def report(self, cycle_budget=None):
+        '''returns the timing report as a list of lines'''
+        lines = list()
+        lines.append('{:<32s} {:>7s} {:>6s} {:>7s} {:>6s} {:>6s}'.format('block', 'address', 'bytes', 'cycles', 'best', 'worst'))
+        for block in self.blocks:
+            lines.append('{:<32s} {:>6s}h {:>6d} {:>7d} {:>6d} {:>6d}'.format(
+                block.label or '<start>', '{:04X}'.format(block.address), block.num_bytes, block.cycles, block.best_cycles, block.worst_cycles))
+        lines.append('')
+        lines.append('{:<32s} {:>7s} {:>6s} {:>7s} {:>6s} {:>6s}'.format('routine', 'address', 'bytes', 'cycles', 'blocks', 'worst'))
+        for routine in self.routines:
+            flag = ''
+            if cycle_budget is not None and routine.worst_cycles > cycle_budget:
+                flag = ' over budget of %d cycles' % cycle_budget
+            lines.append('{:<32s} {:>6s}h {:>6d} {:>7d} {:>6d} {:>6d}{:s}'.format(
+                routine.label or '<start>', '{:04X}'.format(routine.address), routine.num_bytes, routine.cycles, len(routine.blocks), routine.worst_cycles, flag))
+        return lines
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import os
+import mmap
+import logging
+
+class DataDirective(object):
+    '''DB, DW and DS. the values of DB and DW are ints, bytes for strings or
+    label names that are replaced by the address of the label. DS has the
+    number of bytes and the fill value'''
+    DIRECTIVE_DB = 'DB'
+    DIRECTIVE_DW = 'DW'
+    DIRECTIVE_DS = 'DS'
+    MAX_VALUES = {DIRECTIVE_DB: 0xFF, DIRECTIVE_DW: 0xFFFF}
+
+    __slots__ = ('__label', '__directive', '__values', '__address', '__file_name', '__line_number', '__num_bytes')
+
+    def __init__(self, label, directive, values):
+        self.__label = label
+        self.__directive = directive
+        self.__values = list(values)
+        self.__address = None
+        self.__file_name = None
+        self.__line_number = None
+        if directive == self.DIRECTIVE_DS:
+            if len(self.__values) != 2 or not all(isinstance(value, int) for value in self.__values) or \
+                    self.__values[0] < 0 or not 0 <= self.__values[1] <= 0xFF:
+                raise ValueError('DS needs the number of bytes and a fill value up to 0xFF')
+            self.__num_bytes = self.__values[0]
+            return
+        if directive not in self.MAX_VALUES:
+            raise ValueError('unknown data directive %s' % directive)
+        for value in self.__values:
+            if isinstance(value, int) and not 0 <= value <= self.MAX_VALUES[directive]:
+                raise ValueError('value {:d} out of range for {:s}'.format(value, directive))
+        if directive == self.DIRECTIVE_DB:
+            self.__num_bytes = sum(len(value) if isinstance(value, bytes) else 1 for value in self.__values)
+        else:
+            self.__num_bytes = 2 * len(self.__values)
+
+    def __str__(self):
+        return '{:s} {:s}'.format(self.__directive, ','.join(str(value) for value in self.__values))
+
+    def get_label(self):
+        return self.__label
+
+    def get_directive(self):
+        return self.__directive
+
+    def get_values(self):
+        return self.__values
+
+    def get_num_bytes(self):
+        return self.__num_bytes
+
+    def get_address(self):
+        return self.__address
+
+    def set_address(self, address):
+        self.__address = address
+
+    def set_source(self, file_name, line_number):
+        self.__file_name = file_name
+        self.__line_number = line_number
+
+    def get_file_name(self):
+        return self.__file_name
+
+    def get_line_number(self):
+        return self.__line_number
+
+    def get_label_names(self):
+        '''labels that still have to be replaced'''
+        return [value for value in self.__values if isinstance(value, str)]
+
+    def replace_labels(self, label_addr_map):
+        '''replace label names with their address. the list is replaced, not
+        changed, copies of this object share it. returns the missing labels'''
+        missing = [value for value in self.__values if isinstance(value, str) and value not in label_addr_map]
+        self.__values = [label_addr_map.get(value, value) if isinstance(value, str) else value for value in self.__values]
+        return missing
+
+    def encode_into(self, buffer, offset):
+        '''write the data to buffer, words are little endian'''
+        if self.__directive == self.DIRECTIVE_DS:
+            buffer[offset:offset + self.__num_bytes] = bytes((self.__values[1],)) * self.__num_bytes
+            return
+        maximum = self.MAX_VALUES[self.__directive]
+        for value in self.__values:
+            if isinstance(value, bytes):
+                buffer[offset:offset + len(value)] = value
+                offset += len(value)
+                continue
+            if isinstance(value, str):
+                raise ValueError('label %s was not replaced' % value)
+            if value > maximum:
+                raise ValueError('value {:04X}h to big for {:s}'.format(value, self.__directive))
+            buffer[offset] = value & 0xFF
+            if self.__directive == self.DIRECTIVE_DW:
+                buffer[offset + 1] = value >> 8
+                offset += 2
+            else:
+                offset += 1
+
+
+class BinaryInclude(object):
+    '''INCBIN, a part of a binary file is copied into the image as it is. the
+    size is taken from the file once the path is known, the bytes are only
+    read when the image is encoded, through mmap without parsing them'''
+    __slots__ = ('__label', '__filename', '__offset', '__length', '__path', '__address', '__file_name', '__line_number', '__num_bytes')
+
+    def __init__(self, label, filename, offset=0, length=None):
+        if not isinstance(offset, int) or not (length is None or isinstance(length, int)):
+            raise ValueError('INCBIN %s: offset and length have to be numbers' % filename)
+        self.__label = label
+        self.__filename = str(filename)
+        self.__offset = offset
+        self.__length = length
+        self.__path = None
+        self.__address = None
+        self.__file_name = None
+        self.__line_number = None
+        self.__num_bytes = 0
+
+    def __str__(self):
+        return 'INCBIN "{:s}",{:d},{:s}'.format(self.__filename, self.__offset, str(self.__length))
+
+    def get_label(self):
+        return self.__label
+
+    def get_filename(self):
+        return self.__filename
+
+    def get_offset(self):
+        return self.__offset
+
+    def get_length(self):
+        return self.__length
+
+    def get_path(self):
+        return self.__path
+
+    def set_path(self, path):
+        '''set the resolved path of the binary file and take the size from it'''
+        size = os.path.getsize(path)
+        length = size - self.__offset if self.__length is None else self.__length
+        if self.__offset < 0 or length < 0 or self.__offset + length > size:
+            raise ValueError('INCBIN %s: offset %d and length %d do not fit into the %d bytes of the file'
+                             % (self.__filename, self.__offset, length, size))
+        self.__path = path
+        self.__num_bytes = length
+
+    def get_num_bytes(self):
+        return self.__num_bytes
+
+    def get_address(self):
+        return self.__address
+
+    def set_address(self, address):
+        self.__address = address
+
+    def set_source(self, file_name, line_number):
+        self.__file_name = file_name
+        self.__line_number = line_number
+
+    def get_file_name(self):
+        return self.__file_name
+
+    def get_line_number(self):
+        return self.__line_number
+
+    def get_label_names(self):
+        return []
+
+    def replace_labels(self, label_addr_map):
+        return []
+
+    def encode_into(self, buffer, offset):
+        '''copy the bytes from the mapped file straight into buffer'''
+        length = self.__num_bytes
+        if length == 0:
+            return
+        with open(self.__path, 'rb') as fp:
+            with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if len(mapped) < self.__offset + length:
+                    raise ValueError('INCBIN %s: the file got shorter since it was included' % self.__filename)
+                with memoryview(mapped) as view:
+                    with view[self.__offset:self.__offset + length] as part:
+                        buffer[offset:offset + length] = part
+        logging.getLogger(__name__).debug('copied %d bytes of %s to offset %04X', length, self.__path, offset)
+
+
+# everything that takes up bytes in the image but is not an instruction
+DATA_TYPES = (DataDirective, BinaryInclude)
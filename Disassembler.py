@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import sys
+import time
+import logging
+from AssemblerInstructions import *
+
+class Disassembler(object):
+    '''table driven disassembler for SunPlus ROM images. the image is walked
+    through a memoryview, every byte is looked up in DECODE_TABLE. targets of
+    branches, JMP and JSR inside the image get generated labels. address and
+    bytes of every line are in the comment. bytes that do not decode become
+    DB lines, as do instructions the assembler would read back with another
+    address type. so if every branch target got a label the listing can be
+    assembled again'''
+    # operand syntax of the assembler for each address type, the value is hex
+    OPERAND_FORMATS = {
+        AddressValue.TYPE_IMMEDIATE: '#${:02X}',
+        AddressValue.TYPE_ZERO_PAGED: '$#${:02X}',
+        AddressValue.TYPE_ZERO_PAGED_INDEXED_X: '$#${:02X},X',
+        AddressValue.TYPE_ZERO_PAGED_INDEXED_Y: '$#${:02X},Y',
+        AddressValue.TYPE_ABSOLUTE: '$#${:04X}',
+        AddressValue.TYPE_ABSOLUTE_INDEXED_X: '$#${:04X},X',
+        AddressValue.TYPE_ABSOLUTE_INDEXED_Y: '$#${:04X},Y',
+        AddressValue.TYPE_INDEXED_INDIRECT: '($#${:02X},X)',
+        AddressValue.TYPE_INDIRECT_INDEXED: '($#${:02X}),Y',
+        AddressValue.TYPE_INDIRECT: '($#${:04X})',
+        # branch targets without a label, outside the image or inside another
+        # instruction. the assembler only takes labels for branches
+        AddressValue.TYPE_RELATIVE: '$#${:04X}',
+    }
+    JUMP_INSTRUCTIONS = frozenset([AssemblyInstruction.INSTRUCTION_JMP, AssemblyInstruction.INSTRUCTION_JSR])
+    # the assembler picks the address type from the value, not from the syntax. these are
+    # read back as the other type if the instruction has it: address type -> (other type, only if value is below 0x100)
+    AMBIGUOUS_TYPES = {
+        AddressValue.TYPE_ABSOLUTE: (AddressValue.TYPE_ZERO_PAGED, True),
+        AddressValue.TYPE_ABSOLUTE_INDEXED_X: (AddressValue.TYPE_ZERO_PAGED_INDEXED_X, True),
+        AddressValue.TYPE_ZERO_PAGED_INDEXED_Y: (AddressValue.TYPE_ABSOLUTE_INDEXED_Y, False),
+    }
+
+    def __init__(self, image, start_address=0x00):
+        self.logger = logging.getLogger(__name__)
+        self.image = memoryview(image)
+        self.start_address = start_address
+        self.instructions = list()  # (address, decode table entry, operand value), entry is None for data bytes
+        self.labels = dict()        # address -> label name
+        self.decode()
+
+    def decode(self):
+        '''first pass, split the image into instructions and collect jump targets'''
+        view = self.image
+        decode_table = DECODE_TABLE
+        instructions = self.instructions
+        targets = set()
+        end = len(view)
+        offset = 0
+        while offset < end:
+            address = self.start_address + offset
+            entry = decode_table[view[offset]]
+            if entry is None or offset + entry[2] > end:
+                # unknown opcode or an instruction cut off at the end of the image
+                instructions.append((address, None, view[offset]))
+                offset += 1
+                continue
+            num_bytes = entry[2]
+            if num_bytes == 1:
+                value = None
+            elif num_bytes == 2:
+                value = view[offset + 1]
+            else:
+                value = view[offset + 1] | (view[offset + 2] << 8)
+            if entry[1] == AddressValue.TYPE_RELATIVE:
+                # the offset is relative to the next instruction, store the target instead
+                value = (address + 2 + (value - 0x100 if value > 0x7F else value)) & 0xFFFF
+                targets.add(value)
+            elif entry[1] == AddressValue.TYPE_ABSOLUTE and entry[0] in self.JUMP_INSTRUCTIONS:
+                targets.add(value)
+            instructions.append((address, entry, value))
+            offset += num_bytes
+
+        # labels can only be placed at the start of an instruction
+        starts = set(instr[0] for instr in instructions if instr[1] is not None)
+        for target in sorted(targets & starts):
+            self.labels[target] = 'L_{:04X}'.format(target)
+        self.logger.info('decoded %d instructions, %d labels', len(instructions), len(self.labels))
+
+    def format_operand(self, entry, value):
+        address_type = entry[1]
+        if address_type == AddressValue.TYPE_IMPLIED:
+            return ''
+        if address_type == AddressValue.TYPE_ACCUMULATOR:
+            return ' A'
+        if address_type == AddressValue.TYPE_RELATIVE or (address_type == AddressValue.TYPE_ABSOLUTE and entry[0] in self.JUMP_INSTRUCTIONS):
+            label = self.labels.get(value, None)
+            if label is not None:
+                return ' ' + label
+        return ' ' + self.OPERAND_FORMATS[address_type].format(value)
+
+    def is_ambiguous(self, entry, value):
+        '''True if the assembler would read the formatted instruction back with
+        another address type and so with other bytes'''
+        ambiguous = self.AMBIGUOUS_TYPES.get(entry[1], None)
+        if ambiguous is None:
+            return False
+        other_type, only_zero_page = ambiguous
+        if only_zero_page and value > 0xFF:
+            return False
+        if entry[0] in self.JUMP_INSTRUCTIONS and value in self.labels:
+            return False
+        return (entry[0], other_type) in OPCODE_TABLE
+
+    def listing(self):
+        '''returns the disassembly as a list of lines'''
+        view = self.image
+        start_address = self.start_address
+        mnemonics = AssemblyInstruction.MNEMONICS
+        labels = self.labels
+        lines = list()
+        for address, entry, value in self.instructions:
+            label = labels.get(address, None)
+            if label is not None:
+                lines.append(label + ':')
+            offset = address - start_address
+            if entry is None:
+                lines.append('{:<24s};{:04X}: {:02X} unknown opcode'.format('    DB #${:02X}'.format(value), address, value))
+                continue
+            code = view[offset:offset + entry[2]].hex(' ').upper()
+            text = '    ' + mnemonics[entry[0]] + self.format_operand(entry, value)
+            if self.is_ambiguous(entry, value):
+                # there is no syntax to force the address type, keep the bytes
+                data = '    DB ' + ','.join('#${:02X}'.format(byte) for byte in view[offset:offset + entry[2]])
+                lines.append('{:<24s};{:04X}: {:s} {:s}'.format(data, address, code, text.strip()))
+                continue
+            lines.append('{:<24s};{:04X}: {:s}'.format(text, address, code))
+        return lines
+
+    def write(self, file_path):
+        with open(file_path, 'w') as fp:
+            fp.write('\n'.join(self.listing()) + '\n')
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input", help="raw binary ROM image")
+    parser.add_argument("-s", "--start_address", type=lambda text: int(text, 0), default=0x00, help="address of the first byte, e.g. 0xC000")
+    parser.add_argument("-o", "--output", help="file for the listing, printed if not set")
+    parser.add_argument("-l", "--log_level", default="warning", help="set level for logger")
+    args = parser.parse_args()
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.WARNING))
+
+    with open(args.input, 'rb') as fp:
+        image = fp.read()
+    start = time.perf_counter()
+    disassembler = Disassembler(image, args.start_address)
+    if args.output is not None:
+        disassembler.write(args.output)
+    else:
+        sys.stdout.write('\n'.join(disassembler.listing()) + '\n')
+    logging.getLogger(__name__).info('disassembled %d bytes in %.3f s', len(image), time.perf_counter() - start)
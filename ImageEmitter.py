@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import os
+import binascii
+import logging
+from AssemblerInstructions import *
+from DataInstructions import *
+
+class ImageEmitter(object):
+    '''writes the assembled program as raw binary, Intel HEX or Motorola S-record'''
+    FORMAT_BINARY = 'bin'
+    FORMAT_INTEL_HEX = 'ihex'
+    FORMAT_S_RECORD = 'srec'
+
+    FILE_EXTENSIONS = {'.bin': FORMAT_BINARY, '.rom': FORMAT_BINARY,
+                       '.hex': FORMAT_INTEL_HEX, '.ihx': FORMAT_INTEL_HEX,
+                       '.srec': FORMAT_S_RECORD, '.s19': FORMAT_S_RECORD, '.mot': FORMAT_S_RECORD}
+
+    RECORD_LENGTH = 16
+
+    def __init__(self, image, start_address=0x00):
+        self.logger = logging.getLogger(__name__)
+        self.image = image
+        self.start_address = start_address
+
+    @staticmethod
+    def from_compact_program(program, start_address=0x00):
+        '''same as from_instructions for a CompactProgram after replace_label'''
+        return ImageEmitter(program.to_image(start_address), start_address)
+
+    @staticmethod
+    def from_instructions(instructions, start_address=0x00):
+        '''encode every instruction at its resolved address into one preallocated buffer'''
+        encoded_types = (AssemblyInstruction,) + DATA_TYPES
+        end_address = start_address
+        for instr in instructions:
+            if isinstance(instr, encoded_types):
+                end_address = max(end_address, instr.get_address() + instr.get_num_bytes())
+        image = bytearray(end_address - start_address)
+        for instr in instructions:
+            if isinstance(instr, encoded_types):
+                instr.encode_into(image, instr.get_address() - start_address)
+        return ImageEmitter(image, start_address)
+
+    def append(self, instr):
+        '''add the next instruction to the end of the image. the bytes of an
+        instruction with an unresolved label are reserved and filled in by encode'''
+        offset = instr.get_address() - self.start_address
+        if offset != len(self.image):
+            raise ValueError('instruction at {:04X}h does not follow the end of the image'.format(instr.get_address()))
+        self.image.extend(bytes(instr.get_num_bytes()))
+        if isinstance(instr, DATA_TYPES):
+            if instr.get_label_names():
+                return
+        else:
+            operand = instr.get_operand()
+            if isinstance(operand, AddressValue) and operand.get_type() == AddressValue.TYPE_LABEL:
+                return
+        instr.encode_into(self.image, offset)
+
+    def encode(self, instr):
+        '''(re)encode an instruction that is already part of the image'''
+        instr.encode_into(self.image, instr.get_address() - self.start_address)
+
+    @staticmethod
+    def format_from_path(file_path):
+        extension = os.path.splitext(file_path)[1].lower()
+        return ImageEmitter.FILE_EXTENSIONS.get(extension, ImageEmitter.FORMAT_BINARY)
+
+    def write(self, file_path, output_format=None):
+        if output_format is None:
+            output_format = self.format_from_path(file_path)
+        if output_format == self.FORMAT_BINARY:
+            data = self.image
+        elif output_format == self.FORMAT_INTEL_HEX:
+            data = self.to_intel_hex()
+        elif output_format == self.FORMAT_S_RECORD:
+            data = self.to_s_record()
+        else:
+            raise ValueError('unknown output format %s' % output_format)
+        with open(file_path, 'wb') as fp:
+            fp.write(data)
+        self.logger.info('wrote %d bytes of program to %s as %s', len(self.image), file_path, output_format)
+
+    @staticmethod
+    def hex_record(record):
+        '''upper case hex digits of the record bytes'''
+        return binascii.hexlify(bytes(record)).upper()
+
+    def to_intel_hex(self):
+        lines = list()
+        view = memoryview(self.image)
+        upper = 0
+        offset = 0
+        while offset < len(view):
+            address = self.start_address + offset
+            if address >> 16 != upper:
+                # extended linear address record for everything above 64K
+                upper = address >> 16
+                lines.append(self.intel_hex_line(0, 0x04, upper.to_bytes(2, 'big')))
+            # a record must not cross a 64K boundary, its address would wrap around
+            length = min(self.RECORD_LENGTH, 0x10000 - (address & 0xFFFF))
+            lines.append(self.intel_hex_line(address & 0xFFFF, 0x00, view[offset:offset + length]))
+            offset += length
+        lines.append(self.intel_hex_line(0, 0x01, b''))
+        return b''.join(lines)
+
+    def intel_hex_line(self, address, record_type, data):
+        record = bytearray((len(data), address >> 8, address & 0xFF, record_type))
+        record += data
+        record.append(-sum(record) & 0xFF)
+        return b':' + self.hex_record(record) + b'\n'
+
+    def to_s_record(self):
+        if self.start_address + len(self.image) > 0x10000:
+            raise ValueError('S1 records can only address 64K')
+        lines = list()
+        lines.append(self.s_record_line(b'S0', 0, b'pySunPlus6502asm'))
+        view = memoryview(self.image)
+        for offset in range(0, len(view), self.RECORD_LENGTH):
+            lines.append(self.s_record_line(b'S1', self.start_address + offset, view[offset:offset + self.RECORD_LENGTH]))
+        lines.append(self.s_record_line(b'S9', self.start_address, b''))
+        return b''.join(lines)
+
+    def s_record_line(self, record_type, address, data):
+        record = bytearray((len(data) + 3, (address >> 8) & 0xFF, address & 0xFF))
+        record += data
+        record.append(~sum(record) & 0xFF)
+        return record_type + self.hex_record(record) + b'\n'
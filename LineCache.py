@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import re
+import copy
+import logging
+from collections import OrderedDict
+from AssemblerInstructions import *
+
+class LineCache(object):
+    '''bounded LRU cache for parsed source lines, keyed by the line with its
+    whitespace normalized. only instructions without a label are stored, every
+    lookup returns a new copy so later steps can modify the object without
+    changing other lines'''
+    DEFAULT_SIZE = 4096
+    # lines with a label, includes and data directives are never stored
+    RE_UNCACHEABLE = re.compile(r'[^;]*:|(?i:include|incbin|db|dw|ds)(?![A-Za-z0-9_])')
+
+    def __init__(self, max_size=DEFAULT_SIZE):
+        self.logger = logging.getLogger(__name__)
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def is_cacheable(line):
+        '''false for stripped lines whose parsed object put would not store, they
+        are not looked up and do not count as misses'''
+        return line[0] != ';' and LineCache.RE_UNCACHEABLE.match(line) is None
+
+    @staticmethod
+    def get_key(line):
+        return ' '.join(line.split())
+
+    def get(self, key):
+        '''returns a copy of the cached instruction or None'''
+        instr = self.entries.get(key, None)
+        if instr is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return copy.copy(instr)
+
+    def put(self, key, instr):
+        '''store a copy of instr if it can be shared between lines'''
+        if not isinstance(instr, AssemblyInstruction) or instr.get_label() is not None:
+            return
+        self.entries[key] = copy.copy(instr)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def get_hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        self.entries.clear()
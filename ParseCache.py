@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import os
+import hashlib
+import logging
+import marshal
+import tempfile
+from AssemblerInstructions import *
+from PreProcessInstructions import *
+from DataInstructions import *
+
+class ParseCache(object):
+    '''on disk cache for the parsed content of single files. entries are keyed
+    by the hash of the file content, the assembler version, the record format
+    and the instruction tables. include statements are stored as such, so
+    every file is cached on its own'''
+    # change when the layout of the records changes
+    FORMAT_VERSION = 3
+    FILE_EXTENSION = '.parsed'
+
+    RECORD_LABEL = 0
+    RECORD_INSTRUCTION = 1
+    RECORD_INCLUDE = 2
+    RECORD_DATA = 3
+    RECORD_BINARY = 4
+
+    def __init__(self, cache_dir, assembler_version):
+        self.logger = logging.getLogger(__name__)
+        self.cache_dir = cache_dir
+        self.assembler_version = str(assembler_version)
+        self.table_digest = self.get_table_digest()
+        self.hits = 0
+        self.misses = 0
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+    @staticmethod
+    def get_table_digest():
+        '''records store the instruction and address type numbers, entries
+        written with a different mnemonic or opcode table must not be used'''
+        digest = hashlib.sha256()
+        digest.update(repr(sorted(AssemblyInstruction.KNOWN_INSTRUCTIONS.items())).encode('ascii'))
+        digest.update(repr(sorted(OPCODE_TABLE.items())).encode('ascii'))
+        return digest.hexdigest()[:16]
+
+    def get_key(self, content):
+        '''the key changes with the content, the assembler, the cache format and the instruction tables'''
+        digest = hashlib.sha256()
+        digest.update(('%s:%d:%d:%s\0' % (self.assembler_version, self.FORMAT_VERSION, marshal.version,
+                                           self.table_digest)).encode('ascii'))
+        digest.update(content)
+        return digest.hexdigest()
+
+    def get_path(self, key):
+        return os.path.join(self.cache_dir, key + self.FILE_EXTENSION)
+
+    def load(self, key):
+        '''returns the list of records stored for key or None'''
+        try:
+            with open(self.get_path(key), 'rb') as fp:
+                records = marshal.load(fp)
+        except (OSError, EOFError, ValueError, TypeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return records
+
+    def store(self, key, records):
+        '''write the records to a temporary file first so readers never see a partial entry'''
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                marshal.dump(records, fp)
+            os.replace(temp_path, self.get_path(key))
+        except OSError as e:
+            self.logger.warning('could not write parse cache entry: %s', e)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def clear(self):
+        '''remove all entries from the cache directory'''
+        count = 0
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(self.FILE_EXTENSION):
+                os.remove(os.path.join(self.cache_dir, name))
+                count += 1
+        self.logger.info('removed %d entries from parse cache %s', count, self.cache_dir)
+        return count
+
+    @staticmethod
+    def to_record(instr, line_number):
+        '''convert a parsed object to a tuple of plain values'''
+        if isinstance(instr, AssemblyInstruction):
+            label = instr.get_label()
+            if label is not None:
+                label = label.get_name()
+            operand = instr.get_operand()
+            if isinstance(operand, AddressValue):
+                operand = (operand.get_value(), operand.get_type())
+            return (ParseCache.RECORD_INSTRUCTION, line_number, label, instr.get_instruction(), operand)
+        elif isinstance(instr, Label):
+            return (ParseCache.RECORD_LABEL, line_number, instr.get_name())
+        elif isinstance(instr, PreInst_Include):
+            return (ParseCache.RECORD_INCLUDE, line_number, instr.get_filename())
+        elif isinstance(instr, DataDirective):
+            label = instr.get_label()
+            return (ParseCache.RECORD_DATA, line_number, label.get_name() if label is not None else None,
+                    instr.get_directive(), list(instr.get_values()))
+        elif isinstance(instr, BinaryInclude):
+            label = instr.get_label()
+            return (ParseCache.RECORD_BINARY, line_number, label.get_name() if label is not None else None,
+                    instr.get_filename(), instr.get_offset(), instr.get_length())
+        raise ValueError('can not convert %s to a cache record' % type(instr))
+
+    @staticmethod
+    def from_record(record):
+        '''convert a record back to the parsed object, returns the line number and the object'''
+        if record[0] == ParseCache.RECORD_INSTRUCTION:
+            line_number, label, instruction, operand = record[1:]
+            if label is not None:
+                label = Label(label)
+            if isinstance(operand, tuple):
+                operand = AddressValue(operand[0], operand[1])
+            return line_number, AssemblyInstruction(label, instruction, operand)
+        elif record[0] == ParseCache.RECORD_LABEL:
+            return record[1], Label(record[2])
+        elif record[0] == ParseCache.RECORD_INCLUDE:
+            return record[1], PreInst_Include(record[2])
+        elif record[0] == ParseCache.RECORD_DATA:
+            line_number, label, directive, values = record[1:]
+            return line_number, DataDirective(Label(label) if label is not None else None, directive, values)
+        elif record[0] == ParseCache.RECORD_BINARY:
+            line_number, label, filename, offset, length = record[1:]
+            return line_number, BinaryInclude(Label(label) if label is not None else None, filename, offset, length)
+        raise ValueError('unknown cache record type %s' % record[0])
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import logging
+from AssemblerInstructions import *
+from DataInstructions import *
+
+class PeepholeOptimizer(object):
+    '''removes instructions that have no effect from the parsed program. it
+    runs before the addresses are assigned, so label addresses and branch
+    offsets are calculated for the optimized program. labels and data end
+    every pattern, code that can be reached from somewhere else is never
+    touched. the passes are repeated until nothing changes'''
+    RULE_FLAGS = 'redundant flag instruction'
+    RULE_STACK = 'push and pull pair'
+    RULE_DEAD_CODE = 'unreachable code'
+    RULE_JUMP_TO_NEXT = 'jump to the next instruction'
+    RULES = (RULE_FLAGS, RULE_STACK, RULE_DEAD_CODE, RULE_JUMP_TO_NEXT)
+
+    # instruction -> (flag, value) for the instructions that set or clear a flag
+    FLAG_INSTRUCTIONS = {AssemblyInstruction.INSTRUCTION_CLC: ('C', 0), AssemblyInstruction.INSTRUCTION_SEC: ('C', 1),
+                         AssemblyInstruction.INSTRUCTION_CLD: ('D', 0), AssemblyInstruction.INSTRUCTION_SED: ('D', 1),
+                         AssemblyInstruction.INSTRUCTION_CLI: ('I', 0), AssemblyInstruction.INSTRUCTION_SEI: ('I', 1),
+                         AssemblyInstruction.INSTRUCTION_CLV: ('V', 0)}
+    # other instructions that change a flag, D and I are only changed by the ones above
+    FLAG_WRITERS = {'C': frozenset([AssemblyInstruction.INSTRUCTION_ADC, AssemblyInstruction.INSTRUCTION_SBC, AssemblyInstruction.INSTRUCTION_ASL, AssemblyInstruction.INSTRUCTION_LSR,
+                                    AssemblyInstruction.INSTRUCTION_ROL, AssemblyInstruction.INSTRUCTION_ROR, AssemblyInstruction.INSTRUCTION_CMP, AssemblyInstruction.INSTRUCTION_CPX,
+                                    AssemblyInstruction.INSTRUCTION_CPY]),
+                    'V': frozenset([AssemblyInstruction.INSTRUCTION_ADC, AssemblyInstruction.INSTRUCTION_SBC, AssemblyInstruction.INSTRUCTION_BIT]),
+                    'D': frozenset(),
+                    'I': frozenset()}
+    # the flags are unknown afterwards, for the SunPlus instructions without encoding it is not known what they do
+    FLAG_CLOBBERS = frozenset([AssemblyInstruction.INSTRUCTION_PLP, AssemblyInstruction.INSTRUCTION_RTI, AssemblyInstruction.INSTRUCTION_JSR,
+                               AssemblyInstruction.INSTRUCTION_CLR, AssemblyInstruction.INSTRUCTION_INV, AssemblyInstruction.INSTRUCTION_SET, AssemblyInstruction.INSTRUCTION_TST])
+    # instructions that set N and Z without reading them, a PLA right before them only changes A
+    NZ_WRITERS = frozenset([AssemblyInstruction.INSTRUCTION_LDA, AssemblyInstruction.INSTRUCTION_LDX, AssemblyInstruction.INSTRUCTION_LDY, AssemblyInstruction.INSTRUCTION_TAX,
+                            AssemblyInstruction.INSTRUCTION_TAY, AssemblyInstruction.INSTRUCTION_TXA, AssemblyInstruction.INSTRUCTION_TYA, AssemblyInstruction.INSTRUCTION_TSX,
+                            AssemblyInstruction.INSTRUCTION_AND, AssemblyInstruction.INSTRUCTION_ORA, AssemblyInstruction.INSTRUCTION_EOR, AssemblyInstruction.INSTRUCTION_ADC,
+                            AssemblyInstruction.INSTRUCTION_SBC, AssemblyInstruction.INSTRUCTION_INC, AssemblyInstruction.INSTRUCTION_DEC, AssemblyInstruction.INSTRUCTION_INX,
+                            AssemblyInstruction.INSTRUCTION_INY, AssemblyInstruction.INSTRUCTION_DEX, AssemblyInstruction.INSTRUCTION_DEY, AssemblyInstruction.INSTRUCTION_ASL,
+                            AssemblyInstruction.INSTRUCTION_LSR, AssemblyInstruction.INSTRUCTION_ROL, AssemblyInstruction.INSTRUCTION_ROR, AssemblyInstruction.INSTRUCTION_CMP,
+                            AssemblyInstruction.INSTRUCTION_CPX, AssemblyInstruction.INSTRUCTION_CPY, AssemblyInstruction.INSTRUCTION_BIT, AssemblyInstruction.INSTRUCTION_PLA])
+    # execution never continues with the next instruction
+    TERMINATING_INSTRUCTIONS = frozenset([AssemblyInstruction.INSTRUCTION_JMP, AssemblyInstruction.INSTRUCTION_RTS, AssemblyInstruction.INSTRUCTION_RTI])
+    JUMP_INSTRUCTIONS = BRANCH_INSTRUCTIONS | frozenset([AssemblyInstruction.INSTRUCTION_JMP])
+    MAX_ROUNDS = 16
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        # rule -> [removed instructions, bytes, cycles]
+        self.savings = dict((rule, [0, 0, 0]) for rule in self.RULES)
+        self.rounds = 0
+
+    def remove(self, instr, rule, count_cycles=True):
+        saving = self.savings[rule]
+        saving[0] += 1
+        saving[1] += instr.get_num_bytes()
+        if count_cycles:
+            saving[2] += instr.get_cycles()
+        self.logger.debug('removed %s at %s:%s, %s', instr.get_mnemonic(), instr.get_file_name(), instr.get_line_number(), rule)
+
+    def optimize(self, instructions):
+        '''returns the optimized list, the list that is passed in is not changed'''
+        passes = (self.remove_redundant_flags, self.remove_stack_pairs, self.remove_dead_code, self.remove_jumps_to_next)
+        for self.rounds in range(1, self.MAX_ROUNDS + 1):
+            length = len(instructions)
+            for optimization_pass in passes:
+                instructions = optimization_pass(instructions)
+            if len(instructions) == length:
+                break
+        self.logger.info('peephole optimizer took %d rounds, saved %d bytes and %d cycles',
+                         self.rounds, self.get_saved_bytes(), self.get_saved_cycles())
+        return instructions
+
+    def remove_redundant_flags(self, instructions):
+        '''drop set and clear instructions for a flag that already has the value
+        and the first of two back to back instructions for the same flag.
+        CLI directly followed by SEI is kept, it lets pending interrupts in'''
+        result = list()
+        known = dict()
+        for instr in instructions:
+            if not isinstance(instr, AssemblyInstruction):
+                # code behind a label can be reached from elsewhere
+                known.clear()
+                result.append(instr)
+                continue
+            instruction = instr.get_instruction()
+            flag_instruction = self.FLAG_INSTRUCTIONS.get(instruction, None)
+            if flag_instruction is not None:
+                flag, value = flag_instruction
+                if known.get(flag, None) == value:
+                    self.remove(instr, self.RULE_FLAGS)
+                    continue
+                previous = result[-1] if result else None
+                if flag != 'I' and isinstance(previous, AssemblyInstruction) and \
+                        self.FLAG_INSTRUCTIONS.get(previous.get_instruction(), (None, None))[0] == flag:
+                    self.remove(result.pop(), self.RULE_FLAGS)
+                known[flag] = value
+            elif instruction in self.FLAG_CLOBBERS:
+                known.clear()
+            else:
+                for flag, writers in self.FLAG_WRITERS.items():
+                    if instruction in writers:
+                        known.pop(flag, None)
+            result.append(instr)
+        return result
+
+    def remove_stack_pairs(self, instructions):
+        '''PHP directly followed by PLP changes nothing. PHA and PLA only set N
+        and Z, so the pair goes if the next instruction sets both again'''
+        result = list()
+        index = 0
+        length = len(instructions)
+        while index < length:
+            instr = instructions[index]
+            if index + 1 < length and isinstance(instr, AssemblyInstruction) and isinstance(instructions[index + 1], AssemblyInstruction):
+                first, second = instr.get_instruction(), instructions[index + 1].get_instruction()
+                following = instructions[index + 2] if index + 2 < length else None
+                if (first == AssemblyInstruction.INSTRUCTION_PHP and second == AssemblyInstruction.INSTRUCTION_PLP) or \
+                        (first == AssemblyInstruction.INSTRUCTION_PHA and second == AssemblyInstruction.INSTRUCTION_PLA and
+                         isinstance(following, AssemblyInstruction) and following.get_instruction() in self.NZ_WRITERS):
+                    self.remove(instr, self.RULE_STACK)
+                    self.remove(instructions[index + 1], self.RULE_STACK)
+                    index += 2
+                    continue
+            result.append(instr)
+            index += 1
+        return result
+
+    def remove_dead_code(self, instructions):
+        '''instructions behind JMP, RTS or RTI up to the next label can not be
+        reached. data is kept, it may be read from there. they never ran, so
+        no cycles are saved'''
+        result = list()
+        reachable = True
+        for instr in instructions:
+            if isinstance(instr, AssemblyInstruction):
+                if not reachable:
+                    self.remove(instr, self.RULE_DEAD_CODE, count_cycles=False)
+                    continue
+                if instr.get_instruction() in self.TERMINATING_INSTRUCTIONS:
+                    reachable = False
+            else:
+                reachable = True
+            result.append(instr)
+        return result
+
+    def remove_jumps_to_next(self, instructions):
+        '''JMP or a branch to a label that directly follows it'''
+        result = list()
+        length = len(instructions)
+        for index, instr in enumerate(instructions):
+            if isinstance(instr, AssemblyInstruction) and instr.get_instruction() in self.JUMP_INSTRUCTIONS and \
+                    instr.get_address_type() in (AddressValue.TYPE_ABSOLUTE, AddressValue.TYPE_RELATIVE):
+                operand = instr.get_operand()
+                if isinstance(operand, AddressValue) and operand.get_type() is AddressValue.TYPE_LABEL:
+                    following = index + 1
+                    while following < length and isinstance(instructions[following], Label):
+                        if instructions[following].get_name() == operand.get_value():
+                            break
+                        following += 1
+                    if following < length and isinstance(instructions[following], Label):
+                        self.remove(instr, self.RULE_JUMP_TO_NEXT)
+                        continue
+            result.append(instr)
+        return result
+
+    def get_saved_bytes(self):
+        return sum(saving[1] for saving in self.savings.values())
+
+    def get_saved_cycles(self):
+        return sum(saving[2] for saving in self.savings.values())
+
+    def report(self):
+        '''returns the savings as a list of lines'''
+        lines = list()
+        lines.append('{:<32s} {:>7s} {:>6s} {:>7s}'.format('optimization', 'removed', 'bytes', 'cycles'))
+        for rule in self.RULES:
+            removed, num_bytes, num_cycles = self.savings[rule]
+            lines.append('{:<32s} {:>7d} {:>6d} {:>7d}'.format(rule, removed, num_bytes, num_cycles))
+        lines.append('{:<32s} {:>7d} {:>6d} {:>7d}'.format('total', sum(saving[0] for saving in self.savings.values()),
+                                                         self.get_saved_bytes(), self.get_saved_cycles()))
+        return lines
@@ -0,0 +1,503 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import time
+import logging
+from AssemblerInstructions import *
+
+class Simulator(object):
+    '''instruction set simulator for the assembled image. every opcode is
+    dispatched through a 256 entry table built from DECODE_TABLE, so the
+    simulator follows the same opcode map and cycle counts as the assembler.
+    taken branches cost one extra cycle and another one on a page cross,
+    like in the CycleAnalyzer. decimal mode is supported for ADC and SBC'''
+    STACK_PAGE = 0x100
+    RETURN_ADDRESS = 0xFFFF     # call() stops when the routine returns here
+
+    # name of the method that calculates the operand address for each address type
+    ADDRESS_MODES = {
+        AddressValue.TYPE_IMPLIED: 'address_none',
+        AddressValue.TYPE_ACCUMULATOR: 'address_none',
+        AddressValue.TYPE_IMMEDIATE: 'address_immediate',
+        AddressValue.TYPE_ZERO_PAGED: 'address_zero_paged',
+        AddressValue.TYPE_ZERO_PAGED_INDEXED_X: 'address_zero_paged_x',
+        AddressValue.TYPE_ZERO_PAGED_INDEXED_Y: 'address_zero_paged_y',
+        AddressValue.TYPE_ABSOLUTE: 'address_absolute',
+        AddressValue.TYPE_ABSOLUTE_INDEXED_X: 'address_absolute_x',
+        AddressValue.TYPE_ABSOLUTE_INDEXED_Y: 'address_absolute_y',
+        AddressValue.TYPE_INDEXED_INDIRECT: 'address_indexed_indirect',
+        AddressValue.TYPE_INDIRECT_INDEXED: 'address_indirect_indexed',
+        AddressValue.TYPE_INDIRECT: 'address_indirect',
+        AddressValue.TYPE_RELATIVE: 'address_relative',
+    }
+
+    __slots__ = ('logger', 'memory', 'a', 'x', 'y', 'sp', 'pc', 'c', 'z', 'i', 'd', 'v', 'n',
+                 'cycles', 'instructions', 'dispatch')
+
+    def __init__(self, image=None, start_address=0x00):
+        self.logger = logging.getLogger(__name__)
+        self.memory = bytearray(0x10000)
+        self.a = 0
+        self.x = 0
+        self.y = 0
+        self.sp = 0xFF
+        self.pc = start_address
+        # flags are kept apart, they are only packed into one byte for the stack
+        self.c = False
+        self.z = False
+        self.i = True
+        self.d = False
+        self.v = False
+        self.n = False
+        self.cycles = 0
+        self.instructions = 0
+        self.dispatch = self.build_dispatch_table()
+        if image is not None:
+            self.load(image, start_address)
+
+    def build_dispatch_table(self):
+        '''opcode -> (operation, address method, number of bytes, number of cycles)'''
+        table = [None] * 256
+        for op_code, entry in enumerate(DECODE_TABLE):
+            if entry is None:
+                continue
+            instruction, address_type, num_bytes, num_cycles = entry
+            operation = getattr(self, 'op_' + AssemblyInstruction.MNEMONICS[instruction].lower())
+            table[op_code] = (operation, getattr(self, self.ADDRESS_MODES[address_type]), num_bytes, num_cycles)
+        return tuple(table)
+
+    def load(self, image, start_address=0x00):
+        if start_address + len(image) > len(self.memory):
+            raise ValueError('image does not fit into memory at {:04X}h'.format(start_address))
+        self.memory[start_address:start_address + len(image)] = image
+
+    def get_status(self):
+        '''flags packed as N V 1 B D I Z C'''
+        return ((0x80 if self.n else 0) | (0x40 if self.v else 0) | 0x30 | (0x08 if self.d else 0) |
+                (0x04 if self.i else 0) | (0x02 if self.z else 0) | (0x01 if self.c else 0))
+
+    def set_status(self, status):
+        self.n = bool(status & 0x80)
+        self.v = bool(status & 0x40)
+        self.d = bool(status & 0x08)
+        self.i = bool(status & 0x04)
+        self.z = bool(status & 0x02)
+        self.c = bool(status & 0x01)
+
+    def run(self, max_instructions=None, stop_address=None):
+        '''execute until max_instructions were run or the program counter reaches
+        stop_address. returns the number of executed instructions'''
+        memory = self.memory
+        dispatch = self.dispatch
+        limit = -1 if max_instructions is None else max_instructions
+        count = 0
+        cycles = 0
+        try:
+            while count != limit:
+                pc = self.pc
+                if pc == stop_address:
+                    break
+                entry = dispatch[memory[pc]]
+                if entry is None:
+                    raise ValueError('unknown opcode {:02X}h at {:04X}h'.format(memory[pc], pc))
+                operation, operand_address, num_bytes, num_cycles = entry
+                self.pc = (pc + num_bytes) & 0xFFFF
+                operation(operand_address(pc))
+                cycles += num_cycles
+                count += 1
+        finally:
+            self.cycles += cycles
+            self.instructions += count
+        return count
+
+    def call(self, address, max_instructions=1000000):
+        '''run the subroutine at address like JSR would and stop when it returns.
+        returns the number of cycles it took'''
+        cycles = self.cycles
+        self.push_word(self.RETURN_ADDRESS - 1)
+        self.pc = address
+        self.run(max_instructions, self.RETURN_ADDRESS)
+        if self.pc != self.RETURN_ADDRESS:
+            raise Exception('routine at {:04X}h did not return within {:d} instructions'.format(address, max_instructions))
+        return self.cycles - cycles
+
+    def read_word(self, address):
+        return self.memory[address] | (self.memory[(address + 1) & 0xFFFF] << 8)
+
+    def push(self, value):
+        self.memory[self.STACK_PAGE + self.sp] = value
+        self.sp = (self.sp - 1) & 0xFF
+
+    def pull(self):
+        self.sp = (self.sp + 1) & 0xFF
+        return self.memory[self.STACK_PAGE + self.sp]
+
+    def push_word(self, value):
+        self.push(value >> 8)
+        self.push(value & 0xFF)
+
+    def pull_word(self):
+        low = self.pull()
+        return low | (self.pull() << 8)
+
+    # operand addresses, called with the address of the opcode
+
+    def address_none(self, pc):
+        return None
+
+    def address_immediate(self, pc):
+        return (pc + 1) & 0xFFFF
+
+    def address_zero_paged(self, pc):
+        return self.memory[(pc + 1) & 0xFFFF]
+
+    def address_zero_paged_x(self, pc):
+        return (self.memory[(pc + 1) & 0xFFFF] + self.x) & 0xFF
+
+    def address_zero_paged_y(self, pc):
+        return (self.memory[(pc + 1) & 0xFFFF] + self.y) & 0xFF
+
+    def address_absolute(self, pc):
+        return self.memory[(pc + 1) & 0xFFFF] | (self.memory[(pc + 2) & 0xFFFF] << 8)
+
+    def address_absolute_x(self, pc):
+        return ((self.memory[(pc + 1) & 0xFFFF] | (self.memory[(pc + 2) & 0xFFFF] << 8)) + self.x) & 0xFFFF
+
+    def address_absolute_y(self, pc):
+        return ((self.memory[(pc + 1) & 0xFFFF] | (self.memory[(pc + 2) & 0xFFFF] << 8)) + self.y) & 0xFFFF
+
+    def address_indexed_indirect(self, pc):
+        pointer = (self.memory[(pc + 1) & 0xFFFF] + self.x) & 0xFF
+        return self.memory[pointer] | (self.memory[(pointer + 1) & 0xFF] << 8)
+
+    def address_indirect_indexed(self, pc):
+        pointer = self.memory[(pc + 1) & 0xFFFF]
+        return ((self.memory[pointer] | (self.memory[(pointer + 1) & 0xFF] << 8)) + self.y) & 0xFFFF
+
+    def address_indirect(self, pc):
+        return self.read_word(self.memory[(pc + 1) & 0xFFFF] | (self.memory[(pc + 2) & 0xFFFF] << 8))
+
+    def address_relative(self, pc):
+        offset = self.memory[(pc + 1) & 0xFFFF]
+        return (pc + 2 + (offset - 0x100 if offset > 0x7F else offset)) & 0xFFFF
+
+    # operations, called with the operand address or None for implied and accumulator
+
+    def set_zn(self, value):
+        self.z = value == 0
+        self.n = value > 0x7F
+
+    def branch(self, target):
+        self.cycles += 2 if (target ^ self.pc) & 0xFF00 else 1
+        self.pc = target
+
+    def op_adc(self, address):
+        value = self.memory[address]
+        if self.d:
+            low = (self.a & 0x0F) + (value & 0x0F) + self.c
+            high = (self.a >> 4) + (value >> 4)
+            if low > 9:
+                low += 6
+                high += 1
+            binary = (self.a + value + self.c) & 0xFF
+            self.v = bool(~(self.a ^ value) & (self.a ^ (high << 4)) & 0x80)
+            if high > 9:
+                high += 6
+            self.c = high > 0x0F
+            self.a = ((high << 4) | (low & 0x0F)) & 0xFF
+            self.z = binary == 0
+            self.n = self.a > 0x7F
+            return
+        result = self.a + value + self.c
+        self.v = bool(~(self.a ^ value) & (self.a ^ result) & 0x80)
+        self.c = result > 0xFF
+        self.a = result & 0xFF
+        self.z = self.a == 0
+        self.n = self.a > 0x7F
+
+    def op_sbc(self, address):
+        value = self.memory[address]
+        borrow = 0 if self.c else 1
+        result = self.a - value - borrow
+        self.v = bool((self.a ^ value) & (self.a ^ result) & 0x80)
+        if self.d:
+            low = (self.a & 0x0F) - (value & 0x0F) - borrow
+            high = (self.a >> 4) - (value >> 4)
+            if low < 0:
+                low -= 6
+                high -= 1
+            if high < 0:
+                high -= 6
+            self.c = result >= 0
+            self.a = ((high << 4) | (low & 0x0F)) & 0xFF
+            self.z = result & 0xFF == 0
+            self.n = bool(result & 0x80)
+            return
+        self.c = result >= 0
+        self.a = result & 0xFF
+        self.z = self.a == 0
+        self.n = self.a > 0x7F
+
+    def op_and(self, address):
+        self.a &= self.memory[address]
+        self.z = self.a == 0
+        self.n = self.a > 0x7F
+
+    def op_ora(self, address):
+        self.a |= self.memory[address]
+        self.z = self.a == 0
+        self.n = self.a > 0x7F
+
+    def op_eor(self, address):
+        self.a ^= self.memory[address]
+        self.z = self.a == 0
+        self.n = self.a > 0x7F
+
+    def op_asl(self, address):
+        value = self.a if address is None else self.memory[address]
+        self.c = value > 0x7F
+        value = (value << 1) & 0xFF
+        if address is None:
+            self.a = value
+        else:
+            self.memory[address] = value
+        self.set_zn(value)
+
+    def op_lsr(self, address):
+        value = self.a if address is None else self.memory[address]
+        self.c = bool(value & 0x01)
+        value >>= 1
+        if address is None:
+            self.a = value
+        else:
+            self.memory[address] = value
+        self.set_zn(value)
+
+    def op_rol(self, address):
+        value = self.a if address is None else self.memory[address]
+        value = (value << 1) | self.c
+        self.c = value > 0xFF
+        value &= 0xFF
+        if address is None:
+            self.a = value
+        else:
+            self.memory[address] = value
+        self.set_zn(value)
+
+    def op_ror(self, address):
+        value = self.a if address is None else self.memory[address]
+        carry = value & 0x01
+        value = (value >> 1) | (0x80 if self.c else 0)
+        self.c = bool(carry)
+        if address is None:
+            self.a = value
+        else:
+            self.memory[address] = value
+        self.set_zn(value)
+
+    def op_bcc(self, target):
+        if not self.c:
+            self.branch(target)
+
+    def op_bcs(self, target):
+        if self.c:
+            self.branch(target)
+
+    def op_beq(self, target):
+        if self.z:
+            self.branch(target)
+
+    def op_bne(self, target):
+        if not self.z:
+            self.branch(target)
+
+    def op_bmi(self, target):
+        if self.n:
+            self.branch(target)
+
+    def op_bpl(self, target):
+        if not self.n:
+            self.branch(target)
+
+    def op_bvc(self, target):
+        if not self.v:
+            self.branch(target)
+
+    def op_bvs(self, target):
+        if self.v:
+            self.branch(target)
+
+    def op_bit(self, address):
+        value = self.memory[address]
+        self.z = self.a & value == 0
+        self.n = value > 0x7F
+        self.v = bool(value & 0x40)
+
+    def op_clc(self, address):
+        self.c = False
+
+    def op_cld(self, address):
+        self.d = False
+
+    def op_cli(self, address):
+        self.i = False
+
+    def op_clv(self, address):
+        self.v = False
+
+    def op_sec(self, address):
+        self.c = True
+
+    def op_sed(self, address):
+        self.d = True
+
+    def op_sei(self, address):
+        self.i = True
+
+    def compare(self, register, address):
+        result = register - self.memory[address]
+        self.c = result >= 0
+        self.z = result == 0
+        self.n = bool(result & 0x80)
+
+    def op_cmp(self, address):
+        self.compare(self.a, address)
+
+    def op_cpx(self, address):
+        self.compare(self.x, address)
+
+    def op_cpy(self, address):
+        self.compare(self.y, address)
+
+    def op_dec(self, address):
+        value = (self.memory[address] - 1) & 0xFF
+        self.memory[address] = value
+        self.set_zn(value)
+
+    def op_inc(self, address):
+        value = (self.memory[address] + 1) & 0xFF
+        self.memory[address] = value
+        self.set_zn(value)
+
+    def op_dex(self, address):
+        self.x = (self.x - 1) & 0xFF
+        self.z = self.x == 0
+        self.n = self.x > 0x7F
+
+    def op_dey(self, address):
+        self.y = (self.y - 1) & 0xFF
+        self.z = self.y == 0
+        self.n = self.y > 0x7F
+
+    def op_inx(self, address):
+        self.x = (self.x + 1) & 0xFF
+        self.z = self.x == 0
+        self.n = self.x > 0x7F
+
+    def op_iny(self, address):
+        self.y = (self.y + 1) & 0xFF
+        self.z = self.y == 0
+        self.n = self.y > 0x7F
+
+    def op_jmp(self, address):
+        self.pc = address
+
+    def op_jsr(self, address):
+        # the return address on the stack points to the last byte of the JSR
+        self.push_word((self.pc - 1) & 0xFFFF)
+        self.pc = address
+
+    def op_rts(self, address):
+        self.pc = (self.pull_word() + 1) & 0xFFFF
+
+    def op_rti(self, address):
+        self.set_status(self.pull())
+        self.pc = self.pull_word()
+
+    def op_lda(self, address):
+        self.a = self.memory[address]
+        self.z = self.a == 0
+        self.n = self.a > 0x7F
+
+    def op_ldx(self, address):
+        self.x = self.memory[address]
+        self.z = self.x == 0
+        self.n = self.x > 0x7F
+
+    def op_ldy(self, address):
+        self.y = self.memory[address]
+        self.z = self.y == 0
+        self.n = self.y > 0x7F
+
+    def op_sta(self, address):
+        self.memory[address] = self.a
+
+    def op_stx(self, address):
+        self.memory[address] = self.x
+
+    def op_sty(self, address):
+        self.memory[address] = self.y
+
+    def op_nop(self, address):
+        pass
+
+    def op_pha(self, address):
+        self.push(self.a)
+
+    def op_php(self, address):
+        self.push(self.get_status())
+
+    def op_pla(self, address):
+        self.a = self.pull()
+        self.set_zn(self.a)
+
+    def op_plp(self, address):
+        self.set_status(self.pull())
+
+    def op_tax(self, address):
+        self.x = self.a
+        self.set_zn(self.x)
+
+    def op_tay(self, address):
+        self.y = self.a
+        self.set_zn(self.y)
+
+    def op_tsx(self, address):
+        self.x = self.sp
+        self.set_zn(self.x)
+
+    def op_txa(self, address):
+        self.a = self.x
+        self.set_zn(self.a)
+
+    def op_txs(self, address):
+        self.sp = self.x
+
+    def op_tya(self, address):
+        self.a = self.y
+        self.set_zn(self.a)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input", help="raw binary image")
+    parser.add_argument("-s", "--start_address", type=lambda text: int(text, 0), default=0x00, help="load and start address, e.g. 0xC000")
+    parser.add_argument("-n", "--max_instructions", type=int, default=1000000, help="stop after this many instructions")
+    parser.add_argument("--stop_address", type=lambda text: int(text, 0), help="stop when the program counter gets here")
+    parser.add_argument("-l", "--log_level", default="warning", help="set level for logger")
+    args = parser.parse_args()
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.WARNING))
+
+    with open(args.input, 'rb') as fp:
+        simulator = Simulator(fp.read(), args.start_address)
+    start = time.perf_counter()
+    simulator.run(args.max_instructions, args.stop_address)
+    seconds = time.perf_counter() - start
+    print('PC={:04X} A={:02X} X={:02X} Y={:02X} SP={:02X} P={:02X}'.format(
+        simulator.pc, simulator.a, simulator.x, simulator.y, simulator.sp, simulator.get_status()))
+    print('{:d} instructions, {:d} cycles, {:.0f} instructions/s'.format(
+        simulator.instructions, simulator.cycles, simulator.instructions / seconds if seconds else 0))
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import os
+import time
+import logging
+
+class Watcher(object):
+    '''assembles a program again every time one of its source files changes.
+    the files are polled with os.stat, no extra package is needed. the same
+    assembler is used for every run so its include cache keeps the parsed
+    files and only the changed ones are parsed again'''
+    def __init__(self, assembler, main_asm_file, output_file=None, output_format=None, interval=0.5):
+        self.logger = logging.getLogger(__name__)
+        self.assembler = assembler
+        self.main_asm_file = main_asm_file
+        self.output_file = output_file
+        self.output_format = output_format
+        self.interval = interval
+        self.signatures = dict()
+
+    @staticmethod
+    def get_signature(file_path):
+        try:
+            status = os.stat(file_path)
+        except OSError:
+            return None
+        return (status.st_mtime_ns, status.st_size)
+
+    def read_signatures(self):
+        '''signatures of the main file and every file it included in the last run'''
+        file_paths = set(self.assembler.source_files)
+        file_paths.add(os.path.realpath(self.main_asm_file))
+        return dict((file_path, self.get_signature(file_path)) for file_path in file_paths)
+
+    def get_changed_files(self):
+        return sorted(file_path for file_path, signature in self.signatures.items() if self.get_signature(file_path) != signature)
+
+    def assemble(self):
+        '''one run, errors are logged and the watcher keeps going'''
+        start = time.perf_counter()
+        result = None
+        try:
+            result = self.assembler.assemble(self.main_asm_file)
+            if self.output_file is not None:
+                result.write(self.output_file, self.output_format)
+        except Exception as e:
+            self.logger.error('assembly of %s failed: %s', self.main_asm_file, e)
+        self.signatures = self.read_signatures()
+        return result, time.perf_counter() - start
+
+    def run(self, callback=None, max_runs=None):
+        '''assemble once, then poll until interrupted or max_runs runs are done.
+        callback is called with the result, None if it failed, the time in
+        seconds and the list of changed files'''
+        runs = 0
+        changed = list()
+        while True:
+            result, seconds = self.assemble()
+            runs += 1
+            if callback is not None:
+                callback(result, seconds, changed)
+            if max_runs is not None and runs >= max_runs:
+                return
+            changed = list()
+            while len(changed) == 0:
+                time.sleep(self.interval)
+                changed = self.get_changed_files()
+            self.logger.info('changed: %s', ', '.join(changed))
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+
+measure the cost of building the grammar and of parsing with packrat on and off
+"""
+import os
+import sys
+import time
+import argparse
+import logging
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pySunPlus6502asm import SunPlus6502Assembler
+from bench_tokenizer import SAMPLE_LINES, run
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--lines", type=int, default=20000, help="number of lines to parse")
+    parser.add_argument("-i", "--instances", type=int, default=200, help="number of assembler instances to create")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    start = time.perf_counter()
+    SunPlus6502Assembler.get_grammar()
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(args.instances):
+        SunPlus6502Assembler()
+    instance_time = time.perf_counter() - start
+
+    print('grammar build:       {:8.3f} ms'.format(build_time * 1000))
+    print('new instance:        {:8.3f} ms (cached grammar, {:d} instances)'.format(instance_time * 1000 / args.instances, args.instances))
+
+    # packrat can not be turned off again, so the run without it has to come first
+    lines = [line.strip() for line in SAMPLE_LINES]
+    lines = (lines * (args.lines // len(lines) + 1))[:args.lines]
+    # without the line cache, repeated sample lines would be timed as cache hits
+    assembler = SunPlus6502Assembler(use_fast_path=False, line_cache_size=0)
+    plain_time = run(assembler.parse_line, lines)
+    SunPlus6502Assembler.enable_packrat()
+    packrat_time = run(assembler.parse_line, lines)
+
+    print('grammar w/o packrat: {:8.0f} lines/s'.format(len(lines) / plain_time))
+    print('grammar w/ packrat:  {:8.0f} lines/s'.format(len(lines) / packrat_time))
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+
+compare parse_number_string against the previous implementation that compiled
+three regular expressions on every call
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import logging
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pySunPlus6502asm import SunPlus6502Assembler
+
+SAMPLE_LITERALS = ['#01D', '#01010101B', '#FFH', '#%00000001', '#0030H', '#0500H',
+                   '#28D', '#60D', '#20H', '#20D', '#30D', '#255D']
+
+
+def legacy_parse_number_string(str):
+    logger = logging.getLogger(__name__)
+    re_binary = re.compile(r'#%([01]{8})|#([01]{8})B')
+    re_decimal = re.compile(r'#([\d]{1,7})(?!H|B|\d)D?')
+    re_hexadecimal = re.compile(r'#([0-9A-F]{2,4})H|#\$([0-9A-F]{2,4})')
+    value = None
+    bin_result = re_binary.match(str)
+    dec_result = re_decimal.match(str)
+    hex_result = re_hexadecimal.match(str)
+    if bin_result is not None:
+        if bin_result.group(1) is not None:
+            value = int(bin_result.group(1), 2)
+        else:
+            value = int(bin_result.group(2), 2)
+    elif dec_result is not None:
+        value = int(dec_result.group(1), 10)
+    elif hex_result is not None:
+        value = int(hex_result.group(1), 16)
+    else:
+        raise ValueError('could not match operand to numerical value: %s' % str)
+    logger.debug('parsed string %s to int %d' % (str, value))
+    return value
+
+
+def run(parse, literals):
+    start = time.perf_counter()
+    for literal in literals:
+        parse(literal)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--literals", type=int, default=200000, help="number of literals to parse")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    literals = (SAMPLE_LITERALS * (args.literals // len(SAMPLE_LITERALS) + 1))[:args.literals]
+    unique = ['#{:d}D'.format(i % 10000000) for i in range(args.literals)]
+
+    legacy_time = run(legacy_parse_number_string, literals)
+    cached_time = run(SunPlus6502Assembler.parse_number_string, literals)
+    uncached_time = run(SunPlus6502Assembler.parse_number_string.__wrapped__, unique)
+
+    print('literals:          {:d}'.format(len(literals)))
+    print('legacy:            {:10.0f} literals/s'.format(len(literals) / legacy_time))
+    print('combined, cached:  {:10.0f} literals/s'.format(len(literals) / cached_time))
+    print('combined, no hits: {:10.0f} literals/s'.format(len(unique) / uncached_time))
+    print('cache:             {}'.format(SunPlus6502Assembler.parse_number_string.cache_info()))
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+
+time every assembler phase on generated programs of growing size and store
+the results as JSON so runs of different versions can be compared
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import logging
+import platform
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pySunPlus6502asm import SunPlus6502Assembler, __version__
+from AssemblyProfile import AssemblyProfile
+from generate_program import generate, parse_mix
+
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+
+
+def run(main_file, options, trace_memory):
+    '''assemble main_file once with a fresh include cache and return the profile'''
+    profile = AssemblyProfile(trace_memory=trace_memory)
+    SunPlus6502Assembler(profile=profile, **options).assemble(main_file)
+    return profile
+
+
+def bench_size(directory, lines, args, options):
+    main_file = generate(directory, lines, args.label_density, args.include_depth, parse_mix(args.mix),
+                         args.comment_ratio, args.seed)
+    best = None
+    for _ in range(args.repeat):
+        profile = run(main_file, options, False)
+        if best is None or profile.get_total_time() < best.get_total_time():
+            best = profile
+    # tracing slows everything down, so the peak memory comes from a separate run
+    memory = run(main_file, options, True) if args.memory else None
+
+    # the grammar is built once per process, it is not part of the throughput
+    phases = dict(best.phases)
+    phases.pop('grammar', None)
+    seconds = sum(phases.values())
+    return {'lines': lines,
+            'phases': phases,
+            'seconds': seconds,
+            'lines_per_second': lines / seconds if seconds else None,
+            'counters': best.counters,
+            'peak_memory': memory.peak_memory if memory is not None else None}
+
+
+def print_result(result):
+    phases = ' '.join('{:s}={:.3f}'.format(name, seconds) for name, seconds in result['phases'].items())
+    memory = '' if result['peak_memory'] is None else ' {:8.1f} MiB'.format(result['peak_memory'] / 1048576.0)
+    print('{:>8d} lines {:8.3f}s {:10.0f} lines/s{:s}  {:s}'.format(result['lines'], result['seconds'], result['lines_per_second'], memory, phases))
+
+
+def compare(results, previous_file):
+    '''throughput relative to an earlier run for the sizes both runs have'''
+    with open(previous_file, 'r') as fp:
+        previous = json.load(fp)
+    previous_results = dict((result['lines'], result) for result in previous['results'])
+    print('compared to version {:s} ({:s})'.format(previous['version'], previous_file))
+    for result in results:
+        old = previous_results.get(result['lines'], None)
+        if old is None or not old['lines_per_second']:
+            continue
+        print('{:>8d} lines {:+7.1f}% throughput'.format(result['lines'], 100.0 * (result['lines_per_second'] / old['lines_per_second'] - 1)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="program sizes in lines")
+    parser.add_argument("--label_density", type=float, default=0.05, help="share of lines that define a label")
+    parser.add_argument("--include_depth", type=int, default=2, help="number of nested include files")
+    parser.add_argument("--mix", help="weights of the address modes, see generate_program.py")
+    parser.add_argument("--comment_ratio", type=float, default=0.1, help="share of comment lines")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the program generator")
+    parser.add_argument("-r", "--repeat", type=int, default=1, help="runs per size, the fastest one is kept")
+    parser.add_argument("--no_memory", dest="memory", action="store_false", help="skip the run that traces the peak memory")
+    parser.add_argument("--whole_file", action="store_true", help="parse each file in one pass")
+    parser.add_argument("--compact", action="store_true", help="use the struct of arrays program")
+    parser.add_argument("--stream", action="store_true", help="use the streaming pipeline")
+    parser.add_argument("-o", "--output", default="bench_results.json", help="JSON file for the results")
+    parser.add_argument("--compare", help="JSON file of an earlier run")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    options = {'whole_file': args.whole_file, 'compact': args.compact, 'stream': args.stream}
+    start = time.perf_counter()
+    SunPlus6502Assembler.get_grammar()
+    grammar_seconds = time.perf_counter() - start
+
+    results = list()
+    directory = tempfile.mkdtemp(prefix='sunplus_bench_')
+    try:
+        for lines in args.sizes:
+            result = bench_size(directory, lines, args, options)
+            print_result(result)
+            results.append(result)
+    finally:
+        shutil.rmtree(directory)
+
+    report = {'version': __version__,
+              'python': platform.python_version(),
+              'platform': platform.platform(),
+              'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'grammar_seconds': grammar_seconds,
+              'options': options,
+              'generator': {'label_density': args.label_density, 'include_depth': args.include_depth,
+                            'mix': parse_mix(args.mix), 'comment_ratio': args.comment_ratio, 'seed': args.seed},
+              'results': results}
+    with open(args.output, 'w') as fp:
+        json.dump(report, fp, indent=2)
+    print('results written to %s' % args.output)
+
+    if args.compare is not None:
+        compare(results, args.compare)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+
+compare the fast path tokenizer against the pyparsing grammar on the same lines
+"""
+import os
+import sys
+import time
+import argparse
+import logging
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pySunPlus6502asm import SunPlus6502Assembler
+
+SAMPLE_LINES = [
+    'ADC #01D',
+    'ADC #01010101B',
+    'ADC #FFH',
+    'this_is_a_label:',
+    'ADC $#0030H ;this is a comment with spaces',
+    'ADC $#0500H,X',
+    '      ADC $#60D,X',
+    'ADC ($#20H,X)',
+    ';ADC ($#31FEH) ;(this_comment_uses%specital!characters!)',
+    'label_with_instr: ADC ($#20D),Y',
+    'AND $#01D',
+    'ASL A',
+    'CLC',
+    'JMP this_is_a_label',
+    'BNE this_is_a_label',
+    'Include test2.asm',
+]
+
+
+def run(parse, lines):
+    start = time.perf_counter()
+    for line in lines:
+        parse(line)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--lines", type=int, default=100000, help="number of lines to parse")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    lines = [line.strip() for line in SAMPLE_LINES]
+    lines = (lines * (args.lines // len(lines) + 1))[:args.lines]
+
+    # without the line cache, repeated sample lines would be timed as cache hits
+    assembler = SunPlus6502Assembler(line_cache_size=0)
+    grammar_time = run(assembler.grammar.parseString, lines)
+    fast_time = run(assembler.parse_line, lines)
+
+    print('lines:         {:d}'.format(len(lines)))
+    print('grammar:       {:10.0f} lines/s'.format(len(lines) / grammar_time))
+    print('fast path:     {:10.0f} lines/s'.format(len(lines) / fast_time))
+    print('speedup:       {:10.1f}x'.format(grammar_time / fast_time))
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+
+deterministic generator for synthetic SunPlus 6502 programs of any size.
+the output only uses syntax the assembler accepts, all labels are defined,
+branches stay in range and absolute label operands stay below 64K
+"""
+import os
+import sys
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from AssemblerInstructions import *
+
+# address mode name -> (address type, operand format, lowest value, highest value)
+OPERAND_FORMATS = {
+    'implied': (AddressValue.TYPE_IMPLIED, None, 0, 0),
+    'accumulator': (AddressValue.TYPE_ACCUMULATOR, 'A', 0, 0),
+    'immediate': (AddressValue.TYPE_IMMEDIATE, '#{:d}D', 0, 0xFF),
+    'zero_page': (AddressValue.TYPE_ZERO_PAGED, '$#{:d}D', 0, 0xFF),
+    'zero_page_x': (AddressValue.TYPE_ZERO_PAGED_INDEXED_X, '$#{:d}D,X', 0, 0xFF),
+    'absolute': (AddressValue.TYPE_ABSOLUTE, '$#{:d}D', 0x100, 0xFFFF),
+    'absolute_x': (AddressValue.TYPE_ABSOLUTE_INDEXED_X, '$#{:d}D,X', 0x100, 0xFFFF),
+    'absolute_y': (AddressValue.TYPE_ABSOLUTE_INDEXED_Y, '$#{:d}D,Y', 0x100, 0xFFFF),
+    'indexed_indirect': (AddressValue.TYPE_INDEXED_INDIRECT, '($#{:d}D,X)', 0, 0xFF),
+    'indirect_indexed': (AddressValue.TYPE_INDIRECT_INDEXED, '($#{:d}D),Y', 0, 0xFF),
+    'indirect': (AddressValue.TYPE_INDIRECT, '($#{:d}D)', 0, 0xFFFF),
+}
+
+# weights of the addressing modes, label is an absolute label operand and
+# branch a relative branch back to the last label
+DEFAULT_MIX = {'implied': 3, 'accumulator': 1, 'immediate': 4, 'zero_page': 3, 'zero_page_x': 1,
+               'absolute': 2, 'absolute_x': 1, 'absolute_y': 1, 'indexed_indirect': 1,
+               'indirect_indexed': 1, 'indirect': 0.2, 'label': 1, 'branch': 1}
+
+LABEL_INSTRUCTIONS = ('JMP', 'JSR', 'LDA', 'STA', 'INC', 'DEC')
+
+COMMENTS = ('this is a comment', 'set up the counter', 'TODO check the timing', 'wait for the next frame')
+
+
+def instructions_by_mode():
+    '''mnemonics that have an opcode for each address type, from the opcode table'''
+    by_mode = dict()
+    for (instruction, address_type), data in OPCODE_TABLE.items():
+        if instruction in BRANCH_INSTRUCTIONS:
+            continue
+        by_mode.setdefault(address_type, list()).append(AssemblyInstruction.MNEMONICS[instruction])
+    for mnemonics in by_mode.values():
+        mnemonics.sort()
+    return by_mode
+
+
+def parse_mix(text):
+    '''"immediate=4,label=2" -> dict, modes that are not named keep their default weight'''
+    mix = dict(DEFAULT_MIX)
+    if text:
+        for item in text.split(','):
+            name, weight = item.split('=')
+            if name not in mix:
+                raise ValueError('unknown address mode %s, use one of %s' % (name, ', '.join(sorted(mix))))
+            mix[name] = float(weight)
+    return mix
+
+
+class ProgramGenerator(object):
+    '''writes the program to a main file and include_depth nested include files'''
+    def __init__(self, lines, label_density=0.05, include_depth=0, mix=None, comment_ratio=0.1, seed=0):
+        self.lines = lines
+        self.label_density = label_density
+        self.include_depth = include_depth
+        self.mix = dict(DEFAULT_MIX if mix is None else mix)
+        self.comment_ratio = comment_ratio
+        self.random = random.Random(seed)
+        self.by_mode = instructions_by_mode()
+        self.modes = [mode for mode, weight in sorted(self.mix.items()) if weight > 0 and
+                      (mode in ('label', 'branch') or OPERAND_FORMATS[mode][0] in self.by_mode)]
+        self.weights = [self.mix[mode] for mode in self.modes]
+
+        self.address = 0              # estimated address, label operands are counted as absolute
+        self.label_count = 0
+        self.labels = list()          # (name, address) of defined labels below 64K
+        self.last_label = None
+        self.pending_label = None     # referenced but not yet defined
+
+    def new_label(self):
+        if self.pending_label is not None:
+            name, self.pending_label = self.pending_label, None
+        else:
+            name = 'L{:d}'.format(self.label_count)
+            self.label_count += 1
+        self.last_label = (name, self.address)
+        if self.address <= 0xFFFF:
+            self.labels.append(self.last_label)
+        return name
+
+    def instruction(self):
+        mode = self.random.choices(self.modes, self.weights)[0]
+        if mode == 'branch':
+            if self.last_label is not None and self.address + 2 - self.last_label[1] <= 128:
+                self.address += 2
+                return '{:s} {:s}'.format(self.random.choice(sorted(AssemblyInstruction.MNEMONICS[i] for i in BRANCH_INSTRUCTIONS)), self.last_label[0])
+            mode = 'implied'
+        elif mode == 'label':
+            target = self.label_target()
+            if target is not None:
+                self.address += 3
+                return '{:s} {:s}'.format(self.random.choice(LABEL_INSTRUCTIONS), target)
+            mode = 'implied'
+
+        address_type, operand_format, low, high = OPERAND_FORMATS[mode]
+        mnemonic = self.random.choice(self.by_mode[address_type])
+        self.address += OPCODE_TABLE[(AssemblyInstruction.KNOWN_INSTRUCTIONS[mnemonic], address_type)][1]
+        if operand_format is None:
+            return mnemonic
+        return '{:s} {:s}'.format(mnemonic, operand_format.format(self.random.randint(low, high)))
+
+    def label_target(self):
+        '''a label that is already defined or, while there is room below 64K, the next one'''
+        if self.address < 0xF000 and (self.pending_label is not None or not self.labels or self.random.random() < 0.5):
+            if self.pending_label is None:
+                self.pending_label = 'L{:d}'.format(self.label_count)
+                self.label_count += 1
+            return self.pending_label
+        if self.labels:
+            return self.random.choice(self.labels[-64:])[0]
+        return None
+
+    def line(self):
+        if self.random.random() < self.comment_ratio:
+            return ';' + self.random.choice(COMMENTS)
+        if self.pending_label is not None and self.address > 0xFF00:
+            # the forward reference has to be defined while it is still reachable
+            return self.new_label() + ':'
+        if self.random.random() < self.label_density:
+            if self.random.random() < 0.5:
+                return self.new_label() + ':'
+            return self.new_label() + ': ' + self.instruction()
+        return self.instruction()
+
+    def write(self, directory, name='main.asm'):
+        '''write all files and return the path of the main file. every file
+        includes the next one in its last line so the program is in the same
+        order the generator estimated the addresses'''
+        file_names = [name] + ['include{:d}.asm'.format(depth) for depth in range(1, self.include_depth + 1)]
+        per_file = max(1, self.lines // len(file_names))
+        written = 0
+        for index, file_name in enumerate(file_names):
+            last = index == len(file_names) - 1
+            count = self.lines - written if last else per_file
+            with open(os.path.join(directory, file_name), 'w') as fp:
+                lines = list()
+                for _ in range(count - (0 if last else 1)):
+                    lines.append(self.line())
+                if not last:
+                    lines.append('Include {:s}'.format(file_names[index + 1]))
+                elif self.pending_label is not None:
+                    lines.append(self.new_label() + ':')
+                fp.write('\n'.join(lines) + '\n')
+            written += count
+        return os.path.join(directory, name)
+
+
+def generate(directory, lines, label_density=0.05, include_depth=0, mix=None, comment_ratio=0.1, seed=0):
+    '''write a synthetic program to directory and return the path of the main file'''
+    generator = ProgramGenerator(lines, label_density, include_depth, mix, comment_ratio, seed)
+    return generator.write(directory)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory", help="directory for the generated files")
+    parser.add_argument("-n", "--lines", type=int, default=10000, help="number of lines over all files")
+    parser.add_argument("--label_density", type=float, default=0.05, help="share of lines that define a label")
+    parser.add_argument("--include_depth", type=int, default=0, help="number of nested include files")
+    parser.add_argument("--mix", help="weights of the address modes, e.g. immediate=4,label=2,branch=0")
+    parser.add_argument("--comment_ratio", type=float, default=0.1, help="share of comment lines")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random generator")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        os.makedirs(args.directory)
+    print(generate(args.directory, args.lines, args.label_density, args.include_depth, parse_mix(args.mix),
+                   args.comment_ratio, args.seed))
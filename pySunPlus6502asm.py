@@ -6,39 +6,280 @@
 """
 import os
 import re
+import mmap
 import sys
 import logging
+import functools
+import copy
+import contextlib
+import time
+import threading
 from pyparsing import (ParserElement, Group, Optional, Word, alphas, alphanums,
                       Suppress, Literal, restOfLine, ParseException, Or, LineEnd,
-                      LineStart, CaselessKeyword)
+                      LineStart, CaselessKeyword, FollowedBy, Empty, Regex,
+                      ParseBaseException, ParseFatalException)
 from AssemblerInstructions import *
 from PreProcessInstructions import *
+from DataInstructions import *
+from ParseCache import ParseCache
+from LineCache import LineCache
+from CompactProgram import CompactProgram
+from CycleAnalyzer import CycleAnalyzer
+from PeepholeOptimizer import PeepholeOptimizer
+from ImageEmitter import ImageEmitter
+from AssemblyResult import AssemblyResult
+from AssemblyProfile import AssemblyProfile
+
+__version__ = '0.1.0'
 
 class SunPlus6502Assembler(object):
-    def __init__(self, main_asm_file):
-        '''WIP, not for actual use!'''
+    # precompiled patterns for the fast path tokenizer, they only accept lines
+    # the grammar would parse the same way. everything else is handed to pyparsing
+    RE_INCLUDE_LINE = re.compile(r'(?i)include[ \t]+([A-Za-z0-9_.]+)[ \t]*(?:;(.*))?$')
+    RE_LABEL_LINE = re.compile(r'([A-Za-z][A-Za-z0-9_]{0,31}):$')
+    RE_INSTRUCTION_LINE = re.compile(r'(?:([A-Za-z][A-Za-z0-9_]{0,31}):[ \t]*)?([A-Za-z]+)(?:[ \t]+([A-Za-z0-9#%$(),_]+))?[ \t]*(?:;(.*))?$')
+    # the mapped file is split in chunks of whole lines, pages of finished chunks are given back
+    MAPPED_CHUNK_SIZE = 1 << 20
+    SOURCE_ENCODING = 'utf-8'
+
+    # data directives, the arguments are split by parse_data_directive
+    RE_DATA_LINE = re.compile(r'(?:([A-Za-z][A-Za-z0-9_]{0,31}):[ \t]*)?(?i:(DB|DW|DS|INCBIN))[ \t]+((?:"[^"]*"|[^;"])+?)[ \t]*(?:;(.*))?$')
+    RE_DATA_ITEM = re.compile(r'[ \t]*("[^"]*"|[^,"\s](?:[^,"]*[^,"\s])?)[ \t]*(,|$)')
+    RE_LABEL_NAME = re.compile(r'[A-Za-z][A-Za-z0-9_]{0,31}$')
+
+    # numeric literals, the alternatives are tried in order binary, decimal, hexdecimal.
+    # the base belongs to the index of the group that matched
+    RE_NUMBER = re.compile(r'#(?:%([01]{8})|([01]{8})B|(\d{1,7})(?!H|B|\d)D?|([0-9A-F]{2,4})H|\$([0-9A-F]{2,4}))')
+    NUMBER_BASES = (None, 2, 2, 10, 16, 16)
+
+    # the grammar is built once per process and shared by all instances
+    _grammar = None
+    _file_grammar = None
+    _grammar_lock = threading.Lock()
+    _grammar_seconds = None
+
+    def __init__(self, main_asm_file=None, use_fast_path=True, whole_file=False, include_cache=None, parse_cache=None, compact=False,
+                 cycle_report=False, cycle_budget=None, relax_labels=True,
+                 output_file=None, output_format=None, stream=False, verbose=False, profile=None,
+                 line_cache_size=LineCache.DEFAULT_SIZE, mmap_source=False, optimize=False):
+        '''WIP, not for actual use!
+        if main_asm_file is given it is assembled right away, the result is kept
+        in self.result and written to output_file if set. otherwise use assemble'''
         self.logger = logging.getLogger(__name__)
+        SunPlus6502Assembler.check_options(compact=compact, stream=stream, cycle_report=cycle_report,
+                                           cycle_budget=cycle_budget, optimize=optimize)
         self.main_asm_file = main_asm_file
-        self.__build_grammar()
-        instructions = self.parse_file(main_asm_file)
-        for i, instr in enumerate(instructions):
-            print("%d : %s : %s" % (i, type(instr), instr))
+        self.use_fast_path = use_fast_path
+        self.whole_file = whole_file
+        # parsed objects of every file by resolved path, includes are not expanded.
+        # can be shared between instances
+        if include_cache is None:
+            include_cache = dict()
+        self.include_cache = include_cache
+        self.include_stack = list()
+        # objects of the file that is parsed right now are collected here for the include cache
+        self.local_stack = list()
+        # resolved paths of all files the last program was made of
+        self.source_files = set()
+        # optional on disk cache, records of the file that is parsed right now are collected here
+        self.parse_cache = parse_cache
+        self.record_stack = list()
+        # parsed instructions of repeated lines, disabled if the size is 0
+        self.line_cache = LineCache(line_cache_size) if line_cache_size > 0 else None
+        # read the source files through mmap instead of decoding every line
+        self.mmap_source = mmap_source
+        self.compact = compact
+        self.cycle_report = cycle_report
+        self.cycle_budget = cycle_budget
+        self.relax_labels = relax_labels
+        # run the peephole optimizer on the parsed program
+        self.optimize = optimize
+        self.output_file = output_file
+        self.output_format = output_format
+        self.stream = stream
+        # print the parsed objects, the label map and the encoding of every line
+        self.verbose = verbose
+        # optional AssemblyProfile that collects the time of every phase
+        self.profile = profile
+        self.grammar = SunPlus6502Assembler.get_grammar()
+        self.file_grammar = SunPlus6502Assembler.get_file_grammar()
+        self.result = None
+        if main_asm_file is None:
+            return
 
-        self.check_labels(instructions)
+        self.result = self.assemble(main_asm_file)
+        if self.output_file is not None:
+            self.result.write(self.output_file, self.output_format)
 
-        label_addr_map = self.calculate_lable_pos(instructions)
+    @staticmethod
+    def check_options(compact=False, stream=False, cycle_report=False, cycle_budget=None, optimize=False):
+        '''raise ValueError for options that can not be combined, the modes would
+        otherwise silently skip a step'''
+        cycle_analysis = cycle_report or cycle_budget is not None
+        if compact and cycle_analysis:
+            raise ValueError('the cycle analysis needs the instruction objects, it does not work with --compact')
+        if stream and (compact or cycle_analysis or optimize):
+            raise ValueError('--stream can not be combined with --compact, --optimize or the cycle analysis')
 
-        self.replace_label(instructions, label_addr_map)
+    def assemble(self, main_asm_file, start_address=0x00):
+        '''assemble a program and return an AssemblyResult with the image, the
+        symbol table and the statistics of the run. nothing is printed unless
+        the assembler is verbose'''
+        start = time.perf_counter()
+        statistics = dict()
+        cycle_analyzer = None
+        optimizer = None
+        self.source_files = set()
+        if self.parse_cache is not None:
+            cache_hits, cache_misses = self.parse_cache.hits, self.parse_cache.misses
+        if self.line_cache is not None:
+            line_hits, line_misses = self.line_cache.hits, self.line_cache.misses
+        if self.profile is not None:
+            if not self.profile.grammar_reported:
+                # the grammar is built once per process, this is the time it took back then
+                self.profile.add_time('grammar', SunPlus6502Assembler._grammar_seconds)
+                self.profile.grammar_reported = True
+            self.profile.start_memory()
 
-        print(label_addr_map)
+        if self.stream:
+            # the instruction list is never built, so there is nothing to optimize or analyze
+            with self.phase('stream'):
+                emitter, symbol_table, statistics['instructions'], relaxation = self.stream_file(main_asm_file, start_address)
+            if relaxation is not None:
+                statistics['relaxed_operands'], statistics['saved_bytes'], statistics['saved_cycles'] = relaxation
+            image = emitter.image
+            if self.verbose:
+                print(dict((name, symbol[0]) for name, symbol in symbol_table.items()))
+        elif self.compact and not (self.optimize or self.whole_file or self.parse_cache is not None):
+            # the columns are filled while the files are read, the instruction list is never built
+            with self.phase('parse'):
+                program, relaxation = self.compact_file(main_asm_file, start_address)
+            if relaxation is not None:
+                statistics['relaxed_operands'], statistics['saved_bytes'], statistics['saved_cycles'] = relaxation
+            image, symbol_table, statistics['instructions'] = self.assemble_compact(program, start_address)
+        else:
+            with self.phase('parse'):
+                instructions = self.parse_file(main_asm_file)
+            if instructions is None:
+                raise Exception('parsing of %s failed' % main_asm_file)
+            if self.parse_cache is not None:
+                self.logger.info('parse cache: %d hits, %d misses', self.parse_cache.hits, self.parse_cache.misses)
 
-        for i, instr in enumerate(instructions):
-            if isinstance(instr, AssemblyInstruction):
-                print('line {:04d} translates to {:s}'.format(i, instr.to_bin()))
+            if self.optimize:
+                # before relaxation and label resolution, the addresses are calculated for the shorter program
+                with self.phase('optimize'):
+                    optimizer = PeepholeOptimizer()
+                    instructions = optimizer.optimize(instructions)
+                statistics['optimized_bytes'] = optimizer.get_saved_bytes()
+                statistics['optimized_cycles'] = optimizer.get_saved_cycles()
 
+            if self.relax_labels:
+                with self.phase('relax'):
+                    relaxed, saved_bytes, saved_cycles = self.relax_label_operands(instructions, start_address)
+                statistics['relaxed_operands'] = relaxed
+                statistics['saved_bytes'] = saved_bytes
+                statistics['saved_cycles'] = saved_cycles
+
+            if self.compact:
+                with self.phase('compact'):
+                    program = CompactProgram.from_instructions(instructions)
+                    del instructions[:]
+                image, symbol_table, statistics['instructions'] = self.assemble_compact(program, start_address)
+            else:
+                if self.verbose:
+                    for i, instr in enumerate(instructions):
+                        print("%d : %s : %s" % (i, type(instr), instr))
 
+                with self.phase('resolve_labels'):
+                    symbol_table = self.resolve_labels(instructions, start_address)
+                if self.verbose:
+                    print(dict((name, symbol[0]) for name, symbol in symbol_table.items()))
+
+                if self.cycle_report or self.cycle_budget is not None:
+                    with self.phase('cycles'):
+                        cycle_analyzer = self.analyze_cycles(instructions, start_address)
+
+                if self.verbose:
+                    for i, instr in enumerate(instructions):
+                        if isinstance(instr, AssemblyInstruction):
+                            print('line {:04d} translates to {:s}'.format(i, instr.to_bin()))
+                statistics['instructions'] = sum(1 for instr in instructions if isinstance(instr, AssemblyInstruction))
+                with self.phase('encode'):
+                    image = ImageEmitter.from_instructions(instructions, start_address).image
+
+        statistics['labels'] = len(symbol_table)
+        statistics['bytes'] = len(image)
+        if self.parse_cache is not None:
+            statistics['parse_cache_hits'] = self.parse_cache.hits - cache_hits
+            statistics['parse_cache_misses'] = self.parse_cache.misses - cache_misses
+        if self.line_cache is not None:
+            statistics['line_cache_hits'] = self.line_cache.hits - line_hits
+            statistics['line_cache_misses'] = self.line_cache.misses - line_misses
+            if statistics['line_cache_hits'] or statistics['line_cache_misses']:
+                self.logger.info('line cache: %d hits, %d misses', statistics['line_cache_hits'], statistics['line_cache_misses'])
+        statistics['seconds'] = time.perf_counter() - start
+        if self.profile is not None:
+            self.profile.stop_memory()
+            for name in ('instructions', 'labels', 'bytes', 'line_cache_hits', 'line_cache_misses', 'optimized_bytes', 'optimized_cycles'):
+                if name in statistics:
+                    self.profile.count(name, statistics[name])
+        self.logger.info('assembled %s: %d instructions, %d bytes', main_asm_file, statistics['instructions'], statistics['bytes'])
+        return AssemblyResult(main_asm_file, image, start_address, symbol_table, statistics, cycle_analyzer, self.profile, optimizer)
+
+    def phase(self, name):
+        '''context manager that adds the time of the with block to the profile'''
+        if self.profile is None:
+            return contextlib.nullcontext()
+        return self.profile.phase(name)
+
+    def assemble_compact(self, program, start_address=0x00):
+        '''label passes and encoding on the struct of arrays, returns the image,
+        the symbol table and the number of instructions'''
+        with self.phase('check_labels'):
+            program.check_labels()
+        with self.phase('calculate_label_pos'):
+            label_addr_map = program.calculate_label_pos(start_address)
+        with self.phase('replace_label'):
+            program.replace_label(label_addr_map)
+        if self.verbose:
+            print(label_addr_map)
+            for row in range(len(program)):
+                print('line {:04d} translates to {:s}'.format(row, program.to_bin(row)))
+        symbol_table = dict()
+        for name, address in label_addr_map.items():
+            symbol_table[name] = (address,) + program.get_label_source(name)
+        with self.phase('encode'):
+            image = program.to_image(start_address)
+        return image, symbol_table, len(program)
+
+    @classmethod
+    def get_grammar(cls):
+        '''return the shared grammar, it is built on first use'''
+        if cls._grammar is None:
+            with cls._grammar_lock:
+                if cls._grammar is None:
+                    start = time.perf_counter()
+                    cls._grammar, cls._file_grammar = cls.__build_grammar()
+                    cls._grammar_seconds = time.perf_counter() - start
+        return cls._grammar
+
+    @classmethod
+    def get_file_grammar(cls):
+        '''return the shared line oriented grammar used to parse a whole file in one pass'''
+        cls.get_grammar()
+        return cls._file_grammar
+
+    @staticmethod
+    def enable_packrat(cache_size_limit=128):
+        '''enable packrat memoization of pyparsing. this affects every grammar in
+        the process and can not be turned off again'''
+        ParserElement.enablePackrat(cache_size_limit)
 
-    def __build_grammar(self):
+    @classmethod
+    def __build_grammar(cls):
+        # the default whitespace is only changed while the grammar is built so
+        # other users of pyparsing in the same process are not affected
+        default_whitespace = ParserElement.DEFAULT_WHITE_CHARS
         ParserElement.setDefaultWhitespaceChars(' \t')
 
         # labels as per sunplus manual page 22, acceptabel characters might have to be tuned
@@ -47,71 +288,603 @@ class SunPlus6502Assembler(object):
 
         op_code_field = Word(alphas).setResultsName('op_code').setParseAction(AssemblyInstruction.parse_opcode)
 
-        operand_field = Word(alphanums+'#%$(),_').setResultsName('operand').setParseAction(SunPlus6502Assembler.parse_operand_field)
+        operand_field = Word(alphanums+'#%$(),_').setResultsName('operand').setParseAction(cls.parse_operand_field)
 
         comment_filed = Group(Suppress(Literal(';')) + restOfLine()).setResultsName('comment').setParseAction(Comment.from_parsing)
 
         include_instruction = Group(Suppress(CaselessKeyword('Include')) + Word(alphanums+'_.') + Optional(comment_filed)).setParseAction(PreInst_Include.from_parsing)
 
-        assembly_instruction = Group(Optional(label_field) + op_code_field + Optional(operand_field) + Optional(comment_filed)).setParseAction(SunPlus6502Assembler.parse_op_code)
+        directive_field = (CaselessKeyword('DB') | CaselessKeyword('DW') | CaselessKeyword('DS') | CaselessKeyword('INCBIN')).setResultsName('directive')
+        arguments_field = Regex(r'(?:"[^"\n]*"|[^;"\n])+').setResultsName('arguments')
+        data_directive = Group(Optional(label_field) + directive_field + arguments_field + Optional(comment_filed)).setParseAction(cls.parse_data_field)
+
+        assembly_instruction = Group(Optional(label_field) + op_code_field + Optional(operand_field) + Optional(comment_filed)).setParseAction(cls.parse_op_code)
 
         label_only = Group(label_name + Suppress(Literal(':')) + LineEnd()).setResultsName('label').setParseAction(Label.from_parsing)
         comment_line = Group(Suppress(Literal(';')) + restOfLine()).setResultsName('comment').setParseAction(Comment.from_parsing)
 
-        self.grammar = Or(include_instruction | assembly_instruction | label_only | comment_line)
-        self.logger.debug('grammer is ready')
+        grammar = Or(include_instruction | data_directive | assembly_instruction | label_only | comment_line)
+
+        # for whole files every statement has to start at the beginning of a line,
+        # anything after the statement is ignored like it is for single lines.
+        # a line that is not a statement stops the scan right there
+        label_only_in_file = Group(label_name + Suppress(Literal(':')) + FollowedBy(LineEnd())).setResultsName('label').setParseAction(Label.from_parsing)
+        line_start = Empty().addCondition(cls.is_line_start)
+        bad_line = Regex(r'[^\n]+').setParseAction(cls.raise_bad_line)
+        file_grammar = line_start + (include_instruction | data_directive | assembly_instruction | label_only_in_file | comment_line | bad_line) + Suppress(restOfLine())
+        # keep tabs, otherwise pyparsing expands them and the locations no longer match the buffer
+        file_grammar.parseWithTabs()
+
+        ParserElement.setDefaultWhitespaceChars(default_whitespace)
+        logging.getLogger(__name__).debug('grammer is ready')
+        return grammar, file_grammar
 
     def parse_file(self, file_path):
         if not os.path.isfile(file_path):
             self.logger.error(u'file not found')
             return None
-        self.logger.debug('start parsing of {:s}'.format(file_path))
 
+        real_path = os.path.realpath(file_path)
+        if real_path in self.include_stack:
+            cycle = ' -> '.join(self.include_stack[self.include_stack.index(real_path):] + [real_path])
+            self.logger.error('include cycle detected: %s', cycle)
+            raise Exception('include cycle detected: %s' % cycle)
+
+        self.source_files.add(real_path)
+        self.include_stack.append(real_path)
+        start = time.perf_counter()
+        try:
+            instructions = self.replay_cached_file(real_path, file_path)
+            if instructions is None:
+                self.logger.debug('start parsing of %s', file_path)
+                signature = self.file_signature(real_path)
+                self.local_stack.append(list())
+                try:
+                    instructions = self.parse_source(file_path)
+                finally:
+                    parsed = self.local_stack.pop()
+                if instructions is not None:
+                    self.logger.info('parser found %d tokens', len(instructions))
+                    self.include_cache[real_path] = (signature, parsed)
+                if self.profile is not None:
+                    self.profile.count('files')
+        finally:
+            self.include_stack.pop()
+            if self.profile is not None:
+                self.profile.add_file_time(file_path, time.perf_counter() - start)
+        return instructions
+
+    def parse_source(self, file_path):
+        '''parse the content of a single file, or replay it from the on disk
+        parse cache if the same content was parsed before'''
+        if self.parse_cache is None:
+            return self.parse_content(file_path)
+
+        with open(file_path, 'rb') as fp:
+            if self.mmap_source and os.fstat(fp.fileno()).st_size > 0:
+                with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    cache_key = self.parse_cache.get_key(mapped)
+            else:
+                cache_key = self.parse_cache.get_key(fp.read())
+        records = self.parse_cache.load(cache_key)
+        if records is not None:
+            self.logger.debug('parse cache hit for %s', file_path)
+            instructions = list()
+            self.record_stack.append(None)
+            try:
+                for record in records:
+                    line_number, instr = ParseCache.from_record(record)
+                    self.add_parsed(instructions, instr, file_path, line_number)
+            finally:
+                self.record_stack.pop()
+            return instructions
+
+        self.logger.debug('parse cache miss for %s', file_path)
+        self.record_stack.append(list())
+        try:
+            instructions = self.parse_content(file_path)
+        finally:
+            records = self.record_stack.pop()
+        if instructions is not None:
+            self.parse_cache.store(cache_key, records)
+        return instructions
+
+    def parse_content(self, file_path):
+        if self.whole_file:
+            return self.parse_buffer(file_path)
+        return self.parse_lines(file_path)
+
+    @staticmethod
+    def file_signature(file_path):
+        '''modification time and size are used to detect changed files'''
+        stat = os.stat(file_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def replay_cached_file(self, real_path, file_path):
+        '''build the instructions of a file from the include cache or return None
+        if the file is not cached or changed since it was parsed. included
+        files are checked on their own, so only changed files are parsed again'''
+        entry = self.include_cache.get(real_path, None)
+        if entry is None:
+            return None
+        signature, parsed = entry
+        if not os.path.isfile(real_path) or self.file_signature(real_path) != signature:
+            self.logger.debug('cached result for %s is outdated', real_path)
+            del self.include_cache[real_path]
+            return None
+        self.logger.debug('using cached result for %s', real_path)
         instructions = list()
+        # nothing of the replay belongs to the file that includes this one
+        self.local_stack.append(None)
+        self.record_stack.append(None)
+        try:
+            for line_number, instr in parsed:
+                # the cache keeps its own objects, the returned ones get modified by the later steps
+                self.add_parsed(instructions, copy.copy(instr), file_path, line_number)
+        finally:
+            self.local_stack.pop()
+            self.record_stack.pop()
+        return instructions
+
+    @staticmethod
+    def resolve_include(file_name, including_file):
+        '''includes are looked up next to the including file first, then
+        relative to the working directory'''
+        if not os.path.isabs(file_name):
+            candidate = os.path.join(os.path.dirname(including_file), file_name)
+            if os.path.isfile(candidate):
+                return candidate
+        return file_name
+
+    def parse_lines(self, file_path):
+        '''parse the file line by line'''
+        instructions = list()
+        for line_number, line in self.iter_source_lines(file_path):
+            try:
+                instr = self.parse_line(line)
+            except ParseException as pe:
+                self.logger.error('parsing faild on line "%s"', line)
+                self.logger.debug('Parse Error: %s', pe)
+                return None
+            except ValueError as e:
+                raise ValueError('%s at %s:%d' % (e, file_path, line_number)) from e
+
+            if instr is not None:
+                self.add_parsed(instructions, instr, file_path, line_number)
+            else:
+                self.logger.error('parsing faild on line "%s"', line)
+        return instructions
+
+    def parse_buffer(self, file_path):
+        '''parse the whole file in one pass with the line oriented grammar. every
+        statement goes through pyparsing, the fast path and the line cache are
+        not used, so this only beats the grammar per line, not the default'''
         with open(file_path, 'r') as fp:
-            for line in fp:
-                line = line.strip()
-                instr = None
+            buffer = fp.read()
+
+        instructions = list()
+        line_number = 1
+        last_end = 0
+        statements = self.file_grammar.scanString(buffer)
+        try:
+            while True:
                 try:
-                    if len(line) > 0: # filter empty lines
-                        instr, = self.grammar.parseString(line)
+                    tokens, start, end = next(statements)
+                except StopIteration:
+                    break
+                except ValueError as e:
+                    # a parse action rejected the first statement after the last one
+                    start = len(buffer) - len(buffer[last_end:].lstrip())
+                    raise ValueError('%s at %s:%d' % (e, file_path, line_number + buffer.count('\n', last_end, start))) from e
+                line_number += buffer.count('\n', last_end, start)
+                last_end = end
+                self.add_parsed(instructions, tokens[0], file_path, line_number)
+        except ParseBaseException as pe:
+            self.logger.error('parsing faild on line %d "%s"', pe.lineno, pe.line.strip())
+            self.logger.debug('Parse Error: %s', pe)
+            return None
+        if self.profile is not None:
+            self.profile.count('lines', buffer.count('\n') + (not buffer.endswith('\n')))
+        return instructions
+
+    @staticmethod
+    def is_line_start(string, loc, tokens):
+        '''true if there is only whitespace between the start of the line and loc'''
+        return string[string.rfind('\n', 0, loc) + 1:loc].strip() == ''
+
+    @staticmethod
+    def raise_bad_line(string, loc, tokens):
+        '''parse action for lines that are not a valid statement'''
+        raise ParseFatalException(string, loc, 'line does not match grammar')
+
+    def add_parsed(self, instructions, instr, file_path, line_number):
+        '''add a parsed object to the list of instructions'''
+        if self.record_stack and self.record_stack[-1] is not None and not isinstance(instr, Comment):
+            self.record_stack[-1].append(ParseCache.to_record(instr, line_number))
+        if self.local_stack and self.local_stack[-1] is not None and not isinstance(instr, Comment):
+            self.local_stack[-1].append((line_number, copy.copy(instr)))
+
+        if isinstance(instr, PreInst_Include):
+            self.logger.debug('Include statement for file: %s', instr.get_filename())
+            include_instr = self.parse_file(self.resolve_include(instr.get_filename(), file_path))
+            if include_instr is None:
+                raise Exception('parsing of included file %s failed (%s line %d)' % (instr.get_filename(), file_path, line_number))
+            instructions.extend(include_instr)
+        elif isinstance(instr, (AssemblyInstruction,) + DATA_TYPES):
+            instr.set_source(file_path, line_number)
+            if isinstance(instr, BinaryInclude):
+                self.bind_binary(instr, file_path, line_number)
+            # if there was an label infront of the instruction we add them as seperate instructions
+            if instr.get_label() is not None:
+                instr.get_label().set_source(file_path, line_number)
+                instructions.append(instr.get_label())
+            instructions.append(instr)
+        elif isinstance(instr, Comment):
+            # comments are ignored
+            pass
+        else:
+            instr.set_source(file_path, line_number)
+            instructions.append(instr)
 
+    def bind_binary(self, instr, file_path, line_number):
+        '''resolve the file of an INCBIN like an include and take its size'''
+        binary_path = self.resolve_include(instr.get_filename(), file_path)
+        if not os.path.isfile(binary_path):
+            raise Exception('binary file %s not found (%s line %d)' % (instr.get_filename(), file_path, line_number))
+        try:
+            instr.set_path(binary_path)
+        except ValueError as e:
+            raise ValueError('%s at %s:%d' % (e, file_path, line_number)) from e
+        self.source_files.add(os.path.realpath(binary_path))
+
+    def iter_source_lines(self, file_path):
+        '''line reader, yields line number and stripped line for all non empty lines'''
+        if self.mmap_source:
+            yield from self.iter_mapped_lines(file_path)
+            return
+        line_number = 0
+        with open(file_path, 'r') as fp:
+            for line_number, line in enumerate(fp, 1):
+                line = line.strip()
+                if len(line) > 0: # filter empty lines
+                    yield line_number, line
+        if self.profile is not None:
+            self.profile.count('lines', line_number)
+
+    def iter_mapped_lines(self, file_path):
+        '''line reader on the memory mapped file. lines are split and stripped
+        as bytes and only the code part of a line is decoded, blank and comment
+        lines are never decoded. pages that were read are released after every
+        chunk so the resident memory does not grow with the file. yields line
+        number and stripped line without the comment'''
+        line_number = 0
+        with open(file_path, 'rb') as fp:
+            # empty files can not be mapped
+            if os.fstat(fp.fileno()).st_size > 0:
+                with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    encoding = self.SOURCE_ENCODING
+                    end = len(mapped)
+                    start = 0
+                    released = 0
+                    while start < end:
+                        chunk_end = mapped.find(b'\n', start + self.MAPPED_CHUNK_SIZE) + 1
+                        if chunk_end <= 0:
+                            chunk_end = end
+                        lines = mapped[start:chunk_end].split(b'\n')
+                        if chunk_end < end or lines[-1] == b'':
+                            # nothing follows the last line end of the chunk
+                            lines.pop()
+                        for line_number, line in enumerate(lines, line_number + 1):
+                            code = line.partition(b';')[0]
+                            if b'"' in code:
+                                # the ; might be part of a string, the parser cuts the comment
+                                code = line
+                            code = code.strip()
+                            if code:
+                                yield line_number, code.decode(encoding)
+                        del lines
+                        start = chunk_end
+                        if hasattr(mmap, 'MADV_DONTNEED'):
+                            page_end = start - start % mmap.PAGESIZE
+                            if page_end > released:
+                                mapped.madvise(mmap.MADV_DONTNEED, released, page_end - released)
+                                released = page_end
+        if self.profile is not None:
+            self.profile.count('lines', line_number)
+
+    def iter_tokens(self, file_path):
+        '''tokenizer for the streaming pipeline, yields the parsed object, file and
+        line number. includes are expanded in place while they are read'''
+        real_path = os.path.realpath(file_path)
+        if real_path in self.include_stack:
+            cycle = ' -> '.join(self.include_stack[self.include_stack.index(real_path):] + [real_path])
+            self.logger.error('include cycle detected: %s', cycle)
+            raise Exception('include cycle detected: %s' % cycle)
+
+        self.source_files.add(real_path)
+        self.include_stack.append(real_path)
+        try:
+            for line_number, line in self.iter_source_lines(file_path):
+                try:
+                    instr = self.parse_line(line)
                 except ParseException as pe:
-                    self.logger.error('parsing faild on line "%s"', line)
                     self.logger.debug('Parse Error: %s', pe)
-                    return None
+                    instr = None
+                except ValueError as e:
+                    raise ValueError('%s at %s:%d' % (e, file_path, line_number)) from e
+                if instr is None:
+                    self.logger.error('parsing faild on line "%s"', line)
+                    raise Exception('parsing faild at %s:%d' % (file_path, line_number))
 
-                if instr is not None:
-                    if isinstance(instr, PreInst_Include):
-                        self.logger.debug('Include statement for file: %s', instr.get_filename())
-                        # TODO check if this file was already parsed to make shure we dont run into a infinite loop
-                        include_instr = self.parse_file(instr.get_filename())
-                        instructions.extend(include_instr)
-                    elif isinstance(instr, AssemblyInstruction):
-                        # if there was an label infront of the instruction we add them as seperate instructions
-                        if instr.get_label() is not None:
-                            instructions.append(instr.get_label())
-                        instructions.append(instr)
-                    elif isinstance(instr, Comment):
-                        # comments are ignored
-                        pass
-                    else:
-                        instructions.append(instr)
+                if isinstance(instr, PreInst_Include):
+                    include_path = self.resolve_include(instr.get_filename(), file_path)
+                    if not os.path.isfile(include_path):
+                        raise Exception('included file %s not found (%s line %d)' % (instr.get_filename(), file_path, line_number))
+                    yield from self.iter_tokens(include_path)
                 else:
-                    self.logger.error('parsing faild on line "%s"', line)
+                    if isinstance(instr, BinaryInclude):
+                        self.bind_binary(instr, file_path, line_number)
+                    yield instr, file_path, line_number
+        finally:
+            self.include_stack.pop()
 
-        self.logger.info('parser found %d tokens', len(instructions))
-        return instructions
+    @staticmethod
+    def iter_statements(tokens):
+        '''instruction builder for the streaming pipeline, drops comments and
+        splits labels from the instruction they are in front of'''
+        for instr, file_path, line_number in tokens:
+            if isinstance(instr, Comment):
+                continue
+            instr.set_source(file_path, line_number)
+            if isinstance(instr, (AssemblyInstruction,) + DATA_TYPES) and instr.get_label() is not None:
+                instr.get_label().set_source(file_path, line_number)
+                yield instr.get_label()
+            yield instr
+
+    def stream_file(self, file_path, start_address=0x00):
+        '''assemble a file without building the instruction list. each line goes
+        through tokenizer, address assignment and emitter before the next one is
+        read. only instructions with forward references are kept until the end
+        of the program. returns the emitter, the symbol table, the number of
+        instructions and the relaxed operands, saved bytes and cycles or None
+        if the labels are not relaxed'''
+        if not os.path.isfile(file_path):
+            self.logger.error(u'file not found')
+            raise Exception('file %s not found' % file_path)
+
+        symbol_table = dict()
+        fixups = list()
+        errors = list()
+        emitter = ImageEmitter(bytearray(), start_address)
+        num_instructions = 0
+        statements = self.iter_statements(self.iter_tokens(file_path))
+        relaxation = None
+        if self.relax_labels:
+            relaxation = [0, 0, 0]
+            statements = self.relax_statements(statements, symbol_table, relaxation, start_address)
+        for instr in self.assign_addresses(statements, symbol_table, fixups, errors, start_address):
+            emitter.append(instr)
+            num_instructions += 1
+        self.patch_fixups(symbol_table, fixups, errors)
+        for instr in fixups:
+            emitter.encode(instr)
+        self.logger.info('streamed %d labels with %d forward references, program length is %04X',
+                         len(symbol_table), len(fixups), len(emitter.image))
+        return emitter, symbol_table, num_instructions, relaxation
+
+    def compact_file(self, file_path, start_address=0x00):
+        '''read a program into a CompactProgram with the tokenizer of the
+        streaming pipeline, each object is dropped as soon as its row is
+        appended. the include cache is not used. returns the program and the
+        relaxed operands, saved bytes and cycles or None if the labels are not
+        relaxed'''
+        if not os.path.isfile(file_path):
+            self.logger.error(u'file not found')
+            raise Exception('file %s not found' % file_path)
+
+        program = CompactProgram()
+        statements = self.iter_statements(self.iter_tokens(file_path))
+        relaxation = None
+        if self.relax_labels:
+            relaxation = [0, 0, 0]
+            # relax_statements looks up the address of the labels that are already placed
+            symbol_table = dict()
+            statements = self.relax_statements(statements, symbol_table, relaxation, start_address)
+            addr = start_address
+            for instr in statements:
+                if isinstance(instr, Label):
+                    symbol_table.setdefault(instr.get_name(), (addr,))
+                else:
+                    addr += instr.get_num_bytes()
+                program.append(instr)
+        else:
+            for instr in statements:
+                program.append(instr)
+        return program, relaxation
+
+    def relax_statements(self, statements, symbol_table, relaxation, start_address=0x00):
+        '''label relaxation for the streaming pipeline, gives the same encodings
+        as relax_label_operands on the whole program. only labels that end up
+        below 0x100 allow zero page, so the statements are held back until the
+        address with all candidates in zero page passes 0xFF and this part is
+        relaxed like a whole program, labels that are not defined in it are
+        above 0xFF. after that a label operand is zero page if the label is
+        already in the symbol table below 0x100, forward references are always
+        above. relaxation collects the relaxed operands, saved bytes and cycles'''
+        prefix = list()
+        addr = start_address
+        for instr in statements:
+            prefix.append(instr)
+            if isinstance(instr, AssemblyInstruction):
+                num_bytes = instr.get_num_bytes()
+                operand = instr.get_operand()
+                if instr.get_address_type() is AddressValue.TYPE_ABSOLUTE and isinstance(operand, AddressValue) and \
+                        operand.get_type() is AddressValue.TYPE_LABEL:
+                    data = OPCODE_TABLE.get((instr.get_instruction(), AddressValue.TYPE_ZERO_PAGED), None)
+                    if data is not None:
+                        num_bytes = data[1]
+                addr += num_bytes
+            elif isinstance(instr, DATA_TYPES):
+                addr += instr.get_num_bytes()
+            if addr > 0xFF:
+                break
+        relaxation[:] = self.relax_label_operands(prefix, start_address)
+        yield from prefix
+        del prefix
+
+        for instr in statements:
+            if isinstance(instr, AssemblyInstruction) and instr.get_address_type() is AddressValue.TYPE_ABSOLUTE:
+                operand = instr.get_operand()
+                if isinstance(operand, AddressValue) and operand.get_type() is AddressValue.TYPE_LABEL:
+                    symbol = symbol_table.get(operand.get_value(), None)
+                    if symbol is not None and symbol[0] <= 0xFF:
+                        num_bytes, num_cycles = instr.get_num_bytes(), instr.get_cycles()
+                        if instr.encode_as(AddressValue.TYPE_ZERO_PAGED):
+                            relaxation[0] += 1
+                            relaxation[1] += num_bytes - instr.get_num_bytes()
+                            relaxation[2] += num_cycles - instr.get_cycles()
+            yield instr
+
+    def parse_line(self, line):
+        '''parse a single stripped, non empty line. the fast path is tried first,
+        lines it can not classify are parsed with the grammar. instructions
+        without a label are kept in the line cache'''
+        # comments are cheap to parse, they and the lines put would not store are not looked up
+        line_cache = self.line_cache if self.line_cache is not None and LineCache.is_cacheable(line) else None
+        if line_cache is not None:
+            key = LineCache.get_key(line)
+            instr = line_cache.get(key)
+            if instr is not None:
+                return instr
+        instr = None
+        if self.use_fast_path:
+            instr = self.fast_parse_line(line)
+        if instr is None:
+            instr, = self.grammar.parseString(line)
+        if line_cache is not None:
+            line_cache.put(key, instr)
+        return instr
+
+    def fast_parse_line(self, line):
+        '''tokenize the common line forms with precompiled regular expressions.
+        returns None if the line has to go through the grammar'''
+        if line[0] == ';':
+            return Comment(line[1:])
+
+        match = self.RE_INSTRUCTION_LINE.match(line)
+        if match is not None:
+            label_name, op_code_name, operand, comment = match.groups()
+            if op_code_name.upper() == 'INCLUDE':
+                match = self.RE_INCLUDE_LINE.match(line)
+                if match is None:
+                    return None
+                return PreInst_Include(match.group(1))
+            op_code = AssemblyInstruction.KNOWN_INSTRUCTIONS.get(op_code_name.upper(), None)
+            if op_code is None:
+                match = self.RE_DATA_LINE.match(line)
+                if match is not None:
+                    return self.parse_data_line(match)
+                raise NotImplementedError('unknown op code %s' % op_code_name)
+            if label_name is not None:
+                label = Label(label_name)
+            else:
+                label = None
+            if operand is not None:
+                operand = SunPlus6502Assembler.parse_operand(operand)
+            return AssemblyInstruction(label, op_code, operand)
+
+        match = self.RE_LABEL_LINE.match(line)
+        if match is not None:
+            return Label(match.group(1))
+
+        match = self.RE_INCLUDE_LINE.match(line)
+        if match is not None:
+            return PreInst_Include(match.group(1))
+
+        match = self.RE_DATA_LINE.match(line)
+        if match is not None:
+            return self.parse_data_line(match)
+        return None
+
+    @staticmethod
+    def parse_data_line(match):
+        label_name, directive, arguments = match.groups()[:3]
+        label = Label(label_name) if label_name is not None else None
+        return SunPlus6502Assembler.parse_data_directive(label, directive, arguments)
+
+    @staticmethod
+    def parse_data_field(token):
+        '''parse action for data directives in the grammar'''
+        label = token[0]['label'] if 'label' in token[0] else None
+        return SunPlus6502Assembler.parse_data_directive(label, token[0]['directive'], token[0]['arguments'])
+
+    @staticmethod
+    def parse_data_directive(label, directive, arguments):
+        '''build the object for DB, DW, DS or INCBIN from the text of the arguments.
+        DB takes numbers, strings and labels, DW numbers and labels, DS the
+        number of bytes and an optional fill value and INCBIN a file name with
+        optional offset and length'''
+        directive = directive.upper()
+        items = list()
+        arguments = arguments.strip()
+        position = 0
+        while True:
+            match = SunPlus6502Assembler.RE_DATA_ITEM.match(arguments, position)
+            if match is None:
+                raise ValueError('could not split the arguments of %s: %s' % (directive, arguments))
+            items.append(match.group(1))
+            if match.group(2) == '':
+                break
+            position = match.end()
+
+        if directive == 'INCBIN':
+            filename = items[0].strip('"')
+            numbers = [SunPlus6502Assembler.parse_data_value(item, False) for item in items[1:]]
+            if len(numbers) > 2:
+                raise ValueError('INCBIN takes a file name, an offset and a length: %s' % arguments)
+            return BinaryInclude(label, filename, *numbers)
+        if directive == DataDirective.DIRECTIVE_DS:
+            values = [SunPlus6502Assembler.parse_data_value(item, False) for item in items]
+            if len(values) == 1:
+                values.append(0)
+            return DataDirective(label, directive, values)
+        values = [SunPlus6502Assembler.parse_data_value(item, directive == DataDirective.DIRECTIVE_DB) for item in items]
+        return DataDirective(label, directive, values)
+
+    @staticmethod
+    def parse_data_value(item, allow_string):
+        '''a number in any of the literal forms, with or without #, a label
+        name or, if allowed, a string in double quotes'''
+        if item.startswith('"'):
+            if not allow_string:
+                raise ValueError('string %s is only allowed for DB' % item)
+            try:
+                return item[1:-1].encode('latin-1')
+            except UnicodeEncodeError as e:
+                raise ValueError('string %s has characters that do not fit into a byte' % item) from e
+        literal = item if item.startswith('#') else '#' + item
+        # the whole item has to be the literal, 0FFH must not be read as 0
+        match = SunPlus6502Assembler.RE_NUMBER.fullmatch(literal)
+        if match is not None:
+            return int(match.group(match.lastindex), SunPlus6502Assembler.NUMBER_BASES[match.lastindex])
+        if SunPlus6502Assembler.RE_LABEL_NAME.match(item):
+            return item
+        raise ValueError('could not read data value %s' % item)
 
     @staticmethod
     def parse_operand_field(token):
+        '''parse action for the operand field of the grammar'''
+        #print(token.dump(), type(token['operand']))
+        return SunPlus6502Assembler.parse_operand(token['operand'])
+
+    @staticmethod
+    def parse_operand(operand):
         '''operand can be an address value, a numerical value or a label. we
         decide here which it is and return the correct object'''
         logger = logging.getLogger(__name__)
-        #print(token.dump(), type(token['operand']))
 
-        operand = token['operand'].strip()
-        if operand is 'A':
+        operand = operand.strip()
+        if operand == 'A':
             logger.debug('Parse operand %s as Accumulator', operand)
             return AddressValue(value='A', type=AddressValue.TYPE_ACCUMULATOR)
         elif operand.startswith('$'):
@@ -158,35 +931,21 @@ class SunPlus6502Assembler(object):
             return AddressValue(value, type)
         else:
             logger.debug('Parse operand %s as label', operand)
-            return AddressValue(value=token['operand'], type=AddressValue.TYPE_LABEL)
+            return AddressValue(value=operand, type=AddressValue.TYPE_LABEL)
 
     @staticmethod
+    @functools.lru_cache(maxsize=1024)
     def parse_number_string(str):
         '''
         binary: #%00000001 or #00000001B
         decimal: #01 or #01D
         hexdecimal: #01H or #$01
         '''
-        logger = logging.getLogger(__name__)
-        re_binary = re.compile('#%([01]{8})|#([01]{8})B')
-        re_decimal = re.compile('#([\d]{1,7})(?!H|B|\d)D?')
-        re_hexadecimal = re.compile('#([0-9A-F]{2,4})H|#\$([0-9A-F]{2,4})')
-        value = None
-        bin_result = re_binary.match(str)
-        dec_result = re_decimal.match(str)
-        hex_result = re_hexadecimal.match(str)
-        if bin_result is not None:
-            if bin_result.group(1) is not None:
-                value = int(bin_result.group(1), 2)
-            else:
-                value = int(bin_result.group(2), 2)
-        elif dec_result is not None:
-            value = int(dec_result.group(1), 10)
-        elif hex_result is not None:
-            value = int(hex_result.group(1), 16)
-        else:
+        result = SunPlus6502Assembler.RE_NUMBER.match(str)
+        if result is None:
             raise ValueError('could not match operand to numerical value: %s' % str)
-        logger.debug('parsed string %s to int %d' % (str, value))
+        value = int(result.group(result.lastindex), SunPlus6502Assembler.NUMBER_BASES[result.lastindex])
+        logging.getLogger(__name__).debug('parsed string %s to int %d', str, value)
         return value
 
     @staticmethod
@@ -201,178 +960,141 @@ class SunPlus6502Assembler(object):
             operand = token[0]['operand']
         else:
             operand = None
-        if op_code is AssemblyInstruction.INSTRUCTION_ADC:
-            return Inst_ADC(label, operand)
-        elif op_code is AssemblyInstruction.INSTRUCTION_AND:
-            return Inst_AND(label, operand)
-        elif op_code is AssemblyInstruction.INSTRUCTION_ASL:
-            return Inst_ASL(label, operand)
-        elif op_code is AssemblyInstruction.INSTRUCTION_BCC:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_BCS:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_BEQ:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_BMI:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_BNE:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_BPL:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_BVC:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_BVS:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_BIT:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_CLC:
-            return Inst_CLC(label)
-        elif op_code is AssemblyInstruction.INSTRUCTION_CLD:
-            return Inst_CLD(label)
-        elif op_code is AssemblyInstruction.INSTRUCTION_CLI:
-            return Inst_CLI(label)
-        elif op_code is AssemblyInstruction.INSTRUCTION_CLR:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_CLV:
-            return Inst_CLV(label)
-        elif op_code is AssemblyInstruction.INSTRUCTION_CMP:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_CPX:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_CPY:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_DEC:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_DEX:
-            return Inst_DEX(label)
-        elif op_code is AssemblyInstruction.INSTRUCTION_DEY:
-            return Inst_DEY(label)
-        elif op_code is AssemblyInstruction.INSTRUCTION_EOR:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_INC:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_INX:
-            return Inst_INX(label)
-        elif op_code is AssemblyInstruction.INSTRUCTION_INY:
-            return Inst_INY(label)
-        elif op_code is AssemblyInstruction.INSTRUCTION_JMP:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_JSR:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_LDA:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_LDX:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_LDY:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_LSR:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_NOP:
-            return Inst_NOP(label)
-        elif op_code is AssemblyInstruction.INSTRUCTION_ORA:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_PHA:
-            return Inst_PHA(label)
-        elif op_code is AssemblyInstruction.INSTRUCTION_PHP:
-            return Inst_PHP(label)
-        elif op_code is AssemblyInstruction.INSTRUCTION_PLA:
-            return Inst_PLA(label)
-        elif op_code is AssemblyInstruction.INSTRUCTION_PLP:
-            return Inst_PLP(label)
-        elif op_code is AssemblyInstruction.INSTRUCTION_ROL:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_ROR:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_RTI:
-            return Inst_RTI(label)
-        elif op_code is AssemblyInstruction.INSTRUCTION_RTS:
-            return Inst_RTS(label)
-        elif op_code is AssemblyInstruction.INSTRUCTION_SBC:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_SEC:
-            return Inst_SEC(label)
-        elif op_code is AssemblyInstruction.INSTRUCTION_SED:
-            return Inst_SED(label)
-        elif op_code is AssemblyInstruction.INSTRUCTION_SEI:
-            return Inst_SEI(label)
-        elif op_code is AssemblyInstruction.INSTRUCTION_SET:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_STA:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_STX:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_STY:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_TAX:
-            return Inst_TAX(label)
-        elif op_code is AssemblyInstruction.INSTRUCTION_TAY:
-            return Inst_TAY(label)
-        elif op_code is AssemblyInstruction.INSTRUCTION_TST:
-            raise NotImplementedError() #TODO
-        elif op_code is AssemblyInstruction.INSTRUCTION_TSX:
-            return Inst_TSX(label)
-        elif op_code is AssemblyInstruction.INSTRUCTION_TXA:
-            return Inst_TXA(label)
-        elif op_code is AssemblyInstruction.INSTRUCTION_TXS:
-            return Inst_TXS(label)
-        elif op_code is AssemblyInstruction.INSTRUCTION_TYA:
-            return Inst_TYA(label)
-        elif 'include' in op_code:
-            return PreInst_Include(operand.get_value())
-        else:
-            print(token.dump())
-            raise NotImplementedError('unknown op code %s'%op_code)
+        if not isinstance(op_code, int):
+            # parse_opcode leaves the string in place for unknown op codes
+            logging.getLogger(__name__).debug('%s', token.dump())
+            raise NotImplementedError('unknown op code %s' % op_code)
+        return AssemblyInstruction(label, op_code, operand)
 
-    def check_labels(self, instructions):
-        '''check list of instructions for dublicates and missing labels'''
-        known_label = list()
+    def relax_label_operands(self, instructions, start_address=0x00):
+        '''pick the smallest encoding for label operands. all candidates start
+        out as zero page, every round assigns addresses and widens those whose
+        label ended up above 0xFF. operands only ever grow, so this stops once
+        no operand changed. returns the number of zero page operands and the
+        bytes and cycles saved compared to absolute addressing'''
+        candidates = list()
         for instr in instructions:
-            if isinstance(instr, Label):
-                if instr.get_name() in known_label:
-                    self.logger.error('multible definitions for label %s', instr.get_name())
-                    raise Exception('multible definitions for label %s', instr.get_name())
-                else:
-                    known_label.append(instr.get_name())
-        self.logger.info('found %d label definitions', len(known_label))
-
-        for instr in instructions:
-            if isinstance(instr, AssemblyInstruction):
+            if isinstance(instr, AssemblyInstruction) and instr.get_address_type() is AddressValue.TYPE_ABSOLUTE:
                 operand = instr.get_operand()
                 if isinstance(operand, AddressValue) and operand.get_type() is AddressValue.TYPE_LABEL:
-                    label_name = operand.get_value()
-                    if label_name not in known_label:
-                        self.logger.error('label %s used but not defined', label_name)
-                        raise Exception('label %s used but not defined', label_name)
-        self.logger.info('all used labels found in definition')
-
-    def calculate_lable_pos(self, instructions):
-        '''this is where each label definition gets assigned its label'''
-        addr = 0x00
-        label_addr = dict()
-        for instr in instructions:
+                    num_bytes, num_cycles = instr.get_num_bytes(), instr.get_cycles()
+                    if instr.encode_as(AddressValue.TYPE_ZERO_PAGED):
+                        candidates.append((instr, num_bytes - instr.get_num_bytes(), num_cycles - instr.get_cycles()))
+
+        rounds = 0
+        while candidates:
+            rounds += 1
+            label_addr = dict()
+            addr = start_address
+            for instr in instructions:
+                if isinstance(instr, Label):
+                    label_addr.setdefault(instr.get_name(), addr)
+                elif isinstance(instr, (AssemblyInstruction,) + DATA_TYPES):
+                    addr += instr.get_num_bytes()
+
+            remaining = list()
+            for candidate in candidates:
+                instr = candidate[0]
+                target = label_addr.get(instr.get_operand().get_value(), None)
+                if target is None or target > 0xFF:
+                    instr.encode_as(AddressValue.TYPE_ABSOLUTE)
+                else:
+                    remaining.append(candidate)
+            if len(remaining) == len(candidates):
+                break
+            candidates = remaining
+
+        saved_bytes = sum(candidate[1] for candidate in candidates)
+        saved_cycles = sum(candidate[2] for candidate in candidates)
+        self.logger.info('relaxation took %d rounds, %d label operands use zero page, saved %d bytes and %d cycles',
+                         rounds, len(candidates), saved_bytes, saved_cycles)
+        return len(candidates), saved_bytes, saved_cycles
+
+    def analyze_cycles(self, instructions, start_address=0x00):
+        '''run the timing analysis and warn about routines over the cycle budget'''
+        analyzer = CycleAnalyzer(instructions, start_address)
+        if self.cycle_budget is not None:
+            for routine in analyzer.get_hot_routines(self.cycle_budget):
+                self.logger.warning('routine %s needs up to %d cycles, budget is %d', routine.label, routine.worst_cycles, self.cycle_budget)
+        return analyzer
+
+    @staticmethod
+    def format_source(instr):
+        return '%s:%s' % (instr.get_file_name(), instr.get_line_number())
+
+    def resolve_labels(self, instructions, start_address=0x00):
+        '''assign addresses and replace labels in a single pass. labels that are
+        already known are replaced right away, forward references are kept
+        as fixups and patched at the end. returns the symbol table which maps
+        each label to its address, file and line of definition'''
+        symbol_table = dict()
+        fixups = list()
+        errors = list()
+        addr = start_address
+        for instr in self.assign_addresses(instructions, symbol_table, fixups, errors, start_address):
+            addr = instr.get_address() + instr.get_num_bytes()
+        self.patch_fixups(symbol_table, fixups, errors)
+        self.logger.info('assigned %d labels with %d forward references, program length is %04X', len(symbol_table), len(fixups), addr - start_address)
+        return symbol_table
+
+    def assign_addresses(self, statements, symbol_table, fixups, errors, start_address=0x00):
+        '''generator that gives every instruction its address, adds label
+        definitions to the symbol table and replaces labels that are already
+        known. instructions with forward references are added to fixups.
+        yields the instructions, labels are consumed'''
+        addr = start_address
+        for instr in statements:
             if isinstance(instr, Label):
-                label_addr[instr.get_name()] = addr
-                self.logger.debug("{:s}@{:04X}".format(instr.get_name(), addr))
+                name = instr.get_name()
+                if name in symbol_table:
+                    _, file_name, line_number = symbol_table[name]
+                    errors.append('multible definitions for label %s at %s, first defined at %s:%s' % (name, self.format_source(instr), file_name, line_number))
+                else:
+                    symbol_table[name] = (addr, instr.get_file_name(), instr.get_line_number())
             elif isinstance(instr, AssemblyInstruction):
-                addr += instr.get_cycles()
-            else:
-                self.logger.error('unknow type encountered {:s}'.format(instr))
-                raise Exception('unknow type encountered {:s}'.format(instr))
-        self.logger.info('assigned {:d} labels, program length is {:04X}'.format(len(label_addr), addr))
-        return label_addr
-
-    def replace_label(self, instructions, label_addr_map):
-        for instr in instructions:
-            if isinstance(instr, AssemblyInstruction):
+                instr.set_address(addr)
                 operand = instr.get_operand()
                 if isinstance(operand, AddressValue) and operand.get_type() is AddressValue.TYPE_LABEL:
-                    label_name = operand.get_value()
-                    if label_name not in label_addr_map:
-                        self.logger.error('label {:s} used but not defined'.format(label_name))
-                        raise Exception('label {:s} used but not defined'.format(label_name))
+                    symbol = symbol_table.get(operand.get_value(), None)
+                    if symbol is None:
+                        fixups.append(instr)
                     else:
-                        self.logger.info('replace labele {:s} in instruction {:02X}h with address {:04X}h used but not defined'.format(label_name, instr.get_opcode(), label_addr_map[label_name]))
-                        instr.replace_label(label_addr_map[label_name])
+                        instr.replace_label(symbol[0])
+                addr += instr.get_num_bytes()
+                yield instr
+            elif isinstance(instr, DATA_TYPES):
+                instr.set_address(addr)
+                # labels in data are always patched at the end
+                if instr.get_label_names():
+                    fixups.append(instr)
+                addr += instr.get_num_bytes()
+                yield instr
+            else:
+                self.logger.error('unknow type encountered %s', instr)
+                raise Exception('unknow type encountered {:s}'.format(str(instr)))
+
+    def patch_fixups(self, symbol_table, fixups, errors):
+        '''replace the forward references once all labels are known, raises if
+        there were any label errors'''
+        label_addr_map = None
+        for instr in fixups:
+            if isinstance(instr, DATA_TYPES):
+                if label_addr_map is None:
+                    label_addr_map = dict((name, symbol[0]) for name, symbol in symbol_table.items())
+                for label_name in instr.replace_labels(label_addr_map):
+                    errors.append('label %s used but not defined at %s' % (label_name, self.format_source(instr)))
+                continue
+            label_name = instr.get_operand().get_value()
+            symbol = symbol_table.get(label_name, None)
+            if symbol is None:
+                errors.append('label %s used but not defined at %s' % (label_name, self.format_source(instr)))
+            else:
+                instr.replace_label(symbol[0])
+
+        if errors:
+            for error in errors:
+                self.logger.error(error)
+            raise Exception(errors[0] if len(errors) == 1 else '%d label errors, first: %s' % (len(errors), errors[0]))
 
 
 if __name__ == "__main__":
@@ -381,13 +1103,141 @@ if __name__ == "__main__":
                       'warning': logging.WARNING, 'info': logging.INFO, 'debug': logging.DEBUG}
 
     parser = argparse.ArgumentParser()
-    parser.add_argument("input", help="main assembler file")
+    parser.add_argument("input", nargs="*", help="main assembler file, more than one file are assembled as a batch")
+    parser.add_argument("-m", "--manifest", help="file with one target per line: input file and optional output file")
+    parser.add_argument("-j", "--jobs", type=int, help="number of worker processes for a batch, defaults to the number of cores")
     parser.add_argument("-l", "--log_level", default="warning", help="set level for logger")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print the parsed program, the label map and the encoding of every line")
+    parser.add_argument("--packrat", action="store_true", help="enable packrat memoization of the grammar")
+    parser.add_argument("--whole_file", action="store_true", help="parse each file in one pyparsing pass, faster than the grammar per line but slower than the default fast path")
+    parser.add_argument("--compact", action="store_true", help="keep the program in a struct of arrays instead of objects, the rows are filled while the files are read")
+    parser.add_argument("-o", "--output", help="output file, the format is taken from the extension (.bin, .hex, .srec)")
+    parser.add_argument("-f", "--format", choices=[ImageEmitter.FORMAT_BINARY, ImageEmitter.FORMAT_INTEL_HEX, ImageEmitter.FORMAT_S_RECORD],
+                        help="output format, overrides the file extension")
+    parser.add_argument("--stream", action="store_true", help="assemble line by line without keeping the program in memory")
+    parser.add_argument("--no_relax", action="store_true", help="always use absolute addressing for label operands")
+    parser.add_argument("-O", "--optimize", action="store_true", help="remove redundant instructions and print the savings")
+    parser.add_argument("--cycles", action="store_true", help="print the cycle timing report")
+    parser.add_argument("--cycle_budget", type=int, help="warn about routines that can take more cycles than this")
+    parser.add_argument("--profile", action="store_true", help="print the time of every phase and the counters")
+    parser.add_argument("--profile_memory", action="store_true", help="add the peak memory to the profile, traced in a second run")
+    parser.add_argument("--profile_json", help="write the profile as JSON to this file")
+    parser.add_argument("--cache_dir", help="directory for the on disk parse cache, disabled if not set")
+    parser.add_argument("--clear_cache", action="store_true", help="remove all entries from the parse cache")
+    parser.add_argument("--line_cache_size", type=int, default=LineCache.DEFAULT_SIZE, help="number of parsed lines kept for repeated lines, 0 disables the cache")
+    parser.add_argument("--mmap", action="store_true", help="read the source files through mmap, for very large sources")
+    parser.add_argument("-w", "--watch", action="store_true", help="assemble again every time a source file changes, stop with Ctrl-C")
+    parser.add_argument("--watch_interval", type=float, default=0.5, help="seconds between two checks of the source files")
 
     args = parser.parse_args()
-    print(args)
     selected_level = logging_levels.get(args.log_level.lower())
     logging.basicConfig(level=selected_level)
     logger = logging.getLogger(__name__)
+    logger.debug('%s', args)
+
+    if args.packrat:
+        SunPlus6502Assembler.enable_packrat()
+
+    parse_cache = None
+    if args.cache_dir is not None:
+        parse_cache = ParseCache(args.cache_dir, __version__)
+        if args.clear_cache:
+            parse_cache.clear()
+    elif args.clear_cache:
+        parser.error('--clear_cache needs --cache_dir')
+
+    try:
+        SunPlus6502Assembler.check_options(compact=args.compact, stream=args.stream, cycle_report=args.cycles,
+                                           cycle_budget=args.cycle_budget, optimize=args.optimize)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.jobs is not None and args.jobs < 1:
+        parser.error('--jobs has to be at least 1')
+
+    if args.watch and (args.stream or len(args.input) > 1 or args.manifest is not None):
+        parser.error('--watch needs a single input and can not be combined with --stream')
+
+    if not args.input and args.manifest is None:
+        if not args.clear_cache:
+            parser.error('no input file given')
+        sys.exit(0)
+
+    if len(args.input) > 1 or args.manifest is not None:
+        from BatchAssembler import BatchTarget, read_manifest, assemble_batch
+        if args.output is not None:
+            parser.error('--output only works for a single input, use a manifest to name the outputs of a batch')
+        if args.verbose or args.profile or args.profile_json is not None or args.profile_memory:
+            parser.error('-v and the --profile options only work for a single input')
+        targets = [BatchTarget(input_file) for input_file in args.input]
+        if args.manifest is not None:
+            targets.extend(read_manifest(args.manifest))
+        start = time.perf_counter()
+        results = assemble_batch(targets, jobs=args.jobs, packrat=args.packrat, cache_dir=args.cache_dir,
+                                 whole_file=args.whole_file, compact=args.compact,
+                                 cycle_report=args.cycles, cycle_budget=args.cycle_budget,
+                                 relax_labels=not args.no_relax, output_format=args.format, stream=args.stream,
+                                 line_cache_size=args.line_cache_size, mmap_source=args.mmap, optimize=args.optimize)
+        for result in results:
+            print(result)
+        failed = sum(1 for result in results if not result.ok)
+        print('{:d} targets, {:d} failed, {:.3f}s'.format(len(results), failed, time.perf_counter() - start))
+        sys.exit(1 if failed else 0)
+
+    profile = None
+    if args.profile or args.profile_json is not None:
+        profile = AssemblyProfile()
+
+    if args.profile_memory and (profile is None or args.watch):
+        parser.error('--profile_memory needs --profile or --profile_json and does not work with --watch')
+
+    options = dict(whole_file=args.whole_file, parse_cache=parse_cache, compact=args.compact,
+                   cycle_report=args.cycles, cycle_budget=args.cycle_budget,
+                   relax_labels=not args.no_relax, stream=args.stream,
+                   line_cache_size=args.line_cache_size, mmap_source=args.mmap, optimize=args.optimize)
+    fasm = SunPlus6502Assembler(verbose=args.verbose, profile=profile, **options)
+
+    if args.watch:
+        from Watcher import Watcher
+
+        def report(result, seconds, changed):
+            if result is None:
+                if profile is not None:
+                    profile.reset()
+                return
+            print('{:s} {:s}in {:.1f} ms'.format(str(result), 'changed: {:s} '.format(', '.join(changed)) if changed else '', seconds * 1000.0))
+            if args.optimize:
+                print('\n'.join(result.optimizer.report()))
+            if args.cycles:
+                print('\n'.join(result.cycle_analyzer.report(args.cycle_budget)))
+            if profile is not None:
+                # every run is reported on its own
+                if args.profile:
+                    print('\n'.join(profile.report()))
+                if args.profile_json is not None:
+                    profile.write_json(args.profile_json)
+                profile.reset()
+
+        try:
+            Watcher(fasm, args.input[0], args.output, args.format, args.watch_interval).run(report)
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
 
-    fasm = SunPlus6502Assembler(args.input)
+    result = fasm.assemble(args.input[0])
+    if args.optimize:
+        print('\n'.join(result.optimizer.report()))
+    if args.cycles:
+        print('\n'.join(result.cycle_analyzer.report(args.cycle_budget)))
+    if args.output is not None:
+        result.write(args.output, args.format)
+    print(result)
+    if args.profile_memory:
+        # tracing slows every phase down, the peak memory comes from a separate run
+        memory_profile = AssemblyProfile(trace_memory=True)
+        SunPlus6502Assembler(profile=memory_profile, **options).assemble(args.input[0])
+        profile.peak_memory = memory_profile.peak_memory
+    if args.profile:
+        print('\n'.join(profile.report()))
+    if args.profile_json is not None:
+        profile.write_json(args.profile_json)
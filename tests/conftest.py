@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import os
+import sys
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, 'benchmarks'))
+
+from generate_program import generate
+
+TEST_ASM = os.path.join(REPO_DIR, 'test.asm')
+
+
+@pytest.fixture(scope='session')
+def generated_program(tmp_path_factory):
+    '''main file of a generated program with labels, branches and an include file'''
+    return generate(str(tmp_path_factory.mktemp('generated')), 3000, include_depth=1, seed=1)
+
+# images of test.asm, the one without relaxation matches the encoding of the first version
+TEST_ASM_IMAGE = bytes.fromhex('5601565556ff560117305f0005171c1f3c16201e14171e810154ff15011506150115014a54ff1501170615011501c0486a4a')
+TEST_ASM_IMAGE_NO_RELAX = bytes.fromhex('5601565556ff560117305f0005171c1f3c16201e14171e810154ff1501550600150115014a54ff150157060015011501c0486a4a')
+
+
+def write_program(directory, text, name='main.asm'):
+    '''write a source file and return its path'''
+    path = directory / name
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def assert_same_as_object_mode(main_file, start_address=0x00, **options):
+    '''the image and the labels have to be the same as with the default line by line assembly'''
+    from pySunPlus6502asm import SunPlus6502Assembler
+    relax_labels = options.get('relax_labels', True)
+    reference = SunPlus6502Assembler(relax_labels=relax_labels).assemble(main_file, start_address)
+    result = SunPlus6502Assembler(**options).assemble(main_file, start_address)
+    assert result.get_bytes() == reference.get_bytes()
+    assert result.get_label_map() == reference.get_label_map()
+    return result
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import os
+import sys
+import subprocess
+import pytest
+from conftest import REPO_DIR, write_program
+from pySunPlus6502asm import SunPlus6502Assembler
+from BatchAssembler import BatchTarget, read_manifest, assemble_batch
+
+SCRIPT = os.path.join(REPO_DIR, 'pySunPlus6502asm.py')
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    '''two targets that share an include file, the second one has an undefined label'''
+    write_program(tmp_path, 'shared: NOP\n', 'shared.asm')
+    write_program(tmp_path, 'JMP shared\nInclude shared.asm\n', 'good.asm')
+    write_program(tmp_path, 'JMP missing\nInclude shared.asm\n', 'bad.asm')
+    return write_program(tmp_path, '# input output\ngood.asm out/good.hex\nbad.asm\n', 'targets.txt')
+
+
+def run_cli(*args):
+    return subprocess.run([sys.executable, '-W', 'ignore', SCRIPT] + list(args), capture_output=True, text=True)
+
+
+def test_read_manifest(tmp_path, manifest):
+    targets = read_manifest(manifest)
+    assert [(target.input_file, target.output_file) for target in targets] == [
+        (str(tmp_path / 'good.asm'), str(tmp_path / 'out' / 'good.hex')), (str(tmp_path / 'bad.asm'), None)]
+
+
+def test_bad_manifest_line(tmp_path):
+    with pytest.raises(ValueError, match='to many fields'):
+        read_manifest(write_program(tmp_path, 'a.asm b.bin c\n', 'targets.txt'))
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_assemble_batch(tmp_path, manifest, jobs):
+    (tmp_path / 'out').mkdir()
+    good, bad = assemble_batch(read_manifest(manifest), jobs=jobs, output_format='ihex')
+    assert good.ok and good.output_file == str(tmp_path / 'out' / 'good.hex')
+    expected = SunPlus6502Assembler().assemble(str(tmp_path / 'good.asm')).get_bytes()
+    assert (tmp_path / 'out' / 'good.hex').read_bytes().startswith(b':%02X0000' % len(expected))
+    assert not bad.ok and bad.output_file is None
+    assert 'label missing used but not defined' in bad.error
+    assert not (tmp_path / 'bad.hex').exists()
+
+
+def test_default_output_file(tmp_path):
+    main_file = write_program(tmp_path, 'NOP\n')
+    result, = assemble_batch([BatchTarget(main_file)], jobs=1)
+    assert result.output_file == str(tmp_path / 'main.bin')
+    assert (tmp_path / 'main.bin').read_bytes() == SunPlus6502Assembler().assemble(main_file).get_bytes()
+
+
+def test_cli_exit_status(tmp_path, manifest):
+    (tmp_path / 'out').mkdir()
+    completed = run_cli('-m', manifest, '-j', '2')
+    assert completed.returncode == 1
+    lines = completed.stdout.splitlines()
+    assert lines[0].startswith('OK') and lines[1].startswith('FAIL')
+    assert lines[-1].startswith('2 targets, 1 failed')
+    os.remove(str(tmp_path / 'bad.asm'))
+    write_program(tmp_path, 'NOP\n', 'bad.asm')
+    assert run_cli('-m', manifest, '-j', '2').returncode == 0
+
+
+@pytest.mark.parametrize('option', [['-v'], ['--profile'], ['--profile_json', 'p.json'], ['--profile', '--profile_memory']])
+def test_cli_rejects_single_input_options(manifest, option):
+    completed = run_cli('-m', manifest, *option)
+    assert completed.returncode == 2
+    assert 'only work for a single input' in completed.stderr
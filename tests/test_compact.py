@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import pytest
+from conftest import TEST_ASM, TEST_ASM_IMAGE, TEST_ASM_IMAGE_NO_RELAX, assert_same_as_object_mode
+from pySunPlus6502asm import SunPlus6502Assembler
+from ParseCache import ParseCache
+
+
+@pytest.mark.parametrize('relax_labels, expected', [(True, TEST_ASM_IMAGE), (False, TEST_ASM_IMAGE_NO_RELAX)])
+def test_test_asm(relax_labels, expected):
+    assert SunPlus6502Assembler(compact=True, relax_labels=relax_labels).assemble(TEST_ASM).get_bytes() == expected
+
+
+@pytest.mark.parametrize('relax_labels', [True, False])
+@pytest.mark.parametrize('start_address', [0x00, 0xF0, 0x200])
+def test_same_as_object_mode(generated_program, relax_labels, start_address):
+    result = assert_same_as_object_mode(generated_program, start_address, compact=True, relax_labels=relax_labels)
+    reference = SunPlus6502Assembler(relax_labels=relax_labels).assemble(generated_program, start_address)
+    assert result.statistics.get('saved_bytes') == reference.statistics.get('saved_bytes')
+
+
+def test_columns_are_filled_while_reading(generated_program, monkeypatch):
+    def no_instruction_list(*args):
+        raise AssertionError('the instruction list must not be built')
+    assembler = SunPlus6502Assembler(compact=True)
+    monkeypatch.setattr(assembler, 'parse_file', no_instruction_list)
+    reference = SunPlus6502Assembler().assemble(generated_program)
+    result = assembler.assemble(generated_program)
+    assert result.get_bytes() == reference.get_bytes()
+    assert len(assembler.source_files) == 2
+
+
+@pytest.mark.parametrize('options', [dict(mmap_source=True), dict(whole_file=True), dict(optimize=True)])
+def test_other_front_ends(generated_program, options):
+    if options.get('optimize'):
+        reference = SunPlus6502Assembler(optimize=True).assemble(generated_program).get_bytes()
+        assert SunPlus6502Assembler(compact=True, **options).assemble(generated_program).get_bytes() == reference
+    else:
+        assert_same_as_object_mode(generated_program, compact=True, **options)
+
+
+def test_parse_cache(tmp_path, generated_program):
+    assert_same_as_object_mode(generated_program, compact=True, parse_cache=ParseCache(str(tmp_path), 'test'))
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+from pySunPlus6502asm import SunPlus6502Assembler
+
+
+def test_empty_block_at_start_address(tmp_path):
+    path = tmp_path / 'main.asm'
+    path.write_text('first:\nsecond: NOP\nRTS\n')
+    analyzer = SunPlus6502Assembler(cycle_report=True).assemble(str(path), 0x8000).cycle_analyzer
+    assert [(block.label, block.address) for block in analyzer.blocks] == [('first', 0x8000), ('second', 0x8000)]
+
+
+def test_routine_cycles(tmp_path):
+    path = tmp_path / 'main.asm'
+    path.write_text('main: JSR sub\nRTS\nsub: NOP\nNOP\nRTS\n')
+    analyzer = SunPlus6502Assembler(cycle_report=True).assemble(str(path)).cycle_analyzer
+    routines = dict((routine.label, routine) for routine in analyzer.routines)
+    assert routines['sub'].address == 4
+    assert routines['sub'].worst_cycles == 2 + 2 + 6
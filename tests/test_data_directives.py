@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import pytest
+from pySunPlus6502asm import SunPlus6502Assembler
+from AssemblerInstructions import AssemblyInstruction
+from DataInstructions import DataDirective, BinaryInclude
+
+MODES = [dict(), dict(whole_file=True), dict(compact=True), dict(stream=True), dict(mmap_source=True)]
+NOP = AssemblyInstruction(None, AssemblyInstruction.INSTRUCTION_NOP).get_opcode()
+
+
+def assemble(tmp_path, text, **options):
+    path = tmp_path / 'main.asm'
+    path.write_text(text, encoding='utf-8')
+    return SunPlus6502Assembler(**options).assemble(str(path)).get_bytes()
+
+
+@pytest.mark.parametrize('options', MODES)
+def test_directives(tmp_path, options):
+    (tmp_path / 'font.bin').write_bytes(bytes(range(16)))
+    text = ('start: DB 1, #$FF, 0FFH, "a;b", low ; comment\n'
+            'DW 1234H, table\n'
+            'DS 3, $EA\n'
+            'low: NOP\n'
+            'table: INCBIN "font.bin", 4, 3\n'
+            'DS 2\n')
+    expected = bytes([0x01, 0xFF, 0xFF]) + b'a;b' + bytes([0x0E, 0x34, 0x12, 0x0F, 0x00, 0xEA, 0xEA, 0xEA, NOP, 4, 5, 6, 0, 0])
+    assert assemble(tmp_path, text, **options) == expected
+
+
+@pytest.mark.parametrize('options', MODES)
+@pytest.mark.parametrize('text, message', [
+    ('DB 300', 'value 300 out of range for DB'),
+    ('DS foo', 'DS needs the number of bytes'),
+    ('DB "a€"', 'do not fit into a byte'),
+    ('INCBIN "font.bin", foo', 'offset and length have to be numbers'),
+    ('INCBIN "font.bin", 2', 'do not fit into the 1 bytes'),
+])
+def test_bad_directive(tmp_path, options, text, message):
+    (tmp_path / 'font.bin').write_bytes(b'x')
+    with pytest.raises(ValueError, match=message + r'.* at .*main\.asm:3$'):
+        assemble(tmp_path, 'NOP\n\n' + text + '\n', **options)
+
+
+def test_data_directive_sizes():
+    assert DataDirective(None, DataDirective.DIRECTIVE_DB, [1, b'abc', 'label']).get_num_bytes() == 5
+    assert DataDirective(None, DataDirective.DIRECTIVE_DW, [1, 'label']).get_num_bytes() == 4
+    assert DataDirective(None, DataDirective.DIRECTIVE_DS, [7, 0]).get_num_bytes() == 7
+    with pytest.raises(ValueError):
+        DataDirective(None, DataDirective.DIRECTIVE_DW, [0x10000])
+
+
+def test_replace_labels_reports_missing():
+    directive = DataDirective(None, DataDirective.DIRECTIVE_DW, ['here', 'missing'])
+    assert directive.replace_labels({'here': 0x1234}) == ['missing']
+    assert directive.get_values() == [0x1234, 'missing']
+
+
+def test_binary_include(tmp_path):
+    path = tmp_path / 'data.bin'
+    path.write_bytes(bytes(range(10)))
+    binary = BinaryInclude(None, 'data.bin', 2)
+    binary.set_path(str(path))
+    assert binary.get_num_bytes() == 8
+    buffer = bytearray(9)
+    binary.encode_into(buffer, 1)
+    assert bytes(buffer) == bytes([0]) + bytes(range(2, 10))
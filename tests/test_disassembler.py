@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import pytest
+from conftest import TEST_ASM
+from pySunPlus6502asm import SunPlus6502Assembler
+from Disassembler import Disassembler
+
+
+@pytest.mark.parametrize('relax_labels', [True, False])
+@pytest.mark.parametrize('program', ['test', 'generated'])
+def test_round_trip(tmp_path, generated_program, program, relax_labels):
+    main_file = TEST_ASM if program == 'test' else generated_program
+    image = SunPlus6502Assembler(relax_labels=relax_labels).assemble(main_file).get_bytes()
+    listing = tmp_path / 'listing.asm'
+    Disassembler(image).write(str(listing))
+    assert SunPlus6502Assembler(relax_labels=relax_labels).assemble(str(listing)).get_bytes() == image
+
+
+def test_absolute_operand_below_0x100_is_kept_as_bytes():
+    # STA $004F, absolute with a zero page value
+    lines = Disassembler(bytes([0x65, 0x4F, 0x00])).listing()
+    assert lines[0].startswith('    DB #$65,#$4F,#$00')
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import pytest
+from conftest import TEST_ASM, assert_same_as_object_mode
+from pySunPlus6502asm import SunPlus6502Assembler
+from AssemblerInstructions import *
+from PreProcessInstructions import PreInst_Include
+
+LINES = [
+    'ADC #01D', 'ADC #01010101B', 'ADC #FFH', 'ADC #%00000001', 'ADC $#0030H ;comment with spaces',
+    'ADC $#0500H,X', 'ADC $#28D', 'ADC $#60D,X', 'ADC ($#20H,X)', 'label_with_instr: ADC ($#20D),Y',
+    'ASL $#01D', 'ASL A', 'AND #255D', 'ADC this_is_a_label', 'BEQ somewhere', 'JMP ($#1234H)',
+    'LDX $#10H,Y', 'NOP', 'rts', 'only_a_label:', 'Include test2.asm',
+]
+
+
+def describe(instr):
+    '''comparable form of a parsed object'''
+    if isinstance(instr, AssemblyInstruction):
+        operand = instr.get_operand()
+        if isinstance(operand, AddressValue):
+            operand = (operand.get_type(), operand.get_value())
+        label = instr.get_label().get_name() if instr.get_label() is not None else None
+        return (label, instr.get_instruction(), instr.get_address_type(), instr.get_opcode(), instr.get_num_bytes(), operand)
+    if isinstance(instr, Label):
+        return ('label', instr.get_name())
+    if isinstance(instr, PreInst_Include):
+        return ('include', instr.get_filename())
+    return type(instr)
+
+
+@pytest.mark.parametrize('line', LINES)
+def test_fast_path_matches_grammar(line):
+    fast = SunPlus6502Assembler(line_cache_size=0).fast_parse_line(line)
+    grammar = SunPlus6502Assembler(use_fast_path=False, line_cache_size=0).parse_line(line)
+    assert fast is not None
+    assert describe(fast) == describe(grammar)
+
+
+def test_lines_the_fast_path_does_not_take():
+    assert SunPlus6502Assembler().fast_parse_line('ADC  $#30H ,X') is None
+
+
+@pytest.mark.parametrize('relax_labels', [True, False])
+def test_grammar_only(generated_program, relax_labels):
+    assert_same_as_object_mode(TEST_ASM, use_fast_path=False, relax_labels=relax_labels)
+    assert_same_as_object_mode(generated_program, use_fast_path=False, relax_labels=relax_labels)
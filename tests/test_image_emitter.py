@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import binascii
+import pytest
+from conftest import write_program
+from pySunPlus6502asm import SunPlus6502Assembler
+from ImageEmitter import ImageEmitter
+
+START_ADDRESS = 0x0C00
+# 20 bytes, the first record has 16 of them and the second one the last 4
+PROGRAM = 'start: LDX #05H\nloop: DEX\nBNE loop\nDB "HELLO, WORLD!", 0\nRTS\n'
+IMAGE = bytes.fromhex('b005e22afd48454c4c4f2c20574f524c44210012')
+
+INTEL_HEX = (b':100C0000B005E22AFD48454C4C4F2C20574F524C22\n'
+             b':040C10004421001269\n'
+             b':00000001FF\n')
+
+S_RECORD = (b'S0130000707953756E506C75733635303261736D1B\n'
+            b'S1130C00B005E22AFD48454C4C4F2C20574F524C1E\n'
+            b'S1070C104421001265\n'
+            b'S9030C00F0\n')
+
+
+@pytest.fixture
+def emitter(tmp_path):
+    result = SunPlus6502Assembler().assemble(write_program(tmp_path, PROGRAM), START_ADDRESS)
+    assert result.get_bytes() == IMAGE
+    return ImageEmitter(result.image, START_ADDRESS)
+
+
+def test_intel_hex(emitter):
+    assert emitter.to_intel_hex() == INTEL_HEX
+    for line in INTEL_HEX.splitlines():
+        # all bytes of a record including the checksum add up to zero
+        assert sum(binascii.unhexlify(line[1:])) & 0xFF == 0
+
+
+def test_s_record(emitter):
+    assert emitter.to_s_record() == S_RECORD
+    for line in S_RECORD.splitlines():
+        record = binascii.unhexlify(line[2:])
+        assert record[0] == len(record) - 1
+        assert sum(record) & 0xFF == 0xFF
+
+
+def test_intel_hex_above_64k():
+    # the data records stop at the 64K boundary, the rest follows the extended address record
+    assert ImageEmitter(bytes(range(20)), 0xFFF8).to_intel_hex() == (b':08FFF8000001020304050607E5\n'
+                                                                     b':020000040001F9\n'
+                                                                     b':0C00000008090A0B0C0D0E0F1011121352\n'
+                                                                     b':00000001FF\n')
+
+
+def test_s_record_limit():
+    with pytest.raises(ValueError, match='64K'):
+        ImageEmitter(bytes(4), 0xFFFE).to_s_record()
+
+
+@pytest.mark.parametrize('file_name, output_format', [('a.bin', 'bin'), ('a.HEX', 'ihex'), ('a.s19', 'srec'), ('a.out', 'bin')])
+def test_format_from_path(file_name, output_format):
+    assert ImageEmitter.format_from_path(file_name) == output_format
+
+
+def test_write(tmp_path, emitter):
+    for name, expected in (('a.bin', IMAGE), ('a.hex', INTEL_HEX), ('a.srec', S_RECORD)):
+        emitter.write(str(tmp_path / name))
+        assert (tmp_path / name).read_bytes() == expected
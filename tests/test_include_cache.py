@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import os
+import re
+import pytest
+from conftest import write_program, assert_same_as_object_mode
+from pySunPlus6502asm import SunPlus6502Assembler
+from AssemblyProfile import AssemblyProfile
+
+
+@pytest.mark.parametrize('options', [dict(), dict(whole_file=True), dict(stream=True)])
+def test_include_cycle(tmp_path, options):
+    a = write_program(tmp_path, 'NOP\nInclude b.asm\n', 'a.asm')
+    b = write_program(tmp_path, 'NOP\nInclude a.asm\n', 'b.asm')
+    cycle = 'include cycle detected: %s -> %s -> %s' % (os.path.realpath(a), os.path.realpath(b), os.path.realpath(a))
+    with pytest.raises(Exception, match=re.escape(cycle)):
+        SunPlus6502Assembler(**options).assemble(a)
+
+
+def test_file_included_twice_is_no_cycle(tmp_path):
+    write_program(tmp_path, 'NOP\n', 'leaf.asm')
+    main_file = write_program(tmp_path, 'Include leaf.asm\nInclude leaf.asm\n')
+    assert len(SunPlus6502Assembler().assemble(main_file).image) == 2
+
+
+def test_shared_include_cache(generated_program):
+    include_cache = dict()
+    for run in range(2):
+        assert_same_as_object_mode(generated_program, include_cache=include_cache)
+
+
+def assemble_counting_files(assembler, main_file):
+    '''returns the image and the number of files that were parsed, not replayed'''
+    assembler.profile = AssemblyProfile()
+    image = assembler.assemble(main_file).get_bytes()
+    return image, assembler.profile.counters.get('files', 0)
+
+
+@pytest.mark.parametrize('change', ['mtime', 'size'])
+def test_nested_include_change(tmp_path, change):
+    main_file = write_program(tmp_path, 'NOP\nInclude mid.asm\n')
+    write_program(tmp_path, 'INX\nInclude leaf.asm\n', 'mid.asm')
+    leaf = write_program(tmp_path, 'INX\n', 'leaf.asm')
+    assembler = SunPlus6502Assembler()
+    first, parsed = assemble_counting_files(assembler, main_file)
+    assert parsed == 3
+    assert assemble_counting_files(assembler, main_file) == (first, 0)
+
+    stat = os.stat(leaf)
+    if change == 'mtime':
+        # same size, only the modification time shows the change
+        write_program(tmp_path, 'INY\n', 'leaf.asm')
+        os.utime(leaf, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    else:
+        # the modification time is the same, only the size shows the change
+        write_program(tmp_path, 'INY\nINY\n', 'leaf.asm')
+        os.utime(leaf, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    image, parsed = assemble_counting_files(assembler, main_file)
+    assert parsed == 1
+    assert image == SunPlus6502Assembler().assemble(main_file).get_bytes() != first
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import pytest
+from pySunPlus6502asm import SunPlus6502Assembler
+
+MODES = [dict(), dict(compact=True), dict(stream=True)]
+
+
+def write(tmp_path, text):
+    path = tmp_path / 'e.asm'
+    path.write_text(text)
+    return str(path)
+
+
+@pytest.mark.parametrize('options', MODES)
+def test_duplicate_label(tmp_path, options):
+    main_file = write(tmp_path, 'a:\nNOP\na: NOP\n')
+    with pytest.raises(Exception, match=r'multible definitions for label a at .*e\.asm:3, first defined at .*e\.asm:1'):
+        SunPlus6502Assembler(**options).assemble(main_file)
+
+
+@pytest.mark.parametrize('options', MODES)
+def test_undefined_label(tmp_path, options):
+    main_file = write(tmp_path, 'NOP\nJMP missing\n')
+    with pytest.raises(Exception, match=r'label missing used but not defined at .*e\.asm:2'):
+        SunPlus6502Assembler(**options).assemble(main_file)
+
+
+@pytest.mark.parametrize('options', MODES)
+def test_symbol_table_has_source(tmp_path, options):
+    main_file = write(tmp_path, 'NOP\nstart: NOP\nJMP start\n')
+    address, file_name, line_number = SunPlus6502Assembler(**options).assemble(main_file).symbol_table['start']
+    assert (address, file_name, line_number) == (1, main_file, 2)
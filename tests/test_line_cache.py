@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import pytest
+from conftest import write_program, assert_same_as_object_mode
+from pySunPlus6502asm import SunPlus6502Assembler
+from LineCache import LineCache
+from AssemblerInstructions import AssemblyInstruction
+
+
+def test_hits_return_copies():
+    assembler = SunPlus6502Assembler()
+    first = assembler.parse_line('LDA $#10H')
+    second = assembler.parse_line('LDA   $#10H')
+    assert first is not second
+    assert (first.get_instruction(), first.get_opcode(), first.get_operand().get_value()) == \
+           (second.get_instruction(), second.get_opcode(), second.get_operand().get_value())
+    assert (assembler.line_cache.hits, assembler.line_cache.misses) == (1, 1)
+
+
+@pytest.mark.parametrize('line, cacheable', [
+    ('LDA $#10H', True),
+    ('NOP ; a comment: with a colon', True),
+    ('DEX', True),
+    ('loop: DEX', False),
+    ('only_a_label:', False),
+    ('; comment', False),
+    ('Include other.asm', False),
+    ('DB 1, 2', False),
+    ('dw table', False),
+    ('DS 4', False),
+    ('INCBIN "font.bin"', False),
+])
+def test_is_cacheable(line, cacheable):
+    assert LineCache.is_cacheable(line) == cacheable
+    if cacheable:
+        # everything that is looked up has to be stored by put
+        line_cache = LineCache()
+        instr = SunPlus6502Assembler(line_cache_size=0).parse_line(line)
+        line_cache.put(LineCache.get_key(line), instr)
+        assert len(line_cache.entries) == 1
+
+
+def test_lines_that_are_not_stored_are_no_misses(tmp_path):
+    write_program(tmp_path, 'NOP\n', 'other.asm')
+    text = 'start: NOP\nloop:\nInclude other.asm\nDB 1\nDS 2\n; comment\nNOP\nJMP loop\nJMP loop\n'
+    result = SunPlus6502Assembler().assemble(write_program(tmp_path, text))
+    # NOP, JMP loop and the NOP of other.asm are looked up, the second JMP is a hit
+    assert (result.statistics['line_cache_hits'], result.statistics['line_cache_misses']) == (2, 2)
+
+
+def test_least_recently_used_entry_is_dropped():
+    def put(line):
+        line_cache.put(line, AssemblyInstruction(None, AssemblyInstruction.KNOWN_INSTRUCTIONS[line]))
+    line_cache = LineCache(2)
+    put('NOP')
+    put('INX')
+    line_cache.get('NOP')
+    put('INY')
+    assert list(line_cache.entries) == ['NOP', 'INY']
+
+
+@pytest.mark.parametrize('line_cache_size', [0, 1, 16])
+def test_same_image_with_any_cache_size(generated_program, line_cache_size):
+    assert_same_as_object_mode(generated_program, line_cache_size=line_cache_size)
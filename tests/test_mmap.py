@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import pytest
+from conftest import TEST_ASM, TEST_ASM_IMAGE, write_program, assert_same_as_object_mode
+from pySunPlus6502asm import SunPlus6502Assembler
+
+
+def mapped_lines(path, chunk_size=None):
+    assembler = SunPlus6502Assembler(mmap_source=True)
+    if chunk_size is not None:
+        assembler.MAPPED_CHUNK_SIZE = chunk_size
+    return list(assembler.iter_mapped_lines(path))
+
+
+def test_test_asm():
+    assert SunPlus6502Assembler(mmap_source=True).assemble(TEST_ASM).get_bytes() == TEST_ASM_IMAGE
+
+
+@pytest.mark.parametrize('options', [dict(), dict(stream=True), dict(compact=True)])
+def test_same_as_object_mode(generated_program, options):
+    assert_same_as_object_mode(generated_program, mmap_source=True, **options)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64, 1 << 20])
+def test_chunks_split_at_line_ends(generated_program, chunk_size):
+    assert mapped_lines(generated_program, chunk_size) == mapped_lines(generated_program)
+
+
+@pytest.mark.parametrize('text', [
+    'NOP\nINX\n',
+    'NOP\r\nINX\r\n',
+    'NOP\nINX',
+    '\n\n  NOP ; comment\n\t\n;only a comment\n\tINX\t\n\n',
+])
+def test_line_numbers(tmp_path, text):
+    path = write_program(tmp_path, '')
+    with open(path, 'wb') as fp:
+        fp.write(text.encode('ascii'))
+    lines = mapped_lines(path, 1)
+    assert [line for line_number, line in lines] == ['NOP', 'INX']
+    expected = [line_number for line_number, line in enumerate(text.splitlines(), 1) if line.split(';')[0].strip()]
+    assert [line_number for line_number, line in lines] == expected
+
+
+def test_semicolon_in_string(tmp_path):
+    path = write_program(tmp_path, 'DB "a;b" ; comment\n')
+    assert mapped_lines(path) == [(1, 'DB "a;b" ; comment')]
+    assert SunPlus6502Assembler(mmap_source=True).assemble(path).get_bytes() == b'a;b'
+
+
+def test_empty_file(tmp_path):
+    path = write_program(tmp_path, '')
+    assert mapped_lines(path) == []
+    assert SunPlus6502Assembler(mmap_source=True).assemble(path).get_bytes() == b''
+
+
+def test_error_line_number(tmp_path):
+    path = write_program(tmp_path, 'NOP\n; comment\n\nDB 300\n')
+    with pytest.raises(ValueError, match=r'out of range for DB at .*main\.asm:4$'):
+        SunPlus6502Assembler(mmap_source=True).assemble(path)
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import pytest
+from conftest import TEST_ASM, TEST_ASM_IMAGE_NO_RELAX
+from pySunPlus6502asm import SunPlus6502Assembler
+from AssemblerInstructions import *
+
+
+def test_test_asm_image():
+    assert SunPlus6502Assembler(relax_labels=False).assemble(TEST_ASM).get_bytes() == TEST_ASM_IMAGE_NO_RELAX
+
+
+def test_opcode_table_and_decode_table_agree():
+    for (instruction, address_type), (op_code, num_bytes, num_cycles) in OPCODE_TABLE.items():
+        assert DECODE_TABLE[op_code] == (instruction, address_type, num_bytes, num_cycles)
+    assert sum(1 for entry in DECODE_TABLE if entry is not None) == len(OPCODE_TABLE)
+
+
+def test_branch_instructions():
+    assert AssemblyInstruction.INSTRUCTION_BEQ in BRANCH_INSTRUCTIONS
+    assert AssemblyInstruction.INSTRUCTION_JMP not in BRANCH_INSTRUCTIONS
+    instr = AssemblyInstruction(None, AssemblyInstruction.INSTRUCTION_BNE, AddressValue('loop', AddressValue.TYPE_LABEL))
+    assert instr.get_address_type() == AddressValue.TYPE_RELATIVE
+    assert instr.get_num_bytes() == 2
+
+
+def test_address_type_fallback():
+    # ASL without operand is the accumulator form
+    instr = AssemblyInstruction(None, AssemblyInstruction.INSTRUCTION_ASL)
+    assert instr.get_address_type() == AddressValue.TYPE_ACCUMULATOR
+
+
+def test_unknown_address_type():
+    with pytest.raises(ValueError):
+        AssemblyInstruction(None, AssemblyInstruction.INSTRUCTION_JSR, 5)
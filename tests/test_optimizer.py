@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import pytest
+from pySunPlus6502asm import SunPlus6502Assembler
+from PeepholeOptimizer import PeepholeOptimizer
+
+
+def assemble(tmp_path, lines, **options):
+    path = tmp_path / 'main.asm'
+    path.write_text('\n'.join(lines) + '\n')
+    return SunPlus6502Assembler(**options).assemble(str(path))
+
+
+@pytest.mark.parametrize('rule, source, expected', [
+    # flag instructions
+    (PeepholeOptimizer.RULE_FLAGS, ['CLC', 'CLC', 'LDA #01D'], ['CLC', 'LDA #01D']),
+    (PeepholeOptimizer.RULE_FLAGS, ['CLC', 'SEC', 'RTS'], ['SEC', 'RTS']),
+    (PeepholeOptimizer.RULE_FLAGS, ['CLD', 'LDA #01D', 'CLD', 'RTS'], ['CLD', 'LDA #01D', 'RTS']),
+    (PeepholeOptimizer.RULE_FLAGS, ['CLC', 'ADC #01D', 'CLC', 'RTS'], ['CLC', 'ADC #01D', 'CLC', 'RTS']),
+    (PeepholeOptimizer.RULE_FLAGS, ['CLC', 'JSR sub', 'CLC', 'sub: RTS'], ['CLC', 'JSR sub', 'CLC', 'sub: RTS']),
+    (PeepholeOptimizer.RULE_FLAGS, ['CLC', 'again:', 'CLC', 'RTS'], ['CLC', 'again:', 'CLC', 'RTS']),
+    (PeepholeOptimizer.RULE_FLAGS, ['CLI', 'SEI', 'RTS'], ['CLI', 'SEI', 'RTS']),
+    # push and pull pairs
+    (PeepholeOptimizer.RULE_STACK, ['PHP', 'PLP', 'RTS'], ['RTS']),
+    (PeepholeOptimizer.RULE_STACK, ['PHA', 'PLA', 'LDX #01D'], ['LDX #01D']),
+    (PeepholeOptimizer.RULE_STACK, ['PHA', 'PLA', 'BEQ done', 'NOP', 'done: RTS'], ['PHA', 'PLA', 'BEQ done', 'NOP', 'done: RTS']),
+    (PeepholeOptimizer.RULE_STACK, ['PHA', 'PLA', 'RTS'], ['PHA', 'PLA', 'RTS']),
+    # unreachable code
+    (PeepholeOptimizer.RULE_DEAD_CODE, ['RTS', 'NOP', 'NOP', 'next: RTS'], ['RTS', 'next: RTS']),
+    (PeepholeOptimizer.RULE_DEAD_CODE, ['RTS', 'DB 1', 'NOP'], ['RTS', 'DB 1', 'NOP']),
+    # jumps to the next instruction
+    (PeepholeOptimizer.RULE_JUMP_TO_NEXT, ['JMP next', 'next: RTS'], ['next: RTS']),
+    (PeepholeOptimizer.RULE_JUMP_TO_NEXT, ['BNE next', 'other:', 'next: RTS'], ['other:', 'next: RTS']),
+    (PeepholeOptimizer.RULE_JUMP_TO_NEXT, ['BNE next', 'NOP', 'next: RTS'], ['BNE next', 'NOP', 'next: RTS']),
+])
+def test_rule(tmp_path, rule, source, expected):
+    result = assemble(tmp_path, source, optimize=True)
+    assert result.get_bytes() == assemble(tmp_path, expected).get_bytes()
+    removed = sum(saving[0] for saving in result.optimizer.savings.values())
+    assert removed == len(source) - len(expected)
+    assert result.optimizer.savings[rule][0] == removed
+
+
+def test_labels_are_recomputed(tmp_path):
+    result = assemble(tmp_path, ['CLC', 'CLC', 'JMP end', 'NOP', 'end: RTS'], optimize=True)
+    assert result.get_label_map() == {'end': 1}
+    assert result.statistics['optimized_bytes'] == 1 + 3 + 1
+    assert result.statistics['optimized_cycles'] == result.optimizer.get_saved_cycles() > 0
+
+
+def test_input_list_is_not_changed(tmp_path):
+    path = tmp_path / 'main.asm'
+    path.write_text('CLC\nCLC\nRTS\n')
+    instructions = SunPlus6502Assembler().parse_file(str(path))
+    optimized = PeepholeOptimizer().optimize(instructions)
+    assert len(instructions) == 3
+    assert len(optimized) == 2
+
+
+@pytest.mark.parametrize('options', [dict(whole_file=True), dict(compact=True), dict(mmap_source=True), dict(relax_labels=False)])
+def test_same_result_in_every_mode(generated_program, options):
+    reference = SunPlus6502Assembler(optimize=True, relax_labels=options.get('relax_labels', True)).assemble(generated_program)
+    result = SunPlus6502Assembler(optimize=True, **options).assemble(generated_program)
+    assert result.get_bytes() == reference.get_bytes()
+    assert result.get_label_map() == reference.get_label_map()
+    assert result.statistics['optimized_bytes'] == reference.statistics['optimized_bytes']
+
+
+def test_stream_is_rejected():
+    with pytest.raises(ValueError, match='--stream can not be combined'):
+        SunPlus6502Assembler(stream=True, optimize=True)
+
+
+def test_report():
+    optimizer = PeepholeOptimizer()
+    lines = optimizer.report()
+    assert len(lines) == len(PeepholeOptimizer.RULES) + 2
+    assert lines[-1].split() == ['total', '0', '0', '0']
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import pytest
+import ParseCache as parse_cache_module
+from conftest import write_program, assert_same_as_object_mode
+from ParseCache import ParseCache
+from AssemblerInstructions import AssemblyInstruction, AddressValue
+
+
+@pytest.mark.parametrize('whole_file', [False, True])
+def test_cold_and_warm_cache(tmp_path, generated_program, whole_file):
+    cache_dir = str(tmp_path / 'cache')
+    for run in range(2):
+        # a new cache object each run, the second one reads the records from disk
+        parse_cache = ParseCache(cache_dir, 'test')
+        assert_same_as_object_mode(generated_program, parse_cache=parse_cache, whole_file=whole_file)
+        if run == 0:
+            assert parse_cache.hits == 0 and parse_cache.misses > 0
+    assert parse_cache.hits > 0 and parse_cache.misses == 0
+
+
+def test_key_depends_on_version_and_tables(tmp_path, monkeypatch):
+    content = b'LDA $#10H\n'
+    key = ParseCache(str(tmp_path), 'test').get_key(content)
+    assert ParseCache(str(tmp_path), 'test').get_key(content) == key
+    assert ParseCache(str(tmp_path), 'other').get_key(content) != key
+    assert ParseCache(str(tmp_path), 'test').get_key(b'LDA $#11H\n') != key
+    monkeypatch.setattr(ParseCache, 'FORMAT_VERSION', ParseCache.FORMAT_VERSION + 1)
+    assert ParseCache(str(tmp_path), 'test').get_key(content) != key
+    monkeypatch.undo()
+
+    # an opcode that moved invalidates the entries
+    changed_table = dict(parse_cache_module.OPCODE_TABLE)
+    op_code, num_bytes, num_cycles = changed_table[(AssemblyInstruction.INSTRUCTION_NOP, AddressValue.TYPE_IMPLIED)]
+    changed_table[(AssemblyInstruction.INSTRUCTION_NOP, AddressValue.TYPE_IMPLIED)] = (op_code ^ 0x80, num_bytes, num_cycles)
+    monkeypatch.setattr(parse_cache_module, 'OPCODE_TABLE', changed_table)
+    assert ParseCache(str(tmp_path), 'test').get_key(content) != key
+
+
+def test_store_load_and_clear(tmp_path):
+    parse_cache = ParseCache(str(tmp_path), 'test')
+    records = [(ParseCache.RECORD_LABEL, 1, 'start')]
+    key = parse_cache.get_key(b'start:\n')
+    assert parse_cache.load(key) is None
+    parse_cache.store(key, records)
+    assert parse_cache.load(key) == records
+    assert (parse_cache.hits, parse_cache.misses) == (1, 1)
+    assert parse_cache.clear() == 1
+    assert parse_cache.load(key) is None
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import json
+import pytest
+from conftest import write_program
+from pySunPlus6502asm import SunPlus6502Assembler
+from AssemblyProfile import AssemblyProfile
+
+
+@pytest.fixture
+def main_file(tmp_path):
+    write_program(tmp_path, 'sub: NOP\nRTS\n', 'sub.asm')
+    return write_program(tmp_path, 'start: NOP\nLDA #01D\nJSR sub\nJMP start\nInclude sub.asm\nLDA #01D\n')
+
+
+@pytest.mark.parametrize('options, phases', [
+    (dict(), ['grammar', 'parse', 'relax', 'resolve_labels', 'encode']),
+    (dict(compact=True), ['grammar', 'parse', 'check_labels', 'calculate_label_pos', 'replace_label', 'encode']),
+    (dict(stream=True), ['grammar', 'stream']),
+    (dict(optimize=True, cycle_report=True), ['grammar', 'parse', 'optimize', 'relax', 'resolve_labels', 'cycles', 'encode']),
+])
+def test_phases(main_file, options, phases):
+    profile = AssemblyProfile()
+    SunPlus6502Assembler(profile=profile, **options).assemble(main_file)
+    assert list(profile.phases) == phases
+    assert all(seconds >= 0 for seconds in profile.phases.values())
+    assert profile.get_total_time() == pytest.approx(sum(profile.phases.values()))
+
+
+def test_counters_and_files(main_file):
+    profile = AssemblyProfile()
+    result = SunPlus6502Assembler(profile=profile).assemble(main_file)
+    counters = profile.counters
+    assert counters['files'] == 2
+    assert counters['instructions'] == 7
+    assert counters['labels'] == 2
+    assert counters['bytes'] == len(result.image)
+    # LDA #01D is parsed once and taken from the line cache the second time
+    assert counters['line_cache_hits'] == 1
+    assert len(profile.file_times) == 2
+    assert profile.peak_memory is None
+
+
+def test_json(tmp_path, main_file):
+    profile = AssemblyProfile()
+    SunPlus6502Assembler(profile=profile).assemble(main_file)
+    json_file = str(tmp_path / 'profile.json')
+    profile.write_json(json_file)
+    with open(json_file) as fp:
+        data = json.load(fp)
+    assert data == json.loads(json.dumps(profile.to_dict()))
+    assert set(data) == {'phases', 'files', 'counters', 'total_seconds', 'peak_memory'}
+    assert data['counters']['files'] == 2
+
+
+def test_trace_memory(main_file):
+    profile = AssemblyProfile(trace_memory=True)
+    SunPlus6502Assembler(profile=profile).assemble(main_file)
+    assert profile.peak_memory > 0
+    assert profile.report()[-1].startswith('peak memory (KiB)')
+
+
+def test_runs_add_up_until_reset(main_file):
+    profile = AssemblyProfile()
+    assembler = SunPlus6502Assembler(profile=profile)
+    assembler.assemble(main_file)
+    assembler.assemble(main_file)
+    assert profile.counters['instructions'] == 14
+    profile.reset()
+    assembler.assemble(main_file)
+    assert profile.counters['instructions'] == 7
+    # the grammar is only built once per process, it is part of the first report only
+    assert 'grammar' not in profile.phases
+
+
+def test_report(main_file):
+    profile = AssemblyProfile()
+    SunPlus6502Assembler(profile=profile).assemble(main_file)
+    lines = profile.report()
+    assert lines[0].split() == ['phase', 'ms', '%']
+    assert lines[len(profile.phases) + 1].split()[0] == 'total'
+    assert any(line.startswith('line cache hit rate (%)') for line in lines)
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import pytest
+from conftest import TEST_ASM, TEST_ASM_IMAGE, write_program
+from pySunPlus6502asm import SunPlus6502Assembler
+from AssemblerInstructions import AssemblyInstruction, AddressValue, OPCODE_TABLE
+
+MODES = [dict(), dict(compact=True), dict(stream=True), dict(whole_file=True)]
+
+
+@pytest.mark.parametrize('options', MODES)
+def test_test_asm(options):
+    assert SunPlus6502Assembler(**options).assemble(TEST_ASM).get_bytes() == TEST_ASM_IMAGE
+
+
+@pytest.mark.parametrize('options', MODES)
+def test_zero_page_below_0x100(tmp_path, options):
+    main_file = write_program(tmp_path, 'LDA low\nLDA high\nlow: NOP\nDS 300\nhigh: NOP\n')
+    result = SunPlus6502Assembler(**options).assemble(main_file)
+    lda_zero_page = OPCODE_TABLE[(AssemblyInstruction.INSTRUCTION_LDA, AddressValue.TYPE_ZERO_PAGED)][0]
+    lda_absolute = OPCODE_TABLE[(AssemblyInstruction.INSTRUCTION_LDA, AddressValue.TYPE_ABSOLUTE)][0]
+    assert result.get_label_map() == {'low': 5, 'high': 306}
+    assert result.get_bytes()[:5] == bytes([lda_zero_page, 5, lda_absolute, 0x32, 0x01])
+    assert result.statistics['relaxed_operands'] == 1
+
+
+def test_label_pushed_above_0xff(tmp_path):
+    # with absolute operands edge would be at 0x100, relaxing both moves it to 0xFE
+    main_file = write_program(tmp_path, 'LDA edge\nLDA edge\nDS 250\nedge: NOP\n')
+    result = SunPlus6502Assembler().assemble(main_file)
+    assert result.get_label_map() == {'edge': 0xFE}
+    assert result.statistics['relaxed_operands'] == 2
+
+
+def test_no_zero_page_encoding(tmp_path):
+    # JMP has no zero page form, it stays absolute
+    main_file = write_program(tmp_path, 'JMP low\nlow: NOP\n')
+    result = SunPlus6502Assembler().assemble(main_file)
+    assert result.get_bytes() == bytes([OPCODE_TABLE[(AssemblyInstruction.INSTRUCTION_JMP, AddressValue.TYPE_ABSOLUTE)][0], 3, 0,
+                                        OPCODE_TABLE[(AssemblyInstruction.INSTRUCTION_NOP, AddressValue.TYPE_IMPLIED)][0]])
+    assert result.statistics['relaxed_operands'] == 0
+
+
+def test_relaxation_is_smaller(generated_program):
+    relaxed = SunPlus6502Assembler().assemble(generated_program)
+    absolute = SunPlus6502Assembler(relax_labels=False).assemble(generated_program)
+    assert len(absolute.image) - len(relaxed.image) == relaxed.statistics['saved_bytes'] > 0
+    assert relaxed.statistics['saved_cycles'] > 0
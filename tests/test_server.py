@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import os
+import stat
+import time
+import base64
+import threading
+import pytest
+from conftest import TEST_ASM
+from pySunPlus6502asm import SunPlus6502Assembler
+from AssemblerServer import AssemblerServer
+from AssemblerClient import SOCKET_NAME, get_default_socket, request, assemble
+
+
+def test_assemble_request():
+    response = AssemblerServer().assemble({'command': 'assemble', 'input': TEST_ASM, 'options': {}})
+    assert response['ok']
+    assert base64.b64decode(response['image']) == SunPlus6502Assembler().assemble(TEST_ASM).get_bytes()
+
+
+@pytest.mark.parametrize('options', [{'stream': True, 'optimize': True}, {'stream': True, 'compact': True},
+                                     {'compact': True, 'cycle_report': True}, {'unknown': True}])
+def test_rejected_options(options):
+    response = AssemblerServer().assemble({'command': 'assemble', 'input': TEST_ASM, 'options': options})
+    assert not response['ok']
+    assert response['message'].startswith('ValueError')
+
+
+@pytest.fixture
+def private_tmpdir(tmp_path, monkeypatch):
+    '''no runtime directory, the socket directory is created below tmp_path'''
+    monkeypatch.delenv('XDG_RUNTIME_DIR', raising=False)
+    monkeypatch.setenv('TMPDIR', str(tmp_path))
+    return tmp_path / ('sunplus6502asm-%d' % os.getuid())
+
+
+def test_socket_in_runtime_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_RUNTIME_DIR', str(tmp_path))
+    assert get_default_socket(create=True) == str(tmp_path / SOCKET_NAME)
+
+
+def test_socket_in_private_directory(private_tmpdir):
+    assert get_default_socket() == str(private_tmpdir / SOCKET_NAME)
+    assert not private_tmpdir.exists()
+    assert get_default_socket(create=True) == str(private_tmpdir / SOCKET_NAME)
+    status = os.lstat(str(private_tmpdir))
+    assert stat.S_ISDIR(status.st_mode) and stat.S_IMODE(status.st_mode) == 0o700
+    assert status.st_uid == os.getuid()
+
+
+def test_directory_others_can_access(private_tmpdir):
+    private_tmpdir.mkdir()
+    os.chmod(str(private_tmpdir), 0o777)
+    with pytest.raises(Exception, match='not a private directory'):
+        get_default_socket(create=True)
+
+
+def test_directory_replaced_by_a_link(private_tmpdir, tmp_path):
+    target = tmp_path / 'elsewhere'
+    target.mkdir(mode=0o700)
+    os.symlink(str(target), str(private_tmpdir))
+    with pytest.raises(Exception, match='not a private directory'):
+        get_default_socket()
+
+
+def test_server_on_the_default_socket(private_tmpdir):
+    server = AssemblerServer()
+    thread = threading.Thread(target=server.run)
+    thread.start()
+    socket_path = str(private_tmpdir / SOCKET_NAME)
+    try:
+        for attempt in range(500):
+            if os.path.exists(socket_path):
+                break
+            time.sleep(0.01)
+        assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+        assert request({'command': 'ping'}, timeout=10)['ok']
+        response = assemble(TEST_ASM)
+        assert response['image'] == SunPlus6502Assembler().assemble(TEST_ASM).get_bytes()
+    finally:
+        request({'command': 'shutdown'}, timeout=10)
+        thread.join(10)
+    assert not thread.is_alive()
+    assert not os.path.exists(socket_path)
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import pytest
+from conftest import write_program
+from pySunPlus6502asm import SunPlus6502Assembler
+from Simulator import Simulator
+from AssemblerInstructions import AssemblyInstruction, AddressValue, OPCODE_TABLE
+
+START_ADDRESS = 0x0200
+
+
+def opcode(mnemonic, address_type):
+    return OPCODE_TABLE[(AssemblyInstruction.KNOWN_INSTRUCTIONS[mnemonic], address_type)]
+
+
+def simulate(tmp_path, text):
+    '''assemble the program at START_ADDRESS and run it up to its end'''
+    image = SunPlus6502Assembler().assemble(write_program(tmp_path, text), START_ADDRESS).get_bytes()
+    simulator = Simulator(image, START_ADDRESS)
+    simulator.run(10000, START_ADDRESS + len(image))
+    return simulator
+
+
+@pytest.mark.parametrize('a, value, carry, result, c, z, v, n', [
+    (0x12, 0x34, False, 0x46, False, False, False, False),
+    (0x12, 0x34, True, 0x47, False, False, False, False),
+    (0x50, 0x50, False, 0xA0, False, False, True, True),
+    (0xFF, 0x01, False, 0x00, True, True, False, False),
+    (0xD0, 0x90, False, 0x60, True, False, True, False),
+])
+def test_adc_binary(tmp_path, a, value, carry, result, c, z, v, n):
+    simulator = simulate(tmp_path, '%s\nLDA #%02XH\nADC #%02XH\n' % ('SEC' if carry else 'CLC', a, value))
+    assert (simulator.a, simulator.c, simulator.z, simulator.v, simulator.n) == (result, c, z, v, n)
+
+
+@pytest.mark.parametrize('a, value, carry, result, c, z, v, n', [
+    (0x46, 0x12, True, 0x34, True, False, False, False),
+    (0x46, 0x12, False, 0x33, True, False, False, False),
+    (0x00, 0x01, True, 0xFF, False, False, False, True),
+    (0x50, 0xB0, True, 0xA0, False, False, True, True),
+    (0x42, 0x42, True, 0x00, True, True, False, False),
+])
+def test_sbc_binary(tmp_path, a, value, carry, result, c, z, v, n):
+    simulator = simulate(tmp_path, '%s\nLDA #%02XH\nSBC #%02XH\n' % ('SEC' if carry else 'CLC', a, value))
+    assert (simulator.a, simulator.c, simulator.z, simulator.v, simulator.n) == (result, c, z, v, n)
+
+
+@pytest.mark.parametrize('a, value, carry, result, c', [
+    (0x12, 0x34, False, 0x46, False),
+    (0x58, 0x46, True, 0x05, True),
+    (0x15, 0x26, False, 0x41, False),
+    (0x99, 0x01, False, 0x00, True),
+    (0x81, 0x92, False, 0x73, True),
+])
+def test_adc_decimal(tmp_path, a, value, carry, result, c):
+    simulator = simulate(tmp_path, 'SED\n%s\nLDA #%02XH\nADC #%02XH\n' % ('SEC' if carry else 'CLC', a, value))
+    assert (simulator.a, simulator.c) == (result, c)
+
+
+@pytest.mark.parametrize('a, value, carry, result, c', [
+    (0x46, 0x12, True, 0x34, True),
+    (0x40, 0x13, True, 0x27, True),
+    (0x32, 0x02, False, 0x29, True),
+    (0x12, 0x21, True, 0x91, False),
+    (0x00, 0x01, True, 0x99, False),
+])
+def test_sbc_decimal(tmp_path, a, value, carry, result, c):
+    simulator = simulate(tmp_path, 'SED\n%s\nLDA #%02XH\nSBC #%02XH\n' % ('SEC' if carry else 'CLC', a, value))
+    assert (simulator.a, simulator.c) == (result, c)
+
+
+@pytest.mark.parametrize('text, c, z, n', [
+    ('LDA #80H\nCMP #7FH', True, False, False),
+    ('LDA #10H\nCMP #10H', True, True, False),
+    ('LDA #10H\nCMP #11H', False, False, True),
+    ('LDX #00H\nDEX', None, False, True),
+    ('LDA #81H\nASL A', True, False, False),
+    ('SEC\nLDA #01H\nROR A', True, False, True),
+])
+def test_flags(tmp_path, text, c, z, n):
+    simulator = simulate(tmp_path, text + '\n')
+    if c is not None:
+        assert simulator.c == c
+    assert (simulator.z, simulator.n) == (z, n)
+
+
+@pytest.mark.parametrize('address, taken, extra_cycles', [
+    (0x0200, False, 0),
+    (0x0200, True, 1),
+    (0x02F0, True, 2),     # the target 0310h is on the next page
+])
+def test_branch_cycles(address, taken, extra_cycles):
+    op_code, num_bytes, num_cycles = opcode('BNE', AddressValue.TYPE_RELATIVE)
+    simulator = Simulator(bytes([op_code, 0x1E]), address)
+    simulator.z = not taken
+    simulator.run(1)
+    assert simulator.pc == (address + 2 + 0x1E if taken else address + 2)
+    assert simulator.cycles == num_cycles + extra_cycles
+
+
+def test_backward_branch_to_the_previous_page():
+    op_code, num_bytes, num_cycles = opcode('BNE', AddressValue.TYPE_RELATIVE)
+    simulator = Simulator(bytes([op_code, 0xF0]), 0x0300)
+    simulator.run(1)
+    assert simulator.pc == 0x02F2
+    assert simulator.cycles == num_cycles + 2
+
+
+def test_call(tmp_path):
+    text = ('JMP main\n'
+            'double: ASL A\n'
+            'RTS\n'
+            'main: LDA #03H\n'
+            'JSR double\n'
+            'JSR double\n'
+            'RTS\n')
+    result = SunPlus6502Assembler().assemble(write_program(tmp_path, text), START_ADDRESS)
+    simulator = Simulator(result.get_bytes(), START_ADDRESS)
+    cycles = simulator.call(result.get_label_map()['main'])
+    lda, jsr, asl, rts = (opcode('LDA', AddressValue.TYPE_IMMEDIATE)[2], opcode('JSR', AddressValue.TYPE_ABSOLUTE)[2],
+                          opcode('ASL', AddressValue.TYPE_ACCUMULATOR)[2], opcode('RTS', AddressValue.TYPE_IMPLIED)[2])
+    assert simulator.a == 12
+    assert cycles == lda + 2 * (jsr + asl + rts) + rts
+    assert simulator.sp == 0xFF
+
+
+def test_jsr_pushes_the_last_byte_of_the_instruction(tmp_path):
+    simulator = simulate(tmp_path, 'JSR sub\nsub: NOP\n')
+    # the return address is 0202h, the last byte of the JSR
+    assert (simulator.memory[0x1FF], simulator.memory[0x1FE], simulator.sp) == (0x02, 0x02, 0xFD)
+
+
+def test_call_that_does_not_return(tmp_path):
+    simulator = Simulator(SunPlus6502Assembler().assemble(write_program(tmp_path, 'loop: JMP loop\n'), START_ADDRESS).get_bytes(), START_ADDRESS)
+    with pytest.raises(Exception, match='did not return within 100 instructions'):
+        simulator.call(START_ADDRESS, 100)
+
+
+def test_stack(tmp_path):
+    simulator = simulate(tmp_path, 'LDA #12H\nPHA\nLDA #34H\nPHA\nSEC\nSED\nPHP\nCLC\nCLD\nPLP\nPLA\nTAX\nPLA\n')
+    assert (simulator.a, simulator.x, simulator.sp) == (0x12, 0x34, 0xFF)
+    assert simulator.c and simulator.d
+    assert simulator.memory[0x1FF] == 0x12 and simulator.memory[0x1FE] == 0x34
+
+
+def test_stack_pointer_wraps():
+    simulator = Simulator()
+    simulator.sp = 0x00
+    simulator.push(0xAB)
+    assert simulator.sp == 0xFF and simulator.memory[0x100] == 0xAB
+    assert simulator.pull() == 0xAB and simulator.sp == 0x00
+
+
+def test_status_byte():
+    simulator = Simulator()
+    simulator.set_status(0xC3)
+    assert (simulator.n, simulator.v, simulator.d, simulator.i, simulator.z, simulator.c) == (True, True, False, False, True, True)
+    assert simulator.get_status() == 0xF3
+
+
+def test_operand_wraps_at_the_end_of_memory():
+    simulator = Simulator()
+    simulator.memory[0xFFFF] = opcode('LDA', AddressValue.TYPE_IMMEDIATE)[0]
+    simulator.memory[0x0000] = 0x42
+    simulator.pc = 0xFFFF
+    simulator.run(1)
+    assert (simulator.a, simulator.pc) == (0x42, 0x0001)
+    simulator.memory[0xFFFF] = opcode('LDA', AddressValue.TYPE_ABSOLUTE)[0]
+    simulator.memory[0x0000:0x0002] = bytes([0x34, 0x12])
+    simulator.memory[0x1234] = 0x99
+    simulator.pc = 0xFFFF
+    simulator.run(1)
+    assert simulator.a == 0x99
+
+
+def test_unknown_opcode():
+    unused = next(op_code for op_code in range(256) if op_code not in set(data[0] for data in OPCODE_TABLE.values()))
+    simulator = Simulator(bytes([unused]))
+    with pytest.raises(ValueError, match='unknown opcode'):
+        simulator.run(1)
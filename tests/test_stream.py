@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import pytest
+from conftest import TEST_ASM, TEST_ASM_IMAGE, TEST_ASM_IMAGE_NO_RELAX, write_program, assert_same_as_object_mode
+from pySunPlus6502asm import SunPlus6502Assembler
+
+
+@pytest.mark.parametrize('relax_labels, expected', [(True, TEST_ASM_IMAGE), (False, TEST_ASM_IMAGE_NO_RELAX)])
+def test_test_asm(relax_labels, expected):
+    assert SunPlus6502Assembler(stream=True, relax_labels=relax_labels).assemble(TEST_ASM).get_bytes() == expected
+
+
+@pytest.mark.parametrize('mmap_source', [False, True])
+@pytest.mark.parametrize('relax_labels', [True, False])
+def test_same_as_object_mode(generated_program, relax_labels, mmap_source):
+    result = assert_same_as_object_mode(generated_program, stream=True, relax_labels=relax_labels, mmap_source=mmap_source)
+    reference = SunPlus6502Assembler(relax_labels=relax_labels).assemble(generated_program)
+    for name in ('instructions', 'relaxed_operands', 'saved_bytes', 'saved_cycles'):
+        assert result.statistics.get(name) == reference.statistics.get(name)
+
+
+@pytest.mark.parametrize('start_address', [0x40, 0xF0, 0x200])
+def test_start_address(generated_program, start_address):
+    assert_same_as_object_mode(generated_program, start_address, stream=True)
+
+
+def test_relaxation_waits_for_labels_below_0x100(tmp_path):
+    # the forward reference is only known to be in zero page after the prefix is relaxed
+    main_file = write_program(tmp_path, 'LDA data\nLDA data\nJMP over\nDS 240\ndata: NOP\nover: NOP\nLDA data\nLDA over\n')
+    result = assert_same_as_object_mode(main_file, stream=True)
+    assert max(result.get_label_map().values()) <= 0xFF
+    assert result.statistics['relaxed_operands'] == 4
+
+
+def test_no_instruction_list(generated_program, monkeypatch):
+    def no_instruction_list(*args):
+        raise AssertionError('the instruction list must not be built')
+    relaxed_lengths = list()
+    def relax_label_operands(instructions, start_address):
+        relaxed_lengths.append(len(instructions))
+        return SunPlus6502Assembler.relax_label_operands(assembler, instructions, start_address)
+    assembler = SunPlus6502Assembler(stream=True)
+    monkeypatch.setattr(assembler, 'parse_file', no_instruction_list)
+    monkeypatch.setattr(assembler, 'relax_label_operands', relax_label_operands)
+    assert assembler.assemble(generated_program).get_bytes() == SunPlus6502Assembler().assemble(generated_program).get_bytes()
+    # only the statements of the first 256 bytes are held back for the relaxation
+    assert len(relaxed_lengths) == 1 and relaxed_lengths[0] < 256
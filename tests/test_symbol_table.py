@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import pytest
+from conftest import write_program
+from pySunPlus6502asm import SunPlus6502Assembler
+from AssemblerInstructions import AssemblyInstruction, AddressValue, OPCODE_TABLE
+
+MODES = [dict(), dict(compact=True), dict(stream=True)]
+
+
+@pytest.mark.parametrize('options', MODES)
+def test_forward_and_backward_references(tmp_path, options):
+    main_file = write_program(tmp_path, 'back: NOP\nBNE forward\nJMP back\nforward: NOP\n')
+    result = SunPlus6502Assembler(relax_labels=False, **options).assemble(main_file)
+    image = result.get_bytes()
+    assert image[1] == OPCODE_TABLE[(AssemblyInstruction.INSTRUCTION_BNE, AddressValue.TYPE_RELATIVE)][0]
+    assert image[2] == 3            # branch offset from the next instruction to forward
+    assert image[4:6] == bytes([0, 0])
+    assert result.get_label_map() == {'back': 0, 'forward': 6}
+
+
+@pytest.mark.parametrize('options', MODES)
+def test_backward_branch(tmp_path, options):
+    main_file = write_program(tmp_path, 'NOP\nloop: DEX\nBNE loop\n')
+    assert SunPlus6502Assembler(**options).assemble(main_file, 0x200).get_bytes()[3] == 0xFD
+
+
+@pytest.mark.parametrize('options', MODES)
+def test_label_at_the_end(tmp_path, options):
+    main_file = write_program(tmp_path, 'JMP end\nend:\n')
+    result = SunPlus6502Assembler(relax_labels=False, **options).assemble(main_file, 0x100)
+    assert result.get_label_map() == {'end': 0x103}
+    assert result.get_bytes()[1:] == bytes([0x03, 0x01])
+
+
+@pytest.mark.parametrize('options', MODES)
+@pytest.mark.parametrize('text', ['BNE far\nDS 200\nfar: NOP\n', 'back: NOP\nDS 200\nBNE back\n'])
+def test_branch_out_of_range(tmp_path, options, text):
+    with pytest.raises(ValueError, match='out of range'):
+        SunPlus6502Assembler(**options).assemble(write_program(tmp_path, text))
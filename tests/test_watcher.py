@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import os
+from conftest import write_program
+from pySunPlus6502asm import SunPlus6502Assembler
+from AssemblyProfile import AssemblyProfile
+from Watcher import Watcher
+
+
+def test_only_the_changed_include_is_parsed(tmp_path):
+    main_file = write_program(tmp_path, 'start: NOP\nInclude a.asm\nInclude b.asm\nJMP start\n')
+    write_program(tmp_path, 'INX\n', 'a.asm')
+    b_file = write_program(tmp_path, 'INY\n', 'b.asm')
+    output_file = str(tmp_path / 'main.bin')
+    profile = AssemblyProfile()
+    assembler = SunPlus6502Assembler(profile=profile)
+    runs = list()
+
+    def callback(result, seconds, changed):
+        with open(output_file, 'rb') as fp:
+            runs.append((result.get_bytes(), fp.read(), profile.counters['files'], changed))
+        profile.reset()
+        if len(runs) == 1:
+            # the size stays the same, the watcher has to see the new modification time
+            stat = os.stat(b_file)
+            write_program(tmp_path, 'DEY\n', 'b.asm')
+            os.utime(b_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    Watcher(assembler, main_file, output_file, interval=0.01).run(callback, max_runs=2)
+
+    (first, first_output, first_files, first_changed), (second, second_output, second_files, second_changed) = runs
+    assert first_output == first and second_output == second
+    assert second == SunPlus6502Assembler().assemble(main_file).get_bytes() != first
+    assert first_files == 3 and first_changed == []
+    # the unchanged files are replayed from the include cache, only b.asm is parsed again
+    assert second_files == 1
+    assert second_changed == [os.path.realpath(b_file)]
+    assert assembler.include_cache[os.path.realpath(b_file)][0] == Watcher.get_signature(b_file)
+
+
+def test_failed_run_is_reported_and_watched(tmp_path):
+    main_file = write_program(tmp_path, 'JMP missing\n')
+    results = list()
+
+    def callback(result, seconds, changed):
+        results.append(result)
+        if len(results) == 1:
+            stat = os.stat(main_file)
+            write_program(tmp_path, 'missing: NOP\nJMP missing\n')
+            os.utime(main_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    Watcher(SunPlus6502Assembler(), main_file, interval=0.01).run(callback, max_runs=2)
+    assert results[0] is None
+    assert results[1].get_label_map() == {'missing': 0}
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: drunsinn
+@license: MIT License
+"""
+import pytest
+from conftest import TEST_ASM, TEST_ASM_IMAGE, write_program, assert_same_as_object_mode
+from pySunPlus6502asm import SunPlus6502Assembler
+
+
+def test_test_asm():
+    assert SunPlus6502Assembler(whole_file=True).assemble(TEST_ASM).get_bytes() == TEST_ASM_IMAGE
+
+
+@pytest.mark.parametrize('relax_labels', [True, False])
+def test_generated_program(generated_program, relax_labels):
+    assert_same_as_object_mode(generated_program, whole_file=True, relax_labels=relax_labels)
+
+
+def test_tabs_and_blank_lines(tmp_path):
+    main_file = write_program(tmp_path, '\n\tNOP\n\n  start:\t LDA #01D ; comment\n;only a comment\nJMP start\n')
+    assert_same_as_object_mode(main_file, whole_file=True)
+
+
+def test_bad_line_fails(tmp_path):
+    main_file = write_program(tmp_path, 'NOP\n!!!\n')
+    with pytest.raises(Exception, match='parsing of .* failed'):
+        SunPlus6502Assembler(whole_file=True).assemble(main_file)